@@ -0,0 +1,615 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+
+from analytics.sketches import HyperLogLog, TDigest
+from database.db_engine import engine, pooled_connection
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+APPROX_SAMPLE_RATE = float(os.getenv("APPROX_SAMPLE_RATE", "0.02"))
+
+# small strata (rare channel × persona) keep at least this many rows → bounded error everywhere
+APPROX_MIN_STRATUM_ROWS = int(os.getenv("APPROX_MIN_STRATUM_ROWS", "2000"))
+
+APPROX_REFRESH_SECONDS = float(os.getenv("APPROX_REFRESH_SECONDS", "1"))
+
+SKETCH_CHUNK_ROWS = 200_000
+
+HASH_SPACE = 2 ** 32
+CONFIDENCE_Z = 1.96          # 95% intervals
+
+SQL_DIALECT = {"postgresql": "postgres"}.get(engine.dialect.name, engine.dialect.name)
+
+
+# ---------------------------------------------------
+# WHAT IS SAMPLED / SKETCHED
+# ---------------------------------------------------
+
+SAMPLES = {
+
+    "transactions": {
+        "sample_table": "transactions_sample",
+        "id_column": "transaction_id",
+        "columns": ["transaction_id", "customer_id", "product_name", "amount", "channel", "timestamp"],
+    },
+
+    "engagement_events": {
+        "sample_table": "engagement_events_sample",
+        "id_column": "event_id",
+        "columns": ["event_id", "customer_id", "event_type", "channel", "timestamp"],
+    },
+}
+
+# (table, column) → group column; every sketch also keeps an all-rows entry under None
+DISTINCT_SKETCHES = {
+    ("transactions", "customer_id"): "channel",
+    ("engagement_events", "customer_id"): "channel",
+}
+
+QUANTILE_SKETCHES = {
+    ("transactions", "amount"): "channel",
+}
+
+
+# ---------------------------------------------------
+# STRATIFIED SAMPLE MAINTENANCE (INCREMENTAL)
+# ---------------------------------------------------
+
+def sample_key_sql(id_column):
+    # multiplicative hash of the id → deterministic position in [0, 2^32)
+    return f"(t.{id_column} * 2654435761) % {HASH_SPACE}"
+
+
+def stratum_rate(population):
+    return max(APPROX_SAMPLE_RATE, min(1.0, APPROX_MIN_STRATUM_ROWS / max(population, 1)))
+
+
+def refresh_sample(conn, source):
+
+    config = SAMPLES[source]
+    name = config["sample_table"]
+    id_column = config["id_column"]
+
+    conn.execute(
+        text("INSERT INTO rollup_watermarks (rollup, last_id) VALUES (:name, 0) ON CONFLICT (rollup) DO NOTHING"),
+        {"name": name}
+    )
+
+    low = conn.execute(text("SELECT last_id FROM rollup_watermarks WHERE rollup = :name"), {"name": name}).scalar()
+    high = conn.execute(text(f"SELECT MAX({id_column}) FROM {source}")).scalar() or 0
+
+    if high <= low:
+        return 0
+
+    # optimistic lock, same as the rollups
+    moved = conn.execute(
+        text("UPDATE rollup_watermarks SET last_id = :high WHERE rollup = :name AND last_id = :low"),
+        {"name": name, "low": low, "high": high}
+    ).rowcount
+
+    if not moved:
+        return 0
+
+    window = {"name": name, "low": low, "high": high}
+
+    # 1. stratum populations
+    conn.execute(text(f"""
+        INSERT INTO sample_strata (sample, channel, persona, population, rate)
+        SELECT :name, COALESCE(t.channel, ''), COALESCE(c.persona, ''), COUNT(*), 1.0
+        FROM {source} t LEFT JOIN customers c ON c.customer_id = t.customer_id
+        WHERE t.{id_column} > :low AND t.{id_column} <= :high
+        GROUP BY COALESCE(t.channel, ''), COALESCE(c.persona, '')
+        ON CONFLICT (sample, channel, persona) DO UPDATE SET
+            population = sample_strata.population + excluded.population
+    """), window)
+
+    # 2. grown strata get a lower rate → drop rows above the new threshold, reweight the rest
+    strata = conn.execute(
+        text("SELECT channel, persona, population, rate FROM sample_strata WHERE sample = :name"), {"name": name}
+    ).fetchall()
+
+    for channel, persona, population, rate in strata:
+
+        new_rate = stratum_rate(population)
+
+        if new_rate >= rate:
+            continue
+
+        stratum = {"name": name, "channel": channel, "persona": persona, "rate": new_rate,
+                   "threshold": int(new_rate * HASH_SPACE), "weight": 1.0 / new_rate}
+
+        conn.execute(text(
+            "UPDATE sample_strata SET rate = :rate WHERE sample = :name AND channel = :channel AND persona = :persona"
+        ), stratum)
+
+        match = "COALESCE(channel, '') = :channel AND COALESCE(persona, '') = :persona"
+
+        conn.execute(text(f"DELETE FROM {name} WHERE {match} AND sample_key >= :threshold"), stratum)
+        conn.execute(text(f"UPDATE {name} SET sample_weight = :weight WHERE {match}"), stratum)
+
+    # 3. new rows below their stratum's threshold
+    columns = config["columns"]
+
+    conn.execute(text(f"""
+        INSERT INTO {name} ({", ".join(columns)}, persona, sample_key, sample_weight)
+        SELECT {", ".join("t." + c for c in columns)}, c.persona, {sample_key_sql(id_column)}, 1.0 / s.rate
+        FROM {source} t
+        LEFT JOIN customers c ON c.customer_id = t.customer_id
+        JOIN sample_strata s
+          ON s.sample = :name AND s.channel = COALESCE(t.channel, '') AND s.persona = COALESCE(c.persona, '')
+        WHERE t.{id_column} > :low AND t.{id_column} <= :high
+          AND {sample_key_sql(id_column)} < s.rate * {HASH_SPACE}
+    """), window)
+
+    return high - low
+
+
+_sample_lock = threading.Lock()
+_last_sample_refresh = 0.0
+
+
+def refresh_samples(force=False, bind=engine):
+
+    global _last_sample_refresh
+
+    with _sample_lock:
+
+        if not force and time.monotonic() - _last_sample_refresh < APPROX_REFRESH_SECONDS:
+            return {}
+
+        folded = {}
+
+        for source in SAMPLES:
+            with bind.begin() as conn:
+                folded[source] = refresh_sample(conn, source)
+
+        _last_sample_refresh = time.monotonic()
+
+    return folded
+
+
+# ---------------------------------------------------
+# SKETCH STORE (HLL + T-DIGEST, IN MEMORY, INCREMENTAL)
+# ---------------------------------------------------
+
+class SketchStore:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_id = {}
+        self.distinct = {}        # (table, column) → {group | None: HyperLogLog}
+        self.quantiles = {}       # (table, column) → {group | None: TDigest}
+        self.last_refresh = 0.0
+
+    def _fold(self, table, chunk):
+
+        for registry, sketches, factory, add in (
+            (DISTINCT_SKETCHES, self.distinct, HyperLogLog, lambda s, v: s.add(v)),
+            (QUANTILE_SKETCHES, self.quantiles, TDigest, lambda s, v: s.update(v)),
+        ):
+            for (source, column), group in registry.items():
+
+                if source != table:
+                    continue
+
+                groups = sketches.setdefault((source, column), {})
+                values = chunk[column].dropna()
+
+                add(groups.setdefault(None, factory()), values.to_numpy())
+
+                keys = chunk.loc[values.index, group].fillna("")
+
+                for key, part in values.groupby(keys, sort=False):
+                    add(groups.setdefault(key, factory()), part.to_numpy())
+
+    def refresh(self, force=False, bind=engine):
+
+        with self.lock:
+
+            if not force and time.monotonic() - self.last_refresh < APPROX_REFRESH_SECONDS:
+                return
+
+            for table, config in SAMPLES.items():
+
+                wanted = {(c, g) for (t, c), g in {**DISTINCT_SKETCHES, **QUANTILE_SKETCHES}.items() if t == table}
+
+                if not wanted:
+                    continue
+
+                columns = sorted({c for pair in wanted for c in pair})
+                id_column = config["id_column"]
+
+                with bind.connect() as conn:
+
+                    low = self.last_id.get(table, 0)
+                    high = conn.execute(text(f"SELECT MAX({id_column}) FROM {table}")).scalar() or 0
+
+                    if high <= low:
+                        continue
+
+                    for chunk in pd.read_sql(
+                        text(f"SELECT {', '.join(columns)} FROM {table} WHERE {id_column} > :low AND {id_column} <= :high"),
+                        conn, params={"low": low, "high": high}, chunksize=SKETCH_CHUNK_ROWS
+                    ):
+                        self._fold(table, chunk)
+
+                self.last_id[table] = high
+
+            self.last_refresh = time.monotonic()
+
+    def distinct_count(self, table, column, group=None):
+        with self.lock:
+            sketch = self.distinct.get((table, column), {}).get(group)
+            return sketch.summary() if sketch else None
+
+    def groups(self, table, column):
+        with self.lock:
+            return sorted(g for g in self.distinct.get((table, column), {}) if g is not None)
+
+    def digests(self, table, column):
+        with self.lock:
+            return dict(self.quantiles.get((table, column), {}))
+
+
+sketch_store = SketchStore()
+
+
+# ---------------------------------------------------
+# QUERY REWRITE → WEIGHTED AGGREGATES OVER THE SAMPLE
+# ---------------------------------------------------
+
+class ApproxPlan:
+
+    """Rewritten SQL + how to turn its hidden variance columns into ±error columns"""
+
+    def __init__(self, sql, outputs, source):
+        self.sql = sql
+        self.outputs = outputs      # [(output column, kind, [hidden columns])]
+        self.source = source
+
+    def finalize(self, df):
+
+        for name, kind, hidden in self.outputs:
+
+            if kind == "total":
+                variance = df[hidden[0]].astype(float)
+
+            else:
+                # ratio estimator (AVG) → delta-method variance
+                yy, xy, nn, n = (df[h].astype(float) for h in hidden)
+                ratio = df[name].astype(float)
+                variance = (yy - 2 * ratio * xy + ratio ** 2 * nn) / n.where(n != 0) ** 2
+
+            df[f"{name}_error"] = CONFIDENCE_Z * np.sqrt(variance.clip(lower=0))
+
+        df = df.drop(columns=[h for _, _, hidden in self.outputs for h in hidden])
+
+        df.attrs["approximate"] = {
+            "method": "stratified_sample",
+            "source": self.source,
+            "confidence": 0.95,
+            "error_columns": [f"{name}_error" for name, _, _ in self.outputs],
+        }
+
+        return df
+
+
+def sampled_scope(select):
+
+    """The one sampled table feeding select (directly or via SELECT * derived tables) → (table node, alias)"""
+
+    tables = [t for t in select.find_all(exp.Table) if t.name.lower() in SAMPLES]
+
+    if len(tables) != 1:
+        return None, None
+
+    table = tables[0]
+    alias = table.alias_or_name
+    scope = table.parent_select
+
+    while scope is not select:
+
+        derived = scope.parent
+
+        if not isinstance(derived, exp.Subquery) or not all(isinstance(e, exp.Star) for e in scope.expressions):
+            return None, None
+
+        alias = derived.alias_or_name
+        scope = derived.parent_select
+
+    return table, alias
+
+
+def weighted_aggregate(agg, weight):
+
+    """→ (rewritten SQL, kind, [variance SQL]) ; kind None → no error column; raises ValueError if unsupported"""
+
+    w = weight
+    x = agg.this.sql(dialect=SQL_DIALECT) if agg.this is not None else None
+    present = f"CASE WHEN {x} IS NOT NULL THEN {w} ELSE 0 END"
+
+    if isinstance(agg, exp.Count):
+
+        if isinstance(agg.this, exp.Distinct):
+            raise ValueError("COUNT(DISTINCT) cannot be scaled from a sample")
+
+        if agg.this is None or isinstance(agg.this, exp.Star):
+            return f"SUM({w})", "total", [f"SUM({w} * ({w} - 1))"]
+
+        return f"SUM({present})", "total", [f"SUM(CASE WHEN {x} IS NOT NULL THEN {w} * ({w} - 1) ELSE 0 END)"]
+
+    if isinstance(agg, exp.Sum):
+        return f"SUM(({x}) * {w})", "total", [f"SUM(({x}) * ({x}) * {w} * ({w} - 1))"]
+
+    if isinstance(agg, exp.Avg):
+        return f"SUM(({x}) * {w}) / NULLIF(SUM({present}), 0)", "ratio", [
+            f"SUM(({x}) * ({x}) * {w} * ({w} - 1))",
+            f"SUM(({x}) * {w} * ({w} - 1))",
+            f"SUM(CASE WHEN {x} IS NOT NULL THEN {w} * ({w} - 1) ELSE 0 END)",
+            f"SUM({present})",
+        ]
+
+    if isinstance(agg, (exp.Min, exp.Max)):
+        # sample extremes → no scaling, no bound
+        return agg.sql(dialect=SQL_DIALECT), None, []
+
+    raise ValueError(f"{agg.key.upper()} has no sample estimator")
+
+
+def approximate_plan(sql_query):
+
+    """SQL over transactions / engagement_events → ApproxPlan over the samples, or None (run exactly)"""
+
+    try:
+        tree = sqlglot.parse_one(sql_query, read=SQL_DIALECT)
+    except sqlglot.errors.ParseError:
+        return None
+
+    if not isinstance(tree, exp.Select):
+        return None
+
+    table, alias = sampled_scope(tree)
+
+    if table is None:
+        return None
+
+    aggregates = [a for a in tree.find_all(exp.AggFunc) if a.parent_select is tree]
+
+    if not aggregates:
+        return None
+
+    weight = f"{alias}.sample_weight"
+    source = table.name.lower()
+
+    try:
+        rewrites = {id(a): weighted_aggregate(a, weight) for a in aggregates}
+    except ValueError:
+        return None
+
+    outputs = []
+    hidden = []
+
+    for projection in list(tree.expressions):
+
+        inner = projection.this if isinstance(projection, exp.Alias) else projection
+        name = projection.alias_or_name if isinstance(projection, exp.Alias) else projection.sql(dialect=SQL_DIALECT)
+
+        if id(inner) in rewrites:
+
+            rewritten, kind, variances = rewrites[id(inner)]
+
+            if kind:
+                columns = [f"__approx_{len(outputs)}_{i}" for i in range(len(variances))]
+                outputs.append((name, kind, columns))
+                hidden += list(zip(columns, variances))
+
+            projection.replace(exp.alias_(sqlglot.parse_one(rewritten, read=SQL_DIALECT), name, quoted=True))
+
+    # aggregates left inside expressions / HAVING / ORDER BY → weighted, no error column
+    for agg in [a for a in tree.find_all(exp.AggFunc) if a.parent_select is tree and id(a) in rewrites]:
+        agg.replace(sqlglot.parse_one(rewrites[id(agg)][0], read=SQL_DIALECT))
+
+    for column, variance in hidden:
+        tree.append("expressions", exp.alias_(sqlglot.parse_one(variance, read=SQL_DIALECT), column))
+
+    table.set("this", exp.to_identifier(SAMPLES[source]["sample_table"]))
+
+    if not table.alias:
+        table.set("alias", exp.TableAlias(this=exp.to_identifier(source)))
+
+    return ApproxPlan(tree.sql(dialect=SQL_DIALECT), outputs, source)
+
+
+# ---------------------------------------------------
+# SKETCH ANSWERS → COUNT(DISTINCT) FROM HYPERLOGLOG
+# ---------------------------------------------------
+
+def sketch_answer(sql_query):
+
+    """SELECT [g,] COUNT(DISTINCT c) FROM t [GROUP BY g] with a maintained HLL → DataFrame, else None"""
+
+    try:
+        tree = sqlglot.parse_one(sql_query, read=SQL_DIALECT)
+    except sqlglot.errors.ParseError:
+        return None
+
+    if not isinstance(tree, exp.Select) or any(tree.args.get(k) for k in ("where", "joins", "having")):
+        return None
+
+    tables = list(tree.find_all(exp.Table))
+
+    if len(tables) != 1 or tables[0].parent_select is not tree:
+        return None
+
+    table = tables[0].name.lower()
+    group_by = tree.args.get("group")
+    group_columns = [e for e in group_by.expressions] if group_by else []
+
+    distinct = None
+    labels = []
+
+    for projection in tree.expressions:
+
+        inner = projection.this if isinstance(projection, exp.Alias) else projection
+        name = projection.alias_or_name if isinstance(projection, exp.Alias) else projection.sql(dialect=SQL_DIALECT)
+
+        if isinstance(inner, exp.Count) and isinstance(inner.this, exp.Distinct) and len(inner.this.expressions) == 1:
+            distinct = (name, inner.this.expressions[0])
+        elif isinstance(inner, exp.Column):
+            labels.append((name, inner.name.lower()))
+        else:
+            return None
+
+    if distinct is None or len(labels) > 1:
+        return None
+
+    name, column = distinct
+
+    if not isinstance(column, exp.Column) or (table, column.name.lower()) not in DISTINCT_SKETCHES:
+        return None
+
+    key = (table, column.name.lower())
+    group = DISTINCT_SKETCHES[key]
+
+    if labels and (labels[0][1] != group or len(group_columns) != 1):
+        return None
+
+    if not labels and group_columns:
+        return None
+
+    sketch_store.refresh()
+
+    rows = []
+
+    for value in (sketch_store.groups(*key) if labels else [None]):
+
+        summary = sketch_store.distinct_count(table, key[1], value)
+        row = {labels[0][0]: value} if labels else {}
+
+        row.update({name: summary["estimate"], f"{name}_error": summary["error"]})
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    df.attrs["approximate"] = {"method": "hyperloglog", "source": table, "confidence": 0.95,
+                               "error_columns": [f"{name}_error"]}
+
+    return df
+
+
+# ---------------------------------------------------
+# ENTRY POINT FOR run_query
+# ---------------------------------------------------
+
+def run_approximate(sql_query, params=None):
+
+    """DataFrame with <column>_error (95% half-widths) columns, or None when the SQL has no estimator"""
+
+    if not params:
+        df = sketch_answer(sql_query)
+        if df is not None:
+            return df
+
+    plan = approximate_plan(sql_query)
+
+    if plan is None:
+        return None
+
+    refresh_samples()
+
+    with pooled_connection() as conn:
+        df = pd.read_sql(text(plan.sql), conn, params=params or {})
+
+    return plan.finalize(df)
+
+
+# ---------------------------------------------------
+# REGISTRY AGGREGATES → T-DIGEST HISTOGRAMS / BOX PLOTS
+# ---------------------------------------------------
+
+def approximate_aggregate(spec):
+
+    """Box / histogram data from the maintained digests (same record shape as analytics.distributions), or None"""
+
+    column = spec.get("column")
+    key = (spec["table"], column)
+
+    if spec["type"] not in ("histogram", "box") or key not in QUANTILE_SKETCHES:
+        return None
+
+    if spec["type"] == "box" and spec.get("group") != QUANTILE_SKETCHES[key]:
+        return None
+
+    sketch_store.refresh()
+    digests = sketch_store.digests(*key)
+
+    if None not in digests:
+        return []
+
+    if spec["type"] == "histogram":
+        return digest_histogram(digests[None], spec.get("bins", "auto"), spec.get("range"))
+
+    return [digest_box(label, digest) for label, digest in sorted(digests.items(), key=lambda kv: str(kv[0])) if label is not None]
+
+
+def digest_histogram(digest, bins="auto", value_range=None):
+
+    from analytics.distributions import MAX_AUTO_BINS, MIN_AUTO_BINS
+
+    lo, hi = value_range or (digest.min, digest.max)
+
+    if bins == "auto":
+        iqr = digest.quantile(0.75) - digest.quantile(0.25)
+        width = 2 * iqr / digest.count ** (1 / 3)
+        bins = max(MIN_AUTO_BINS, min(MAX_AUTO_BINS, math.ceil((hi - lo) / width) if width > 0 else MIN_AUTO_BINS))
+
+    edges = np.linspace(lo, hi, bins + 1)
+    ranks = digest.cdf(edges)
+    counts = np.diff(ranks) * digest.count
+
+    # each edge's rank is uncertain by ± the covering centroid's half-weight
+    edge_errors = np.array([digest.rank_error(r) for r in ranks]) * digest.count
+
+    return [
+        {"bin_start": round(float(edges[i]), 6), "bin_end": round(float(edges[i + 1]), 6),
+         "count": int(round(counts[i])), "count_error": int(math.ceil(edge_errors[i] + edge_errors[i + 1]))}
+        for i in range(bins)
+    ]
+
+
+def digest_box(label, digest):
+
+    q1, median, q3 = (digest.quantile(q) for q in (0.25, 0.5, 0.75))
+
+    low_fence = q1 - 1.5 * (q3 - q1)
+    high_fence = q3 + 1.5 * (q3 - q1)
+
+    low_rank, high_rank = digest.cdf([low_fence, high_fence])
+
+    return {
+        "label": label,
+        "count": digest.count,
+        "min": digest.min,
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "max": digest.max,
+        "lower_whisker": max(digest.min, low_fence),
+        "upper_whisker": min(digest.max, high_fence),
+        "outliers": int(round((low_rank + 1 - high_rank) * digest.count)),
+        "outlier_sample": [],
+        "quantile_bounds": {
+            "q1": digest.quantile_bounds(0.25),
+            "median": digest.quantile_bounds(0.5),
+            "q3": digest.quantile_bounds(0.75),
+        },
+    }
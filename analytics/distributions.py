@@ -0,0 +1,322 @@
+import math
+from collections import defaultdict
+from sqlalchemy import text
+
+from database.db_engine import pooled_connection
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+FINE_BINS = 4096          # quantile search grid (exact values are fetched afterwards)
+MAX_AUTO_BINS = 100
+MIN_AUTO_BINS = 10
+OUTLIER_SAMPLE = 10       # per side, per group
+
+
+# ---------------------------------------------------
+# SQL HELPERS
+# ---------------------------------------------------
+
+def bucket_expr(conn, column, lo, width):
+
+    # integer bucket index; SQLite CAST truncates, Postgres CAST rounds → FLOOR
+    expr = f"({column} - {lo!r}) / {width!r}"
+
+    if conn.dialect.name == "sqlite":
+        return f"CAST({expr} AS INTEGER)"
+
+    return f"CAST(FLOOR({expr}) AS INTEGER)"
+
+
+def group_expr(group):
+    return group if group else "'all'"
+
+
+def column_stats(conn, source, column, group=None, params=None):
+
+    rows = conn.execute(text(f"""
+        SELECT {group_expr(group)} AS g, COUNT({column}) AS n, MIN({column}) AS lo, MAX({column}) AS hi
+        FROM {source}
+        GROUP BY {group_expr(group)}
+    """), params or {}).fetchall()
+
+    return {r.g: {"n": r.n, "lo": r.lo, "hi": r.hi} for r in rows if r.n}
+
+
+def bin_width(lo, hi, bins):
+    return (hi - lo) / bins if hi > lo else 1.0
+
+
+# ---------------------------------------------------
+# EXACT QUANTILES (HISTOGRAM SEARCH + SMALL FETCH)
+# ---------------------------------------------------
+
+def quantiles(conn, source, column, probs, group=None, stats=None, params=None):
+
+    """
+    Exact (numpy 'linear') quantiles per group in three passes:
+    group stats → FINE_BINS histogram → fetch only the buckets holding the target ranks.
+    """
+
+    params = params or {}
+    stats = stats or column_stats(conn, source, column, group, params)
+
+    if not stats:
+        return {}
+
+    lo = min(s["lo"] for s in stats.values())
+    hi = max(s["hi"] for s in stats.values())
+    width = bin_width(lo, hi, FINE_BINS)
+    bucket = bucket_expr(conn, column, lo, width)
+
+    counts = defaultdict(dict)
+
+    for r in conn.execute(text(f"""
+        SELECT {group_expr(group)} AS g, {bucket} AS b, COUNT(*) AS n
+        FROM {source}
+        WHERE {column} IS NOT NULL
+        GROUP BY {group_expr(group)}, {bucket}
+    """), params):
+        # the max value lands one past the last bucket
+        b = min(r.b, FINE_BINS - 1)
+        counts[r.g][b] = counts[r.g].get(b, 0) + r.n
+
+    # rank → (bucket, offset inside bucket)
+    targets = {}
+
+    for g, s in stats.items():
+
+        cumulative = []
+        running = 0
+
+        for b in sorted(counts[g]):
+            cumulative.append((b, running))
+            running += counts[g][b]
+
+        for p in probs:
+
+            position = p * (s["n"] - 1)
+
+            for rank in {math.floor(position), math.ceil(position)}:
+                for b, before in reversed(cumulative):
+                    if before <= rank:
+                        targets[(g, p, rank)] = (b, rank - before)
+                        break
+
+    needed = sorted({(g, b) for (g, _, _), (b, _) in targets.items()})
+
+    clauses = []
+    fetch_params = dict(params)
+
+    for i, (g, b) in enumerate(needed):
+
+        match = f"{bucket} >= :b{i}" if b == FINE_BINS - 1 else f"{bucket} = :b{i}"
+        fetch_params[f"b{i}"] = b
+
+        if group:
+            clauses.append(f"({group} = :g{i} AND {match})")
+            fetch_params[f"g{i}"] = g
+        else:
+            clauses.append(f"({match})")
+
+    values = defaultdict(list)
+
+    for r in conn.execute(text(f"""
+        SELECT {group_expr(group)} AS g, {bucket} AS b, {column} AS v
+        FROM {source}
+        WHERE {column} IS NOT NULL AND ({" OR ".join(clauses)})
+    """), fetch_params):
+        values[(r.g, min(r.b, FINE_BINS - 1))].append(r.v)
+
+    for key in values:
+        values[key].sort()
+
+    result = defaultdict(dict)
+
+    for g, s in stats.items():
+        for p in probs:
+
+            position = p * (s["n"] - 1)
+            low_rank, high_rank = math.floor(position), math.ceil(position)
+
+            b, offset = targets[(g, p, low_rank)]
+            low = values[(g, b)][offset]
+
+            b, offset = targets[(g, p, high_rank)]
+            high = values[(g, b)][offset]
+
+            result[g][p] = low + (high - low) * (position - low_rank)
+
+    return dict(result)
+
+
+# ---------------------------------------------------
+# HISTOGRAM
+# ---------------------------------------------------
+
+def histogram(source, column, bins="auto", value_range=None, params=None):
+
+    """Fixed (int) or Freedman–Diaconis ("auto") bins → [{bin_start, bin_end, count}]"""
+
+    with pooled_connection() as conn:
+
+        stats = column_stats(conn, source, column, params=params).get("all")
+
+        if not stats:
+            return []
+
+        lo, hi = value_range or (stats["lo"], stats["hi"])
+
+        if bins == "auto":
+
+            q = quantiles(conn, source, column, [0.25, 0.75], stats={"all": stats}, params=params)["all"]
+            fd_width = 2 * (q[0.75] - q[0.25]) / stats["n"] ** (1 / 3)
+
+            bins = math.ceil((hi - lo) / fd_width) if fd_width > 0 else MIN_AUTO_BINS
+            bins = max(MIN_AUTO_BINS, min(MAX_AUTO_BINS, bins))
+
+        width = bin_width(lo, hi, bins)
+        bucket = bucket_expr(conn, column, lo, width)
+
+        counts = [0] * bins
+
+        for r in conn.execute(text(f"""
+            SELECT {bucket} AS b, COUNT(*) AS n
+            FROM {source}
+            WHERE {column} >= :lo AND {column} <= :hi
+            GROUP BY {bucket}
+        """), {**(params or {}), "lo": lo, "hi": hi}):
+            counts[min(max(r.b, 0), bins - 1)] += r.n
+
+    return [
+        {"bin_start": round(lo + i * width, 6), "bin_end": round(lo + (i + 1) * width, 6), "count": n}
+        for i, n in enumerate(counts)
+    ]
+
+
+# ---------------------------------------------------
+# BOX PLOT (FIVE-NUMBER SUMMARY + OUTLIER SAMPLE)
+# ---------------------------------------------------
+
+def box_summary(source, column, group=None, outlier_sample=OUTLIER_SAMPLE, params=None):
+
+    with pooled_connection() as conn:
+
+        stats = column_stats(conn, source, column, group, params)
+        q = quantiles(conn, source, column, [0.25, 0.5, 0.75], group, stats, params)
+
+        summaries = []
+
+        for g in sorted(stats, key=str):
+
+            q1, median, q3 = q[g][0.25], q[g][0.5], q[g][0.75]
+            low_fence = q1 - 1.5 * (q3 - q1)
+            high_fence = q3 + 1.5 * (q3 - q1)
+
+            where = f"{group} = :g AND " if group else ""
+            fence_params = {**(params or {}), "g": g, "lf": low_fence, "hf": high_fence}
+
+            fences = conn.execute(text(f"""
+                SELECT MIN(CASE WHEN {column} >= :lf THEN {column} END) AS lower_whisker,
+                       MAX(CASE WHEN {column} <= :hf THEN {column} END) AS upper_whisker,
+                       SUM(CASE WHEN {column} < :lf OR {column} > :hf THEN 1 ELSE 0 END) AS outliers
+                FROM {source}
+                WHERE {where}{column} IS NOT NULL
+            """), fence_params).one()
+
+            high_outliers = conn.execute(text(f"""
+                SELECT {column} FROM {source} WHERE {where}{column} > :hf
+                ORDER BY {column} DESC LIMIT {int(outlier_sample)}
+            """), fence_params).scalars().all()
+
+            low_outliers = conn.execute(text(f"""
+                SELECT {column} FROM {source} WHERE {where}{column} < :lf
+                ORDER BY {column} LIMIT {int(outlier_sample)}
+            """), fence_params).scalars().all()
+
+            summaries.append({
+                "label": g,
+                "count": stats[g]["n"],
+                "min": stats[g]["lo"],
+                "q1": q1,
+                "median": median,
+                "q3": q3,
+                "max": stats[g]["hi"],
+                "lower_whisker": fences.lower_whisker,
+                "upper_whisker": fences.upper_whisker,
+                "outliers": int(fences.outliers or 0),
+                "outlier_sample": low_outliers + high_outliers,
+            })
+
+    return summaries
+
+
+# ---------------------------------------------------
+# 2-D DENSITY GRID (SCATTER REPLACEMENT)
+# ---------------------------------------------------
+
+def density_grid(source, x, y, x_bins=24, y_bins=20, params=None):
+
+    """Counts per (x, y) cell → [{x_start, x_end, y_start, y_end, count}] (non-empty cells)"""
+
+    with pooled_connection() as conn:
+
+        sx = column_stats(conn, source, x, params=params).get("all")
+        sy = column_stats(conn, source, y, params=params).get("all")
+
+        if not sx or not sy:
+            return []
+
+        x_width = bin_width(sx["lo"], sx["hi"], x_bins)
+        y_width = bin_width(sy["lo"], sy["hi"], y_bins)
+
+        bx = bucket_expr(conn, x, sx["lo"], x_width)
+        by = bucket_expr(conn, y, sy["lo"], y_width)
+
+        cells = defaultdict(int)
+
+        for r in conn.execute(text(f"""
+            SELECT {bx} AS bx, {by} AS by, COUNT(*) AS n
+            FROM {source}
+            WHERE {x} IS NOT NULL AND {y} IS NOT NULL
+            GROUP BY {bx}, {by}
+        """), params or {}):
+            cells[(min(r.bx, x_bins - 1), min(r.by, y_bins - 1))] += r.n
+
+    return [
+        {
+            "x_start": round(sx["lo"] + i * x_width, 6),
+            "x_end": round(sx["lo"] + (i + 1) * x_width, 6),
+            "y_start": round(sy["lo"] + j * y_width, 6),
+            "y_end": round(sy["lo"] + (j + 1) * y_width, 6),
+            "count": n,
+        }
+        for (i, j), n in sorted(cells.items())
+    ]
+
+
+# ---------------------------------------------------
+# REGISTRY ENTRY POINT
+# ---------------------------------------------------
+
+ENCODINGS = {"histogram": "bins", "box": "five_number_summary", "density": "grid"}
+
+
+def run_aggregate(spec, source=None, params=None):
+
+    """source → FROM-clause override for spec["table"] (e.g. a filtered derived table)"""
+
+    kind = spec["type"]
+    source = source or spec["table"]
+
+    if kind == "histogram":
+        return histogram(source, spec["column"], spec.get("bins", "auto"), spec.get("range"), params)
+
+    if kind == "box":
+        return box_summary(source, spec["column"], spec.get("group"), params=params)
+
+    if kind == "density":
+        return density_grid(source, spec["x"], spec["y"], spec.get("x_bins", 24), spec.get("y_bins", 20), params)
+
+    raise ValueError(f"Unknown aggregate type: {kind}")
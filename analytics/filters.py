@@ -0,0 +1,144 @@
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseModel
+
+# ---------------------------------------------------
+# FILTER PARAMETERS
+# ---------------------------------------------------
+
+class MetricFilters(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    personas: Optional[list[str]] = None
+    channels: Optional[list[str]] = None
+    cities: Optional[list[str]] = None
+    churn_min: Optional[float] = None
+    churn_max: Optional[float] = None
+
+    def values(self):
+
+        # unset filters drop out; lists sorted so equivalent requests share SQL + cache entries
+        return {
+            name: sorted(value) if isinstance(value, list) else value
+            for name, value in self.model_dump().items()
+            if value is not None
+        }
+
+    def shape(self):
+
+        """(name, list length | None) per set filter → what the compiled SQL depends on"""
+
+        return tuple(
+            (name, len(value) if isinstance(value, list) else None)
+            for name, value in self.values().items()
+        )
+
+    def params(self):
+
+        params = {}
+
+        for name, value in self.values().items():
+
+            if isinstance(value, list):
+                params.update({f"{name}_{i}": item for i, item in enumerate(value)})
+            elif isinstance(value, date):
+                params[name] = value.isoformat()
+            else:
+                params[name] = value
+
+        return params
+
+    def key(self):
+        return tuple((name, tuple(value) if isinstance(value, list) else value) for name, value in self.values().items())
+
+
+# ---------------------------------------------------
+# WHERE EACH FILTER APPLIES
+# ---------------------------------------------------
+
+# filter → column expression, per table (date filters hit the DATE(timestamp) expression indexes)
+TABLE_COLUMNS = {
+    "customers": {"personas": "persona", "cities": "city", "churn_min": "churn_risk", "churn_max": "churn_risk"},
+    "transactions": {"start_date": "DATE(timestamp)", "end_date": "DATE(timestamp)", "channels": "channel"},
+    "engagement_events": {"start_date": "DATE(timestamp)", "end_date": "DATE(timestamp)"},
+    "transaction_daily_rollup": {"start_date": "day", "end_date": "day", "channels": "channel"},
+    "engagement_daily_rollup": {"start_date": "day", "end_date": "day"},
+}
+
+# fact tables → customer filters become a semi-join on customer_id
+CUSTOMER_JOINS = {"transactions", "engagement_events"}
+
+OPERATORS = {"start_date": ">=", "end_date": "<=", "churn_min": ">=", "churn_max": "<="}
+
+FROM_TABLE = re.compile(r"\bFROM\s+(" + "|".join(TABLE_COLUMNS) + r")\b", re.IGNORECASE)
+
+
+def condition(name, size, column):
+
+    if size is None:
+        return f"{column} {OPERATORS[name]} :{name}"
+
+    if size == 0:
+        return "1 = 0"
+
+    return f"{column} IN ({', '.join(f':{name}_{i}' for i in range(size))})"
+
+
+def supports(table, shape):
+
+    """True when every filter in shape can be applied to table"""
+
+    columns = TABLE_COLUMNS[table]
+    joined = TABLE_COLUMNS["customers"] if table in CUSTOMER_JOINS else {}
+
+    return all(name in columns or name in joined for name, _ in shape)
+
+
+def supports_sql(sql, shape):
+    return all(supports(table.lower(), shape) for table in FROM_TABLE.findall(sql))
+
+
+# ---------------------------------------------------
+# COMPILATION (CACHED PER SQL / FILTER SHAPE)
+# ---------------------------------------------------
+
+@lru_cache(maxsize=256)
+def filtered_source(table, shape):
+
+    """
+    FROM-clause replacement for table: a derived table of the same name that
+    only holds filtered rows. Filters that don't apply to the table are ignored.
+    """
+
+    columns = TABLE_COLUMNS[table]
+
+    conditions = [condition(name, size, columns[name]) for name, size in shape if name in columns]
+
+    if table in CUSTOMER_JOINS:
+
+        customer_columns = TABLE_COLUMNS["customers"]
+        customer_conditions = [
+            condition(name, size, customer_columns[name]) for name, size in shape if name in customer_columns
+        ]
+
+        if customer_conditions:
+            conditions.append(
+                "customer_id IN (SELECT customer_id FROM customers WHERE " + " AND ".join(customer_conditions) + ")"
+            )
+
+    if not conditions:
+        return table
+
+    return f"(SELECT * FROM {table} WHERE {' AND '.join(conditions)}) AS {table}"
+
+
+@lru_cache(maxsize=1024)
+def compile_sql(sql, shape):
+
+    if not shape:
+        return sql
+
+    return FROM_TABLE.sub(lambda m: "FROM " + filtered_source(m.group(1).lower(), shape), sql)
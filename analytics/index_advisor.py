@@ -0,0 +1,134 @@
+import re
+from sqlalchemy import text
+
+from database.db_engine import engine
+from analytics.rollups import ROLLUPS, metric_sql
+from api.routes.analytics_routes import METRIC_REGISTRY
+
+# ---------------------------------------------------
+# PLAN CLASSIFICATION
+# ---------------------------------------------------
+
+# SQLite: "SCAN transactions" / "SCAN transactions USING COVERING INDEX ix_..."
+#         "SEARCH transactions USING INDEX ix_... (channel=?)"
+SQLITE_STEP = re.compile(r"^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX (\w+))?")
+
+# Postgres: "Seq Scan on transactions" / "Index Only Scan using ix_... on transactions"
+POSTGRES_STEP = re.compile(r"(Seq Scan|Index Only Scan|Index Scan|Bitmap Heap Scan)(?: using (\w+))? on (\w+)")
+
+# worst → best ("rollup_scan" → O(days × dimensions), independent of event volume)
+ACCESS_RANK = {"full_scan": 0, "covering_scan": 1, "index_scan": 2, "rollup_scan": 3, "index_seek": 4}
+
+
+def rollup_aware(steps):
+
+    for step in steps:
+        if step["table"] in ROLLUPS and step["access"] != "index_seek":
+            step["access"] = "rollup_scan"
+
+    return steps
+
+
+def classify_sqlite(plan_rows):
+
+    steps = []
+
+    for row in plan_rows:
+
+        detail = row[-1]
+        match = SQLITE_STEP.match(detail)
+
+        if not match:
+            continue
+
+        op, table, covering, index = match.groups()
+
+        if op == "SEARCH":
+            access = "index_seek"
+        elif index is None:
+            access = "full_scan"
+        elif covering:
+            access = "covering_scan"
+        else:
+            access = "index_scan"
+
+        steps.append({"table": table, "access": access, "index": index, "detail": detail})
+
+    return steps
+
+
+def classify_postgres(plan_rows):
+
+    steps = []
+
+    for row in plan_rows:
+
+        detail = row[0]
+        match = POSTGRES_STEP.search(detail)
+
+        if not match:
+            continue
+
+        op, index, table = match.groups()
+
+        access = {
+            "Seq Scan": "full_scan",
+            "Index Only Scan": "covering_scan",
+        }.get(op, "index_seek" if "Index Cond" in detail else "index_scan")
+
+        steps.append({"table": table, "access": access, "index": index, "detail": detail.strip()})
+
+    return steps
+
+
+def explain(sql, bind=engine):
+
+    with bind.connect() as conn:
+
+        if conn.dialect.name == "sqlite":
+            return rollup_aware(classify_sqlite(conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()))
+
+        return rollup_aware(classify_postgres(conn.execute(text(f"EXPLAIN {sql}")).fetchall()))
+
+
+# ---------------------------------------------------
+# ADVISOR
+# ---------------------------------------------------
+
+def advise(registry=METRIC_REGISTRY, bind=engine):
+
+    """EXPLAINs the SQL each registry metric is served with and reports its worst table access"""
+
+    report = []
+
+    for metric, config in registry.items():
+
+        try:
+            steps = explain(metric_sql(config, refresh=False), bind)
+        except Exception as e:
+            report.append({"metric": metric, "access": "error", "steps": [], "detail": str(e)})
+            continue
+
+        worst = min((s["access"] for s in steps), key=ACCESS_RANK.get, default="index_seek")
+
+        report.append({"metric": metric, "access": worst, "steps": steps})
+
+    return report
+
+
+def print_report(report):
+
+    print(f"{'METRIC':<30} {'ACCESS':<15} PLAN")
+
+    for entry in report:
+
+        plan = "; ".join(s["detail"] for s in entry["steps"]) or entry.get("detail", "")
+        print(f"{entry['metric']:<30} {entry['access']:<15} {plan}")
+
+    scans = [e["metric"] for e in report if e["access"] == "full_scan"]
+
+    print(f"\n{len(scans)}/{len(report)} metrics still full-scan a table" + (f": {', '.join(scans)}" if scans else ""))
+
+
+if __name__ == "__main__":
+    print_report(advise())
@@ -1,15 +1,32 @@
-import sqlite3
 import pandas as pd
+from sqlalchemy import text
 
-DB_PATH = "omni.db"
+from analytics.columnar import columnar_enabled, covers, run_columnar
+from database.db_engine import pooled_connection
 
-def run_query(sql_query):
+def run_query(sql_query, params=None, approximate=False):
 
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql(sql_query, conn)
-        conn.close()
-        return df
+        if approximate:
+            # sample / sketch estimate with <column>_error columns; None → no estimator, run exactly
+            from analytics.approximate import run_approximate
+
+            df = run_approximate(sql_query, params)
+
+            if df is not None:
+                return df
+
+        # ANALYTICS_BACKEND=duckdb → base-table SQL runs on the columnar mirror
+        if columnar_enabled() and covers(sql_query):
+            return run_columnar(sql_query, params)
+
+        # shared engine → pooled connections, works for SQLite and Postgres alike
+        with pooled_connection() as conn:
+            if params:
+                # bound filter parameters (plain strings stay as-is → no ':' parsing of LLM SQL)
+                return pd.read_sql(text(sql_query), conn, params=params)
+
+            return pd.read_sql(sql_query, conn)
 
     except Exception as e:
-        return f"SQL_ERROR: {str(e)}"
+        return f"SQL_ERROR: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+
+# ---------------------------------------------------
+# LRU CACHE WITH SINGLE-FLIGHT MISSES
+# ---------------------------------------------------
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+
+    """
+    Bounded LRU (entries + approximate bytes).
+
+    Concurrent misses on the same key wait for the first caller's
+    computation instead of running it again.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES,
+                 sizeof=None, cacheable=None):
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.cacheable = cacheable or (lambda value: True)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()     # key → (value, size)
+        self._inflight = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+
+        with self._lock:
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+
+            flight.done.wait()
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.value
+
+        try:
+            flight.value = compute()
+
+            if self.cacheable(flight.value):
+                self._store(key, flight.value)
+
+            return flight.value
+
+        except Exception as e:
+            flight.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _store(self, key, value):
+
+        size = self.sizeof(value)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+
+        with self._lock:
+
+            lookups = self.hits + self.misses + self.collapsed
+
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "collapsed": self.collapsed,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.collapsed) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ---------------------------------------------------
+# CACHED RESPONSE PAYLOADS
+# ---------------------------------------------------
+
+class CachedPayload:
+
+    """Response dict + its JSON encoding, built once per cache entry"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self._body = None
+
+    @property
+    def body(self):
+
+        if self._body is None:
+            self._body = json.dumps(self.payload, default=str).encode()
+
+        return self._body
+
+
+def payload_size(cached):
+
+    """Rough in-memory size of a {"data": [records]} response (+ its JSON body)"""
+
+    data = cached.payload.get("data") or []
+    width = len(data[0]) if data else 0
+
+    return 512 + len(data) * (64 + width * 56) * 2
+
+
+def is_cacheable(cached):
+    return "error" not in cached.payload
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from sqlalchemy import text
+
+from analytics.filters import supports_sql
+from database.db_engine import engine
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+USE_ROLLUPS = os.getenv("ANALYTICS_ROLLUPS", "1") == "1"
+
+# refreshes closer together than this are skipped (polling dashboards)
+REFRESH_INTERVAL_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "1"))
+
+
+# ---------------------------------------------------
+# ROLLUP DEFINITIONS
+# ---------------------------------------------------
+
+# :low < id <= :high is folded in; ON CONFLICT adds to the existing bucket
+ROLLUPS = {
+
+    "transaction_daily_rollup": {
+        "source": "transactions",
+        "id_column": "transaction_id",
+        "upsert": """
+            INSERT INTO transaction_daily_rollup (day, channel, product_name, revenue, transactions)
+            SELECT DATE(timestamp), COALESCE(channel, ''), COALESCE(product_name, ''),
+                   COALESCE(SUM(amount), 0), COUNT(*)
+            FROM transactions
+            WHERE transaction_id > :low AND transaction_id <= :high
+            GROUP BY DATE(timestamp), COALESCE(channel, ''), COALESCE(product_name, '')
+            ON CONFLICT (day, channel, product_name) DO UPDATE SET
+                revenue = transaction_daily_rollup.revenue + excluded.revenue,
+                transactions = transaction_daily_rollup.transactions + excluded.transactions
+        """
+    },
+
+    "engagement_daily_rollup": {
+        "source": "engagement_events",
+        "id_column": "event_id",
+        "upsert": """
+            INSERT INTO engagement_daily_rollup (day, channel, event_type, events)
+            SELECT DATE(timestamp), COALESCE(channel, ''), COALESCE(event_type, ''), COUNT(*)
+            FROM engagement_events
+            WHERE event_id > :low AND event_id <= :high
+            GROUP BY DATE(timestamp), COALESCE(channel, ''), COALESCE(event_type, '')
+            ON CONFLICT (day, channel, event_type) DO UPDATE SET
+                events = engagement_daily_rollup.events + excluded.events
+        """
+    }
+}
+
+
+# ---------------------------------------------------
+# INCREMENTAL REFRESH
+# ---------------------------------------------------
+
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+def refresh_rollup(conn, name):
+
+    config = ROLLUPS[name]
+
+    conn.execute(
+        text("INSERT INTO rollup_watermarks (rollup, last_id) VALUES (:name, 0) ON CONFLICT (rollup) DO NOTHING"),
+        {"name": name}
+    )
+
+    low = conn.execute(
+        text("SELECT last_id FROM rollup_watermarks WHERE rollup = :name"), {"name": name}
+    ).scalar()
+
+    high = conn.execute(
+        text(f"SELECT MAX({config['id_column']}) FROM {config['source']}")
+    ).scalar() or 0
+
+    if high <= low:
+        return 0
+
+    # optimistic lock → a concurrent refresher that already moved the mark wins
+    moved = conn.execute(
+        text("UPDATE rollup_watermarks SET last_id = :high WHERE rollup = :name AND last_id = :low"),
+        {"name": name, "low": low, "high": high}
+    ).rowcount
+
+    if not moved:
+        return 0
+
+    conn.execute(text(config["upsert"]), {"low": low, "high": high})
+
+    return high - low
+
+
+def refresh_rollups(force=False, bind=engine):
+
+    """
+    Folds rows above each high-water mark into the rollups.
+
+    Cost is O(new rows) (a PK range scan). Assumes ids become visible in
+    increasing order, which holds for SQLite's single writer.
+    """
+
+    global _last_refresh
+
+    with _refresh_lock:
+
+        if not force and time.monotonic() - _last_refresh < REFRESH_INTERVAL_SECONDS:
+            return {}
+
+        folded = {}
+
+        for name in ROLLUPS:
+            with bind.begin() as conn:
+                folded[name] = refresh_rollup(conn, name)
+
+        _last_refresh = time.monotonic()
+
+    return folded
+
+
+def rebuild_rollups(bind=engine):
+
+    with bind.begin() as conn:
+        for name in ROLLUPS:
+            conn.execute(text(f"DELETE FROM {name}"))
+            conn.execute(text("DELETE FROM rollup_watermarks WHERE rollup = :name"), {"name": name})
+
+    return refresh_rollups(force=True, bind=bind)
+
+
+# ---------------------------------------------------
+# METRIC ROUTING
+# ---------------------------------------------------
+
+def metric_sql(config, refresh=True, shape=()):
+
+    """
+    SQL that should serve a registry metric → its rollup_sql when one is defined
+    and can apply every filter in shape (customer attributes need the raw rows)
+    """
+
+    if not (USE_ROLLUPS and "rollup_sql" in config and supports_sql(config["rollup_sql"], shape)):
+        return config["sql"]
+
+    if refresh:
+        try:
+            refresh_rollups()
+        except Exception as e:
+            print("Rollup refresh failed → serving from raw tables:", str(e))
+            return config["sql"]
+
+    return config["rollup_sql"]
+
+
+if __name__ == "__main__":
+    print(rebuild_rollups())
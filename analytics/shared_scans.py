@@ -0,0 +1,80 @@
+# ---------------------------------------------------
+# SHARED SCANS
+# ---------------------------------------------------
+
+# One grouped pass per source table at the finest grain any batchable metric
+# needs. Metrics are then re-aggregated from it in memory (O(groups), not O(rows)).
+
+SHARED_SCANS = {
+
+    "transactions": {
+        "sql": """
+            SELECT DATE(timestamp) as date, channel, product_name, SUM(amount) as revenue
+            FROM transactions
+            GROUP BY DATE(timestamp), channel, product_name
+        """,
+        "rollup_sql": """
+            SELECT day as date, channel, product_name, revenue
+            FROM transaction_daily_rollup
+        """
+    },
+
+    "engagement_events": {
+        "sql": """
+            SELECT DATE(timestamp) as date, channel, event_type, COUNT(*) as events
+            FROM engagement_events
+            GROUP BY DATE(timestamp), channel, event_type
+        """,
+        "rollup_sql": """
+            SELECT day as date, channel, event_type, events
+            FROM engagement_daily_rollup
+        """
+    },
+
+    "customers": {
+        "sql": """
+            SELECT persona, preferred_channel, COUNT(*) as customers,
+                   SUM(churn_risk) as churn_sum, COUNT(churn_risk) as churn_n
+            FROM customers
+            GROUP BY persona, preferred_channel
+        """
+    }
+}
+
+
+# ---------------------------------------------------
+# FAN-OUT
+# ---------------------------------------------------
+
+def derive_metric(scan_df, spec):
+
+    """
+    Re-aggregates a shared scan into one metric's result shape.
+
+    spec = {
+        "scan": table,
+        "keys": {scan_column: output_column, ...},
+        "value": measure  |  (numerator, denominator),
+        "sort": (column, ascending)            # optional
+    }
+    """
+
+    keys = list(spec["keys"])
+    value = spec["value"]
+    measures = list(value) if isinstance(value, tuple) else [value]
+
+    grouped = scan_df.groupby(keys, sort=False, dropna=False)[measures].sum().reset_index()
+
+    if isinstance(value, tuple):
+        numerator, denominator = value
+        grouped["value"] = grouped[numerator] / grouped[denominator].where(grouped[denominator] != 0)
+    else:
+        grouped["value"] = grouped[value]
+
+    df = grouped[keys + ["value"]].rename(columns=spec["keys"])
+
+    if "sort" in spec:
+        column, ascending = spec["sort"]
+        df = df.sort_values(column, ascending=ascending, kind="stable")
+
+    return df.reset_index(drop=True)
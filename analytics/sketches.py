@@ -0,0 +1,188 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------
+# HASHING
+# ---------------------------------------------------
+
+def hash64(values):
+
+    """Stable 64-bit hashes for any column (ints, strings, mixed) → np.uint64"""
+
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+# ---------------------------------------------------
+# HYPERLOGLOG (DISTINCT COUNTS)
+# ---------------------------------------------------
+
+class HyperLogLog:
+
+    """2^p one-byte registers; relative standard error ≈ 1.04 / sqrt(2^p)"""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, values):
+
+        if len(values) == 0:
+            return
+
+        hashes = hash64(values)
+
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+
+        # rank = position of the leftmost 1-bit in the remaining 64 - p bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.p) - bit_length + 1
+
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        self.registers = np.maximum(self.registers, other.registers)
+        return self
+
+    def estimate(self):
+
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+
+        # small cardinalities → linear counting is far more accurate
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)
+
+        return raw
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def summary(self):
+
+        estimate = self.estimate()
+        error = 1.96 * self.relative_error * estimate
+
+        return {"estimate": round(estimate), "error": round(error), "confidence": 0.95}
+
+
+# ---------------------------------------------------
+# T-DIGEST (QUANTILES)
+# ---------------------------------------------------
+
+class TDigest:
+
+    """
+    Merging t-digest with the k1 (arcsine) scale function: centroids are
+    small near the tails, so extreme quantiles stay accurate.
+    """
+
+    def __init__(self, compression=200, buffer_size=20_000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        if not len(values):
+            return
+
+        self.buffer.append(values)
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        if sum(len(b) for b in self.buffer) >= self.buffer_size:
+            self._compress()
+
+    def _compress(self):
+
+        if not self.buffer:
+            return
+
+        means = np.concatenate([self.means] + self.buffer)
+        weights = np.concatenate([self.weights] + [np.ones(len(b)) for b in self.buffer])
+        self.buffer = []
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+
+        # every point lands in the unit-sized k bucket of its cumulative position
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q_mid - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+
+        starts = np.flatnonzero(np.r_[True, np.diff(bucket) != 0])
+
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def _centroids(self):
+        self._compress()
+        return self.means, self.weights
+
+    def quantile(self, q):
+
+        means, weights = self._centroids()
+
+        if not len(means):
+            return None
+
+        if len(means) == 1:
+            return float(means[0])
+
+        # centroid centres sit at the middle of their cumulative weight
+        centres = (np.cumsum(weights) - weights / 2) / self.count
+        points = np.r_[0.0, centres, 1.0]
+        values = np.r_[self.min, means, self.max]
+
+        return float(np.interp(q, points, values))
+
+    def cdf(self, x):
+
+        means, weights = self._centroids()
+
+        if not len(means):
+            return np.zeros_like(np.asarray(x, dtype=np.float64))
+
+        centres = (np.cumsum(weights) - weights / 2) / self.count
+        points = np.r_[self.min, means, self.max]
+        ranks = np.r_[0.0, centres, 1.0]
+
+        return np.interp(x, points, ranks)
+
+    def rank_error(self, q):
+
+        """Half the weight (as a fraction of n) of the centroid covering q → bound on rank error"""
+
+        means, weights = self._centroids()
+
+        if not len(means):
+            return 0.0
+
+        index = min(np.searchsorted(np.cumsum(weights) / self.count, q), len(weights) - 1)
+
+        return float(weights[index] / self.count / 2)
+
+    def quantile_bounds(self, q):
+
+        error = self.rank_error(q)
+
+        return [self.quantile(max(0.0, q - error)), self.quantile(min(1.0, q + error))]
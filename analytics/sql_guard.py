@@ -0,0 +1,321 @@
+import os
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import pandas as pd
+
+from analytics.columnar import columnar_enabled, covers, run_columnar
+from analytics.index_advisor import SQLITE_STEP, classify_postgres
+from database.db_engine import pooled_connection
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+GUARD_MAX_ROWS = int(os.getenv("SQL_GUARD_MAX_ROWS", "5000"))
+GUARD_TIMEOUT_SECONDS = float(os.getenv("SQL_GUARD_TIMEOUT_SECONDS", "5"))
+
+# estimated rows visited by table scans (nested-loop scans multiply)
+GUARD_MAX_SCAN_ROWS = int(os.getenv("SQL_GUARD_MAX_SCAN_ROWS", "5000000"))
+
+# SQLite VM instructions between deadline checks
+PROGRESS_STEPS = 10_000
+
+
+# ---------------------------------------------------
+# STRUCTURED ERRORS
+# ---------------------------------------------------
+
+class GuardError(Exception):
+
+    """code → "invalid_statement" | "read_only" | "cost_exceeded" | "timeout" | "execution_error" """
+
+    def __init__(self, code, message, **detail):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.detail = detail
+
+    def as_dict(self):
+        return {"code": self.code, "message": self.message, **self.detail}
+
+
+def classify_error(e, timeout):
+
+    message = str(getattr(e, "orig", None) or e)
+    lowered = message.lower()
+
+    if "interrupted" in lowered or "statement timeout" in lowered:
+        return GuardError("timeout", f"Query exceeded the {timeout:g}s time limit", timeout_seconds=timeout)
+
+    if "not authorized" in lowered or "readonly" in lowered or "read-only" in lowered:
+        return GuardError("read_only", "Only read-only SELECT statements are allowed", detail=message)
+
+    return GuardError("execution_error", message)
+
+
+# ---------------------------------------------------
+# STATEMENT SHAPING
+# ---------------------------------------------------
+
+def single_statement(sql_query):
+
+    statement = sql_query.strip().rstrip(";").strip()
+
+    if not statement:
+        raise GuardError("invalid_statement", "Empty SQL statement")
+
+    if ";" in statement:
+        raise GuardError("invalid_statement", "Only a single SQL statement is allowed")
+
+    return statement
+
+
+def limit_statement(statement, max_rows):
+
+    # one extra row → tells a capped result apart from one that fits exactly
+    return f"SELECT * FROM ({statement}) AS guarded_result LIMIT {int(max_rows) + 1}"
+
+
+# ---------------------------------------------------
+# PRE-FLIGHT COST CHECK
+# ---------------------------------------------------
+
+def resolve_table(statement, name, tables):
+
+    """Plan steps name aliases ("SCAN t") → the table written before that alias"""
+
+    if name.lower() in tables:
+        return name.lower()
+
+    for candidate in re.findall(rf"\b(\w+)\s+(?:AS\s+)?{re.escape(name)}\b", statement, re.IGNORECASE):
+        if candidate.lower() in tables:
+            return candidate.lower()
+
+    return None
+
+
+def sqlite_table_rows(raw, table):
+
+    try:
+        stat = raw.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)).fetchone()
+        if stat:
+            return int(stat[0].split()[0])
+    except sqlite3.Error:
+        pass
+
+    try:
+        # rowid tables → MAX(rowid) is an O(log n) upper bound
+        return raw.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    except sqlite3.Error:
+        return None
+
+
+def estimate_sqlite(raw, statement):
+
+    """
+    Rows visited by SCAN steps. Steps sharing a parent are nested loops (multiply);
+    separate subqueries run on their own (add).
+    """
+
+    tables = {row[0].lower() for row in raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    loops = defaultdict(list)
+
+    for _, parent, _, detail in raw.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall():
+
+        match = SQLITE_STEP.match(detail)
+
+        if match and match.group(1) == "SCAN":
+            loops[parent].append((match.group(2), detail))
+
+    estimate = 0
+    scans = []
+
+    for steps in loops.values():
+
+        cost = 1
+
+        for name, detail in steps:
+
+            table = resolve_table(statement, name, tables)
+            rows = sqlite_table_rows(raw, table) if table else None
+
+            scans.append({"table": table, "rows": rows, "detail": detail})
+            cost *= max(rows or 1, 1)
+
+        estimate += cost
+
+    return estimate, scans
+
+
+def estimate_postgres(conn, statement):
+
+    steps = classify_postgres(conn.exec_driver_sql(f"EXPLAIN {statement}").fetchall())
+
+    scans = []
+
+    for step in steps:
+        if step["access"] == "full_scan":
+            rows = conn.exec_driver_sql(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %(table)s", {"table": step["table"]}
+            ).scalar()
+            scans.append({"table": step["table"], "rows": rows, "detail": step["detail"]})
+
+    return max([s["rows"] or 0 for s in scans], default=0), scans
+
+
+def check_cost(estimate, scans, max_scan_rows):
+
+    if estimate > max_scan_rows:
+        raise GuardError(
+            "cost_exceeded",
+            f"Query would scan ~{estimate:,} rows (limit {max_scan_rows:,}); add filters or aggregate",
+            estimated_rows=estimate,
+            max_scan_rows=max_scan_rows,
+            scans=scans
+        )
+
+
+# ---------------------------------------------------
+# SANDBOXES
+# ---------------------------------------------------
+
+READ_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+
+
+def authorize_read(action, *args):
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+@contextmanager
+def sqlite_sandbox(conn, timeout):
+
+    """query_only + SELECT-only authorizer + progress-handler deadline on the pooled connection"""
+
+    raw = conn.connection.driver_connection
+    deadline = time.monotonic() + timeout
+
+    raw.execute("PRAGMA query_only = ON")
+    raw.set_authorizer(authorize_read)
+    raw.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, PROGRESS_STEPS)
+
+    try:
+        yield raw
+
+    finally:
+        # pooled connection goes back to writers → undo everything
+        raw.set_progress_handler(None, 0)
+        raw.set_authorizer(None)
+        raw.execute("PRAGMA query_only = OFF")
+
+
+@contextmanager
+def postgres_sandbox(conn, timeout):
+
+    txn = conn.begin()
+
+    try:
+        conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+        yield conn
+
+    finally:
+        txn.rollback()
+
+
+# ---------------------------------------------------
+# GUARDED EXECUTION
+# ---------------------------------------------------
+
+def run_sandboxed(statement, limited, timeout, max_scan_rows):
+
+    with pooled_connection() as conn:
+
+        if conn.dialect.name == "sqlite":
+            with sqlite_sandbox(conn, timeout) as raw:
+                estimate, scans = estimate_sqlite(raw, statement)
+                check_cost(estimate, scans, max_scan_rows)
+                return pd.read_sql(limited, raw), estimate
+
+        with postgres_sandbox(conn, timeout):
+            estimate, scans = estimate_postgres(conn, statement)
+            check_cost(estimate, scans, max_scan_rows)
+            return pd.read_sql(limited, conn), estimate
+
+
+def guarded_query(sql_query, max_rows=GUARD_MAX_ROWS, timeout=GUARD_TIMEOUT_SECONDS, max_scan_rows=GUARD_MAX_SCAN_ROWS,
+                  approximate=False):
+
+    """
+    Runs untrusted (LLM-generated) SQL → DataFrame capped at max_rows.
+    df.attrs["guard"] reports the cap and cost estimate. Raises GuardError.
+    approximate → aggregates over the samples (analytics/approximate.py) when the SQL allows it.
+    """
+
+    statement = single_statement(sql_query)
+    plan = None
+
+    if approximate:
+        from analytics.approximate import approximate_plan, refresh_samples
+
+        plan = approximate_plan(statement)
+
+        if plan is not None:
+            # sample upkeep writes → must happen outside the read-only sandbox
+            refresh_samples()
+            statement = plan.sql
+
+    limited = limit_statement(statement, max_rows)
+
+    started = time.perf_counter()
+
+    try:
+        if columnar_enabled() and covers(statement):
+            # separate read-only copy, vectorised scans → row cap + interrupt deadline, no scan pre-flight
+            estimate = None
+            df = run_columnar(limited, timeout=timeout)
+
+        else:
+            df, estimate = run_sandboxed(statement, limited, timeout, max_scan_rows)
+
+    except GuardError:
+        raise
+
+    except Exception as e:
+        raise classify_error(e, timeout) from e
+
+    if plan is not None:
+        df = plan.finalize(df)
+
+    truncated = len(df) > max_rows
+
+    if truncated:
+        df = df.iloc[:max_rows]
+
+    df.attrs["guard"] = {
+        "rows": len(df),
+        "truncated": truncated,
+        "max_rows": max_rows,
+        "estimated_scan_rows": estimate,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+    return df
+
+
+def run_guarded_query(sql_query, **limits):
+
+    """run_query counterpart for generated SQL → DataFrame, or a structured error dict"""
+
+    try:
+        return guarded_query(sql_query, **limits)
+    except GuardError as e:
+        return e.as_dict()
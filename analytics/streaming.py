@@ -0,0 +1,302 @@
+import importlib.util
+import io
+import json
+import os
+from sqlalchemy import text
+
+from database.db_engine import pooled_connection
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "10000"))
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+ARROW = "application/vnd.apache.arrow.stream"
+SSE = "text/event-stream"
+
+MEDIA_ALIASES = {
+    "application/json": JSON,
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "application/vnd.apache.arrow.stream": ARROW,
+    "application/vnd.apache.arrow": ARROW,
+}
+
+# Arrow is only offered when pyarrow is installed
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Postgres type OIDs (cursor.description type_code) → Arrow types the driver's Python values
+# convert to exactly. Anything else (SQLite, NUMERIC, JSON, ...) is inferred from the rows.
+DECLARED_ARROW_TYPES = {
+    16: "bool_",
+    20: "int64", 21: "int64", 23: "int64",
+    700: "float64", 701: "float64",
+    25: "string", 1042: "string", 1043: "string",
+    1082: "date32",
+}
+
+
+# ---------------------------------------------------
+# CONTENT NEGOTIATION
+# ---------------------------------------------------
+
+def negotiate(accept):
+
+    """Accept header → JSON | NDJSON | ARROW (highest q wins, JSON when nothing matches)"""
+
+    offers = []
+
+    for position, part in enumerate((accept or "").split(",")):
+
+        media, *options = [p.strip() for p in part.split(";")]
+        quality = 1.0
+
+        for option in options:
+            name, _, value = option.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        media = MEDIA_ALIASES.get(media.lower())
+
+        if media and quality > 0 and (media != ARROW or ARROW_AVAILABLE):
+            offers.append((-quality, position, media))
+
+    return min(offers)[2] if offers else JSON
+
+
+# ---------------------------------------------------
+# ROW SOURCES
+# ---------------------------------------------------
+
+def declared_types(result):
+
+    """Arrow type name per column from the cursor description, None where the driver declares nothing usable"""
+
+    description = getattr(result.cursor, "description", None) or []
+
+    return [DECLARED_ARROW_TYPES.get(column[1]) if isinstance(column[1], int) else None for column in description]
+
+
+def query_batches(sql_query, params=None, batch_rows=STREAM_BATCH_ROWS):
+
+    """
+    Generator → first (column names, declared types) (query already executed),
+    then lists of row tuples as the cursor yields them. The pooled connection
+    is held until the generator is exhausted or closed.
+    """
+
+    with pooled_connection() as conn:
+
+        conn = conn.execution_options(stream_results=True)
+
+        if params:
+            result = conn.execute(text(sql_query), params)
+        else:
+            # same as run_query → no ':' bind parsing of generated SQL
+            result = conn.exec_driver_sql(sql_query)
+
+        columns = list(result.keys())
+        types = declared_types(result)
+
+        yield columns, types if len(types) == len(columns) else [None] * len(columns)
+
+        while True:
+
+            rows = result.fetchmany(batch_rows)
+
+            if not rows:
+                break
+
+            yield rows
+
+
+def open_query_stream(sql_query, params=None, batch_rows=STREAM_BATCH_ROWS):
+
+    """(columns, declared types, row batches) → SQL errors raise here, before any response bytes are sent"""
+
+    batches = query_batches(sql_query, params, batch_rows)
+    columns, types = next(batches)
+
+    return columns, types, batches
+
+
+def record_batches(records, columns, batch_rows=STREAM_BATCH_ROWS):
+
+    for start in range(0, len(records), batch_rows):
+        yield [tuple(row.get(c) for c in columns) for row in records[start:start + batch_rows]]
+
+
+# ---------------------------------------------------
+# ENCODERS
+# ---------------------------------------------------
+
+def ndjson_stream(header, columns, batches):
+
+    """Header line (metadata + columns) followed by one JSON object per row"""
+
+    yield (json.dumps({**header, "columns": columns}, default=str) + "\n").encode()
+
+    encode = json.JSONEncoder(default=str).encode
+
+    for rows in batches:
+        yield "".join(encode(dict(zip(columns, row))) + "\n" for row in rows).encode()
+
+
+def ndjson_frame(header, df, batch_rows=STREAM_BATCH_ROWS):
+
+    """DataFrame → NDJSON, each chunk encoded by pandas instead of per-row dicts"""
+
+    yield (json.dumps({**header, "columns": list(df.columns)}, default=str) + "\n").encode()
+
+    for start in range(0, len(df), batch_rows):
+        chunk = df.iloc[start:start + batch_rows].to_json(orient="records", lines=True, date_format="iso")
+        yield (chunk if chunk.endswith("\n") else chunk + "\n").encode()
+
+
+def arrow_metadata(header):
+    return {key: json.dumps(value, default=str) for key, value in header.items()}
+
+
+def _drain(sink):
+
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate(0)
+
+    return chunk
+
+
+def promote(name, types):
+
+    """Arrow types one column took across batches → the type that holds all of them (null → T, int64 → float64)"""
+
+    import pyarrow as pa
+
+    resolved = pa.null()
+
+    for t in types:
+
+        if t == resolved or pa.types.is_null(t):
+            continue
+
+        if pa.types.is_null(resolved):
+            resolved = t
+        elif {resolved, t} == {pa.int64(), pa.float64()}:
+            resolved = pa.float64()
+        else:
+            raise TypeError(f"Column {name!r} has no single Arrow type ({resolved} vs {t})")
+
+    return resolved
+
+
+def arrow_batches(header, columns, batches, types=None):
+
+    """
+    → (schema, record batches). Columns with a declared type stream as they are
+    fetched. Otherwise every batch is converted first and each column promoted
+    across all of them, so a later batch never gets cast into the first one's
+    types. Rows that fit no single type raise here, before any response bytes.
+    """
+
+    import pyarrow as pa
+
+    declared = [getattr(pa, t)() if t else None for t in (types or [None] * len(columns))]
+    metadata = arrow_metadata(header)
+
+    def to_arrays(rows):
+        return [pa.array(list(values), type=t) for values, t in zip(zip(*rows), declared)]
+
+    if columns and all(declared):
+
+        schema = pa.schema([pa.field(name, t) for name, t in zip(columns, declared)], metadata=metadata)
+
+        return schema, (pa.record_batch(to_arrays(rows), schema=schema) for rows in batches if rows)
+
+    # inferred per batch (columnar, not Python rows), then unified
+    converted = [to_arrays(rows) for rows in batches if rows]
+
+    schema = pa.schema(
+        [pa.field(name, promote(name, [arrays[i].type for arrays in converted])) for i, name in enumerate(columns)],
+        metadata=metadata
+    )
+
+    # safe casts only (e.g. an int64 beyond float64 precision raises)
+    record_batches = [
+        pa.record_batch([a.cast(f.type) for a, f in zip(arrays, schema)], schema=schema) for arrays in converted
+    ]
+
+    return schema, record_batches
+
+
+def arrow_stream(header, columns, batches, types=None):
+
+    """
+    Arrow IPC stream, one record batch per cursor batch; the schema carries the
+    header as JSON-encoded metadata. Not a generator → type errors raise on call.
+    """
+
+    import pyarrow as pa
+
+    schema, record_batches = arrow_batches(header, columns, batches, types)
+
+    def body():
+
+        sink = io.BytesIO()
+
+        with pa.ipc.new_stream(sink, schema) as writer:
+
+            yield _drain(sink)
+
+            for batch in record_batches:
+                writer.write_batch(batch)
+                yield _drain(sink)
+
+        yield _drain(sink)
+
+    return body()
+
+
+def arrow_frame(header, df, batch_rows=STREAM_BATCH_ROWS):
+
+    """DataFrame → Arrow IPC stream (columnar conversion, no Python rows)"""
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(arrow_metadata(header))
+
+    sink = io.BytesIO()
+
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+            yield _drain(sink)
+
+    yield _drain(sink)
+
+
+def sse_stream(events):
+
+    """(event, payload) pairs → Server-Sent Events; a failure mid-stream becomes an "error" event"""
+
+    try:
+        for event, payload in events:
+            yield f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n".encode()
+
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'code': 'stream_error', 'message': str(e)})}\n\n".encode()
+
+
+def encode_stream(media, header, columns, batches, types=None):
+    return arrow_stream(header, columns, batches, types) if media == ARROW else ndjson_stream(header, columns, batches)
+
+
+def encode_frame(media, header, df):
+    return arrow_frame(header, df) if media == ARROW else ndjson_frame(header, df)
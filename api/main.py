@@ -1,14 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Literal
 
-from core.agents.insight_agent import ask_with_data
-from core.agents.war_room_agent import run_war_room
+from core.agents.insight_agent import ask_with_data, ask_with_data_events
+from core.agents.war_room_agent import run_war_room, war_room_events
+from core.agents.chart_formatter import normalize_chart_frame
 from api.routes.analytics_routes import router as analytics_router
+from analytics.streaming import JSON, SSE, encode_frame, negotiate, sse_stream
+from core.llm.gateway import llm_stats
+from core.agents.sql_cache import sql_cache
+from core.agents.insight_cache import insight_cache
+from core.agents.metric_matcher import fast_path
 
 # Database
-from database.db_engine import engine
-from database.models import Base
+from database.migrations import apply_migrations
 
 # Seed logic
 from utils.data_generator import generate_data
@@ -54,7 +61,7 @@ def startup_event():
     print("System Booting...")
 
     try:
-        Base.metadata.create_all(bind=engine)
+        apply_migrations()
         print("Database schema verified")
 
         print("Startup Completed")
@@ -68,11 +75,11 @@ def startup_event():
 # =====================================================
 
 @app.get("/seed")
-def seed_data():
+def seed_data(mode: str = "orm"):
 
     try:
-        generate_data()
-        return {"status": "Demo data generated ✅"}
+        stats = generate_data(mode)
+        return {"status": "Demo data generated ✅", "stats": stats}
 
     except Exception as e:
         return {"error": str(e)}
@@ -92,6 +99,11 @@ app.include_router(analytics_router)
 class QueryRequest(BaseModel):
     query: str
     market_context: str | None = None
+    approximate: bool = False
+
+
+class WarRoomRequest(QueryRequest):
+    mode: Literal["parallel", "single"] | None = None      # default: WAR_ROOM_MODE
 
 
 # =====================================================
@@ -108,16 +120,56 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/llm/stats")
+def llm_gateway_stats():
+    return llm_stats()
+
+
+@app.get("/llm/sql-cache")
+def sql_cache_stats():
+    return sql_cache.stats()
+
+
+@app.get("/llm/insight-cache")
+def insight_cache_stats():
+    return insight_cache.stats()
+
+
+@app.get("/llm/fast-path")
+def fast_path_stats():
+    return fast_path.stats()
+
+
+# =====================================================
+# STREAMING ENCODINGS (Accept: Arrow IPC / NDJSON)
+# =====================================================
+
+def stream_agent_response(response, media):
+
+    # chart rows go out columnar; everything else rides in the header / schema metadata
+    df = response.pop("data")
+
+    if df is None:
+        df = normalize_chart_frame(None)
+
+    return StreamingResponse(encode_frame(media, response, df), media_type=media)
+
+
 # =====================================================
 # SINGLE AGENT ENDPOINT
 # =====================================================
 
 @app.post("/agent/lab")
-def agent_lab(req: QueryRequest):
+def agent_lab(req: QueryRequest, request: Request):
 
     print("Tactical Agent Activated")
 
-    return ask_with_data(req.query)
+    media = negotiate(request.headers.get("accept"))
+
+    if media != JSON:
+        return stream_agent_response(ask_with_data(req.query, as_frame=True, approximate=req.approximate), media)
+
+    return ask_with_data(req.query, approximate=req.approximate)
 
 
 # =====================================================
@@ -125,8 +177,44 @@ def agent_lab(req: QueryRequest):
 # =====================================================
 
 @app.post("/agent/warroom")
-def agent_warroom(req: QueryRequest):
+def agent_warroom(req: WarRoomRequest, request: Request):
 
     print("War Room Activated")
 
-    return run_war_room(req.query, req.market_context)
\ No newline at end of file
+    media = negotiate(request.headers.get("accept"))
+
+    if media != JSON:
+        return stream_agent_response(
+            run_war_room(req.query, req.market_context, as_frame=True, approximate=req.approximate, mode=req.mode),
+            media
+        )
+
+    return run_war_room(req.query, req.market_context, approximate=req.approximate, mode=req.mode)
+
+
+# =====================================================
+# SERVER-SENT EVENTS (STAGES AS THEY COMPLETE)
+# =====================================================
+
+# no proxy buffering → each stage reaches the client as soon as it is yielded
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.post("/agent/lab/stream")
+def agent_lab_stream(req: QueryRequest):
+
+    print("Tactical Agent Activated (stream)")
+
+    events = ask_with_data_events(req.query, req.market_context, approximate=req.approximate)
+
+    return StreamingResponse(sse_stream(events), media_type=SSE, headers=SSE_HEADERS)
+
+
+@app.post("/agent/warroom/stream")
+def agent_warroom_stream(req: WarRoomRequest):
+
+    print("War Room Activated (stream)")
+
+    events = war_room_events(req.query, req.market_context, approximate=req.approximate, mode=req.mode)
+
+    return StreamingResponse(sse_stream(events), media_type=SSE, headers=SSE_HEADERS)
\ No newline at end of file
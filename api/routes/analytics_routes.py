@@ -1,17 +1,51 @@
-from fastapi import APIRouter
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from analytics.approximate import approximate_aggregate
+from analytics.distributions import ENCODINGS, run_aggregate
+from analytics.filters import MetricFilters, compile_sql, filtered_source
 from analytics.query_engine import run_query
+from analytics.result_cache import CachedPayload, ResultCache, payload_size, is_cacheable
+from analytics.rollups import metric_sql
+from analytics.shared_scans import SHARED_SCANS, derive_metric
+from analytics.streaming import JSON, encode_stream, negotiate, open_query_stream, record_batches
+from database.data_version import data_version
+from database.db_engine import get_pool_stats
 
 router = APIRouter()
 
 class AnalyticsRequest(BaseModel):
     metric: str
+    filters: Optional[MetricFilters] = None
+    approximate: bool = False
+
+
+class BatchAnalyticsRequest(BaseModel):
+    metrics: list[str]
+    filters: Optional[MetricFilters] = None
+    approximate: bool = False
 
 
 # =========================================================
 # METRIC REGISTRY  (THIS = YOUR DASHBOARD LOGIC)
 # =========================================================
 
+# "rollup_sql" → same result shape served from the daily rollup tables
+# "batch"      → how /analytics/batch derives the metric from its table's shared scan
+# "aggregate"  → raw-row charts binned / summarised in the database (constant-size payload)
+#
+# Filters (analytics/filters.py) swap each "FROM <table>" for a filtered derived table,
+# so registry SQL stays unfiltered and shape-independent.
+#
+# approximate=True (analytics/approximate.py) answers raw-table SQL from the stratified
+# samples and box / histogram aggregates from t-digests, with "<column>_error" bounds.
+# Rollup-backed metrics are already exact and cheap, so they ignore the flag.
+
 METRIC_REGISTRY = {
 
     # ---------------- REVENUE ----------------
@@ -23,6 +57,13 @@ METRIC_REGISTRY = {
             GROUP BY DATE(timestamp)
             ORDER BY DATE(timestamp)
         """,
+        "rollup_sql": """
+            SELECT day as date, SUM(revenue) as value
+            FROM transaction_daily_rollup
+            GROUP BY day
+            ORDER BY day
+        """,
+        "batch": {"scan": "transactions", "keys": {"date": "date"}, "value": "revenue", "sort": ("date", True)},
         "chart": "line"
     },
 
@@ -32,6 +73,12 @@ METRIC_REGISTRY = {
             FROM transactions
             GROUP BY channel
         """,
+        "rollup_sql": """
+            SELECT channel as label, SUM(revenue) as value
+            FROM transaction_daily_rollup
+            GROUP BY channel
+        """,
+        "batch": {"scan": "transactions", "keys": {"channel": "label"}, "value": "revenue"},
         "chart": "pie"
     },
 
@@ -40,6 +87,7 @@ METRIC_REGISTRY = {
             SELECT amount
             FROM transactions
         """,
+        "aggregate": {"type": "histogram", "table": "transactions", "column": "amount", "bins": "auto"},
         "chart": "histogram"
     },
 
@@ -48,6 +96,7 @@ METRIC_REGISTRY = {
             SELECT channel, amount
             FROM transactions
         """,
+        "aggregate": {"type": "box", "table": "transactions", "column": "amount", "group": "channel"},
         "chart": "box"
     },
 
@@ -60,6 +109,13 @@ METRIC_REGISTRY = {
             GROUP BY product_name
             ORDER BY value DESC
         """,
+        "rollup_sql": """
+            SELECT product_name as label, SUM(revenue) as value
+            FROM transaction_daily_rollup
+            GROUP BY product_name
+            ORDER BY value DESC
+        """,
+        "batch": {"scan": "transactions", "keys": {"product_name": "label"}, "value": "revenue", "sort": ("value", False)},
         "chart": "bar"
     },
 
@@ -69,6 +125,12 @@ METRIC_REGISTRY = {
             FROM transactions
             GROUP BY product_name, channel
         """,
+        "rollup_sql": """
+            SELECT product_name, channel, SUM(revenue) as value
+            FROM transaction_daily_rollup
+            GROUP BY product_name, channel
+        """,
+        "batch": {"scan": "transactions", "keys": {"product_name": "product_name", "channel": "channel"}, "value": "revenue"},
         "chart": "heatmap"
     },
 
@@ -80,6 +142,7 @@ METRIC_REGISTRY = {
             FROM customers
             GROUP BY persona
         """,
+        "batch": {"scan": "customers", "keys": {"persona": "label"}, "value": "customers"},
         "chart": "bar"
     },
 
@@ -88,6 +151,7 @@ METRIC_REGISTRY = {
             SELECT churn_risk
             FROM customers
         """,
+        "aggregate": {"type": "histogram", "table": "customers", "column": "churn_risk", "bins": 20, "range": (0.0, 1.0)},
         "chart": "histogram"
     },
 
@@ -96,6 +160,7 @@ METRIC_REGISTRY = {
             SELECT age, churn_risk
             FROM customers
         """,
+        "aggregate": {"type": "density", "table": "customers", "x": "age", "y": "churn_risk", "x_bins": 24, "y_bins": 20},
         "chart": "scatter"
     },
 
@@ -105,6 +170,7 @@ METRIC_REGISTRY = {
             FROM customers
             GROUP BY persona, preferred_channel
         """,
+        "batch": {"scan": "customers", "keys": {"persona": "persona", "preferred_channel": "preferred_channel"}, "value": ("churn_sum", "churn_n")},
         "chart": "heatmap"
     },
 
@@ -116,6 +182,12 @@ METRIC_REGISTRY = {
             FROM engagement_events
             GROUP BY event_type
         """,
+        "rollup_sql": """
+            SELECT event_type as label, SUM(events) as value
+            FROM engagement_daily_rollup
+            GROUP BY event_type
+        """,
+        "batch": {"scan": "engagement_events", "keys": {"event_type": "label"}, "value": "events"},
         "chart": "bar"
     },
 
@@ -126,6 +198,13 @@ METRIC_REGISTRY = {
             GROUP BY DATE(timestamp)
             ORDER BY DATE(timestamp)
         """,
+        "rollup_sql": """
+            SELECT day as date, SUM(events) as value
+            FROM engagement_daily_rollup
+            GROUP BY day
+            ORDER BY day
+        """,
+        "batch": {"scan": "engagement_events", "keys": {"date": "date"}, "value": "events", "sort": ("date", True)},
         "chart": "line"
     },
 
@@ -135,30 +214,252 @@ METRIC_REGISTRY = {
             FROM engagement_events
             GROUP BY channel
         """,
+        "rollup_sql": """
+            SELECT channel as label, SUM(events) as value
+            FROM engagement_daily_rollup
+            GROUP BY channel
+        """,
+        "batch": {"scan": "engagement_events", "keys": {"channel": "label"}, "value": "events"},
         "chart": "pie"
     }
 }
 
 
+# =========================================================
+# METRIC EXECUTION (CACHED PER DATA VERSION)
+# =========================================================
+
+metric_cache = ResultCache(sizeof=payload_size, cacheable=is_cacheable)
+
+NO_FILTERS = MetricFilters()
+
+
+def compute_metric(metric, filters=NO_FILTERS, approximate=False):
+
+    config = METRIC_REGISTRY[metric]
+
+    if "aggregate" in config:
+        return compute_aggregate(metric, config, filters, approximate)
+
+    shape = filters.shape()
+
+    # statement compiled once per (sql, filter shape); only the bound values change
+    df = run_query(compile_sql(metric_sql(config, shape=shape), shape), filters.params(), approximate=approximate)
+
+    if isinstance(df, str):
+        return CachedPayload({"error": df})
+
+    payload = {
+        "metric": metric,
+        "chart": config["chart"],
+        "data": df.to_dict(orient="records")
+    }
+
+    if "approximate" in df.attrs:
+        payload["approximate"] = df.attrs["approximate"]
+
+    return CachedPayload(payload)
+
+
+def compute_aggregate(metric, config, filters=NO_FILTERS, approximate=False):
+
+    spec = config["aggregate"]
+
+    # digests hold every row → only usable without filters
+    data = approximate_aggregate(spec) if approximate and not filters.shape() else None
+
+    try:
+        if data is None:
+            data = run_aggregate(spec, filtered_source(spec["table"], filters.shape()), filters.params())
+            approximate = False
+    except Exception as e:
+        return CachedPayload({"error": f"SQL_ERROR: {str(e)}"})
+
+    payload = {
+        "metric": metric,
+        "chart": config["chart"],
+        "encoding": ENCODINGS[spec["type"]],
+        "data": data
+    }
+
+    if approximate:
+        payload["approximate"] = {"method": "t-digest", "source": spec["table"], "confidence": 0.95}
+
+    return CachedPayload(payload)
+
+
+def execute_metric(metric, filters=None, approximate=False):
+
+    filters = filters or NO_FILTERS
+
+    try:
+        version = data_version()
+    except Exception:
+        return compute_metric(metric, filters, approximate)
+
+    # new rows anywhere → new version → old entries simply age out of the LRU
+    return metric_cache.get_or_compute(
+        (metric, filters.key(), version, approximate), lambda: compute_metric(metric, filters, approximate)
+    )
+
+
+# =========================================================
+# BATCH EXECUTION (ONE SCAN PER TABLE)
+# =========================================================
+
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+scan_cache = ResultCache(max_entries=32)
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="analytics-batch")
+
+
+def run_shared_scan(table, filters=NO_FILTERS):
+
+    shape = filters.shape()
+
+    df = run_query(compile_sql(metric_sql(SHARED_SCANS[table], shape=shape), shape), filters.params())
+
+    if isinstance(df, str):
+        raise RuntimeError(df)
+
+    return df
+
+
+def compute_batched_metric(metric, version, filters=NO_FILTERS):
+
+    config = METRIC_REGISTRY[metric]
+    spec = config["batch"]
+
+    try:
+        # every metric of the same table (and filters) collapses onto one single-flight scan
+        scan_df = scan_cache.get_or_compute(
+            (spec["scan"], filters.key(), version), lambda: run_shared_scan(spec["scan"], filters)
+        )
+    except RuntimeError as e:
+        return CachedPayload({"error": str(e)})
+
+    return CachedPayload({
+        "metric": metric,
+        "chart": config["chart"],
+        "data": derive_metric(scan_df, spec).to_dict(orient="records")
+    })
+
+
+def execute_batch(metrics, filters=None, approximate=False):
+
+    filters = filters or NO_FILTERS
+
+    try:
+        version = data_version()
+    except Exception:
+        version = None
+
+    def execute(metric):
+
+        if metric not in METRIC_REGISTRY:
+            return CachedPayload({"error": f"Unknown metric: {metric}"})
+
+        if version is None or approximate or "batch" not in METRIC_REGISTRY[metric]:
+            return execute_metric(metric, filters, approximate)
+
+        return metric_cache.get_or_compute(
+            (metric, filters.key(), version, False), lambda: compute_batched_metric(metric, version, filters)
+        )
+
+    unique = list(dict.fromkeys(metrics))
+
+    return dict(zip(unique, batch_executor.map(execute, unique)))
+
+
+# =========================================================
+# STREAMING ENCODINGS (ARROW IPC / NDJSON)
+# =========================================================
+
+def stream_metric(metric, filters, media, approximate=False):
+
+    """Rows go from the cursor to the encoder batch by batch (no record list, no cache)"""
+
+    config = METRIC_REGISTRY[metric]
+    header = {"metric": metric, "chart": config["chart"]}
+
+    if "aggregate" in config:
+
+        # already constant-size → serve the cached summary in the requested encoding
+        payload = execute_metric(metric, filters, approximate).payload
+
+        if "error" in payload:
+            return payload
+
+        data = payload["data"]
+        columns = list(data[0]) if data else []
+        header["encoding"] = payload["encoding"]
+
+        try:
+            body = encode_stream(media, header, columns, record_batches(data, columns))
+        except Exception as e:
+            return {"error": f"ENCODING_ERROR: {str(e)}"}
+
+        return StreamingResponse(body, media_type=media)
+
+    shape = filters.shape()
+
+    try:
+        columns, types, batches = open_query_stream(compile_sql(metric_sql(config, shape=shape), shape), filters.params())
+    except Exception as e:
+        return {"error": f"SQL_ERROR: {str(e)}"}
+
+    # Arrow resolves its schema here → a type conflict is an error response, not a truncated stream
+    try:
+        body = encode_stream(media, header, columns, batches, types)
+    except Exception as e:
+        batches.close()
+        return {"error": f"ENCODING_ERROR: {str(e)}"}
+
+    return StreamingResponse(body, media_type=media)
+
+
 # =========================================================
 # UNIVERSAL ANALYTICS ENDPOINT
 # =========================================================
 
 @router.post("/analytics/query")
-def run_analytics(req: AnalyticsRequest):
+def run_analytics(req: AnalyticsRequest, request: Request):
 
     if req.metric not in METRIC_REGISTRY:
         return {"error": f"Unknown metric: {req.metric}"}
 
-    config = METRIC_REGISTRY[req.metric]
+    media = negotiate(request.headers.get("accept"))
 
-    df = run_query(config["sql"])
+    if media != JSON:
+        return stream_metric(req.metric, req.filters or NO_FILTERS, media, req.approximate)
 
-    if isinstance(df, str):
-        return {"error": df}
+    # pre-encoded body → cache hits skip FastAPI's per-row JSON encoding
+    return Response(content=execute_metric(req.metric, req.filters, req.approximate).body, media_type="application/json")
 
-    return {
-        "metric": req.metric,
-        "chart": config["chart"],
-        "data": df.to_dict(orient="records")
-    }
\ No newline at end of file
+
+@router.post("/analytics/batch")
+def run_analytics_batch(req: BatchAnalyticsRequest):
+
+    results = execute_batch(req.metrics, req.filters, req.approximate)
+
+    # splice the cached per-metric bodies together instead of re-encoding
+    body = b'{"results": {' + b", ".join(
+        json.dumps(metric).encode() + b": " + cached.body for metric, cached in results.items()
+    ) + b"}}"
+
+    return Response(content=body, media_type="application/json")
+
+
+# =========================================================
+# CONNECTION POOL + CACHE MONITORING
+# =========================================================
+
+@router.get("/analytics/pool")
+def pool_stats():
+    return get_pool_stats()
+
+
+@router.get("/analytics/cache")
+def cache_stats():
+    return metric_cache.stats()
\ No newline at end of file
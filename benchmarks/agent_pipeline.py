@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_llm_server import add_stub_arguments, start_stub, stub_config
+
+# ---------------------------------------------------
+# BENCHMARK CONFIG
+# ---------------------------------------------------
+
+TARGETS = ("ask", "war_room", "chat")
+
+REQUESTS = 20
+CONCURRENCY = 4
+
+# cycled deterministically; none of them hit the registry fast path's exact phrasings
+QUESTIONS = [
+    "Which products drive most of our revenue this quarter?",
+    "How does churn risk differ across customer personas?",
+    "What engagement events are most common?",
+    "Where is revenue coming from by channel?",
+    "Is daily revenue trending up or down?",
+]
+
+
+# ---------------------------------------------------
+# STAGE TIMERS
+# ---------------------------------------------------
+
+class StageTimer:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)      # stage → seconds
+
+    def add(self, stage, elapsed):
+        with self.lock:
+            self.samples[stage].append(elapsed)
+
+    def timed(self, stage, fn):
+
+        def wrapper(*args, **kwargs):
+
+            started = time.perf_counter()
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+
+        return wrapper
+
+
+timer = StageTimer()
+
+
+def percentiles(values):
+
+    ordered = sorted(values)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+    return at(0.50), at(0.95), at(0.99)
+
+
+# ---------------------------------------------------
+# PIPELINE (IMPORTED AFTER OPENAI_BASE_URL POINTS AT THE STUB)
+# ---------------------------------------------------
+
+def load_pipeline(with_caches=False):
+
+    """Agents with every stage wrapped in a timer → {target: callable(question)}"""
+
+    from core.agents import insight_agent, insight_cache, metric_matcher, sql_cache, war_room_agent
+
+    if not with_caches:
+        # measure the full pipeline on every request, not cache lookups
+        sql_cache.SQL_CACHE_ENABLED = False
+        insight_cache.INSIGHT_CACHE_ENABLED = False
+        metric_matcher.FAST_PATH_ENABLED = False
+
+    # module globals are looked up at call time → wrapping them times every caller
+    for module, stage, name in [
+        (insight_agent, "sql_generation", "generate_sql"),
+        (insight_agent, "query_execution", "run_guarded_query"),
+        (insight_agent, "fast_path", "registry_result"),
+        (insight_agent, "chart", "select_chart"),
+        (insight_agent, "insight", "interpret_results"),
+        (war_room_agent, "chart", "select_chart"),
+        (war_room_agent, "insight", "interpret_results"),
+        (war_room_agent, "specialist", "specialist_agent"),
+        (war_room_agent, "combined", "combined_agent"),
+        (war_room_agent, "fan_out", "fan_out"),
+    ]:
+        setattr(module, name, timer.timed(stage, getattr(module, name)))
+
+    return {
+        "ask": insight_agent.ask_with_data,
+        "war_room": war_room_agent.run_war_room,
+    }
+
+
+def chat_target(api_url):
+
+    """/chat over HTTP → needs a running API (uvicorn api.main:app) with the chat router mounted"""
+
+    import httpx
+
+    client = httpx.Client(base_url=api_url, timeout=120)
+
+    def call(question):
+
+        started = time.perf_counter()
+
+        try:
+            response = client.get("/chat", params={"query": question})
+        finally:
+            timer.add("http", time.perf_counter() - started)
+
+        response.raise_for_status()
+
+        return response.json()
+
+    return call
+
+
+# ---------------------------------------------------
+# LOAD GENERATION
+# ---------------------------------------------------
+
+def run_target(call, requests, concurrency):
+
+    latencies = []
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def one(i):
+
+        started = time.perf_counter()
+
+        try:
+            result = call(QUESTIONS[i % len(QUESTIONS)])
+            failed = isinstance(result, dict) and result.get("error") is not None
+            reason = "error response" if failed else None
+        except Exception as e:
+            reason = type(e).__name__
+
+        with lock:
+            if reason:
+                errors[reason] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        list(pool.map(one, range(requests)))
+
+    wall = time.perf_counter() - started
+
+    return {
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+
+def print_report(target, result, stages):
+
+    p50, p95, p99 = result["latency_ms"]
+
+    print(f"\n== {target}: {result['ok']} ok, {sum(result['errors'].values())} failed "
+          f"{result['errors'] or ''} | {result['throughput_rps']:.2f} req/s | "
+          f"p50 {p50:.0f} ms  p95 {p95:.0f} ms  p99 {p99:.0f} ms")
+
+    if not stages:
+        return
+
+    header = f"  {'STAGE':<18}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls/s':>10}"
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+
+    for stage, samples in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        s50, s95, s99 = percentiles(samples)
+        print(f"  {stage:<18}{len(samples):>8}{s50:>10.1f}{s95:>10.1f}{s99:>10.1f}"
+              f"{len(samples) / result['wall_seconds']:>10.2f}")
+
+
+def run_benchmark(targets=TARGETS, requests=REQUESTS, concurrency=CONCURRENCY, base_url=None, api_url=None,
+                  with_caches=False, stub=None):
+
+    if base_url is None:
+        server, base_url = start_stub(0, **(stub or {}))
+        print(f"Stub LLM on {base_url}")
+
+    # read by core/llm/gateway.py at import
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    calls = load_pipeline(with_caches)
+
+    if "chat" in targets:
+        if api_url:
+            calls["chat"] = chat_target(api_url)
+        else:
+            print("chat: skipped (pass --api-url of a running API)")
+
+    from core.llm.gateway import llm_stats
+
+    results = {}
+
+    for target in targets:
+
+        if target not in calls:
+            continue
+
+        timer.samples.clear()
+
+        results[target] = run_target(calls[target], requests, concurrency)
+        results[target]["stages"] = {stage: percentiles(samples) for stage, samples in timer.samples.items()}
+
+        print_report(target, results[target], dict(timer.samples))
+
+    print("\n== LLM calls by agent (gateway)")
+
+    for agent in llm_stats()["agents"]:
+        print(f"  {agent['agent']:<18}{agent['calls']:>8}{agent['p50_ms']:>10.1f}{agent['p95_ms']:>10.1f}"
+              f"{agent['p99_ms']:>10.1f}  errors {agent['errors']}")
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Drive the agent pipeline against a local OpenAI-compatible stub")
+    parser.add_argument("targets", nargs="*", help=f"any of {', '.join(TARGETS)} (default: all)")
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per target")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--base-url", help="existing OpenAI-compatible server (default: start the stub in-process)")
+    parser.add_argument("--api-url", help="running API for the /chat target, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--with-caches", action="store_true", help="keep SQL / insight caches and the fast path on")
+    add_stub_arguments(parser)
+
+    args = parser.parse_args()
+
+    unknown = set(args.targets) - set(TARGETS)
+
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    run_benchmark(args.targets or TARGETS, args.requests, args.concurrency, args.base_url, args.api_url,
+                  args.with_caches, stub_config(args))
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from analytics import columnar
+from analytics.query_engine import run_query
+from api.routes.analytics_routes import METRIC_REGISTRY
+
+# ---------------------------------------------------
+# BENCHMARK CONFIG
+# ---------------------------------------------------
+
+WARM_RUNS = 5
+
+# raw-table registry SQL (rollup / aggregate metrics aside, these are the slow ones on a row store)
+QUERIES = {
+    metric: config["sql"]
+    for metric, config in METRIC_REGISTRY.items()
+    if "sql" in config and columnar.covers(config["sql"])
+}
+
+
+# ---------------------------------------------------
+# TIMING
+# ---------------------------------------------------
+
+def time_backend(backend, sql, runs=WARM_RUNS):
+
+    columnar.ANALYTICS_BACKEND = backend
+
+    timings = []
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        df = run_query(sql)
+        timings.append((time.perf_counter() - started) * 1000)
+
+        if isinstance(df, str):
+            raise RuntimeError(df)
+
+    return statistics.median(timings)
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+
+def run_benchmark(queries=None):
+
+    queries = queries or QUERIES
+
+    if not columnar.DUCKDB_AVAILABLE:
+        raise RuntimeError("duckdb is not installed")
+
+    started = time.perf_counter()
+    loaded = columnar.columnar_store.refresh(force=True)
+    print(f"Mirror load: {sum(loaded.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+    results = {
+        name: {backend: time_backend(backend, sql) for backend in ("database", "duckdb")}
+        for name, sql in queries.items()
+    }
+
+    header = f"{'QUERY':<32}{'database ms':>14}{'duckdb ms':>14}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for name, timings in results.items():
+        print(f"{name:<32}{timings['database']:>14.1f}{timings['duckdb']:>14.1f}"
+              f"{timings['database'] / max(timings['duckdb'], 1e-6):>9.1f}x")
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Registry SQL on the row-store database vs the DuckDB columnar mirror")
+    parser.add_argument("metrics", nargs="*", help="registry metrics to time (default: every raw-table metric)")
+
+    args = parser.parse_args()
+
+    run_benchmark({m: QUERIES[m] for m in args.metrics} if args.metrics else None)
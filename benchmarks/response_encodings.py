@@ -0,0 +1,125 @@
+import json
+import time
+from sqlalchemy import text
+
+from analytics.query_engine import run_query
+from analytics.streaming import ARROW, NDJSON, encode_stream, open_query_stream
+from database.db_engine import engine
+
+# ---------------------------------------------------
+# BENCHMARK CONFIG
+# ---------------------------------------------------
+
+ROW_COUNTS = (10_000, 100_000, 1_000_000)
+
+BENCH_TABLE = "bench_encoding_rows"
+
+BENCH_SQL = f"SELECT id, label, channel, amount, created_at FROM {BENCH_TABLE}"
+
+
+# ---------------------------------------------------
+# FIXTURE → synthetic rows shaped like a metric result
+# ---------------------------------------------------
+
+def create_rows(rows):
+
+    with engine.begin() as conn:
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+        conn.execute(text(
+            f"CREATE TABLE {BENCH_TABLE} (id INTEGER PRIMARY KEY, label TEXT, channel TEXT, amount REAL, created_at TEXT)"
+        ))
+        conn.execute(text(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows)
+            INSERT INTO {BENCH_TABLE} (id, label, channel, amount, created_at)
+            SELECT n, 'product_' || (n % 500), CASE n % 3 WHEN 0 THEN 'App' WHEN 1 THEN 'Online' ELSE 'Store' END,
+                   (n % 10000) * 0.37, '2025-01-01 00:00:00'
+            FROM seq
+        """), {"rows": rows})
+
+
+def drop_rows():
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+
+
+# ---------------------------------------------------
+# ENCODING PATHS
+# ---------------------------------------------------
+
+def json_records():
+
+    # current path → DataFrame → list of dicts → one JSON document
+    df = run_query(BENCH_SQL)
+
+    return len(json.dumps({"data": df.to_dict(orient="records")}, default=str).encode())
+
+
+def streamed(media):
+
+    def run():
+
+        columns, types, batches = open_query_stream(BENCH_SQL)
+
+        return sum(len(chunk) for chunk in encode_stream(media, {"metric": "bench"}, columns, batches, types))
+
+    return run
+
+
+PATHS = {
+    "json": json_records,
+    "ndjson": streamed(NDJSON),
+    "arrow": streamed(ARROW),
+}
+
+
+def time_path(run):
+
+    started = time.perf_counter()
+    size = run()
+
+    return {"ms": (time.perf_counter() - started) * 1000, "bytes": size}
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+
+def run_benchmark(row_counts=ROW_COUNTS):
+
+    results = {}
+
+    try:
+
+        for rows in row_counts:
+
+            create_rows(rows)
+
+            results[rows] = {name: time_path(run) for name, run in PATHS.items()}
+
+    finally:
+        drop_rows()
+
+    header = f"{'ROWS':>10}" + "".join(f"{name + ' ms / MB':>26}" for name in PATHS)
+    print(header)
+    print("-" * len(header))
+
+    for rows, timings in results.items():
+        print(f"{rows:>10,}" + "".join(
+            f"{timings[name]['ms']:>14.0f} / {timings[name]['bytes'] / 1e6:<9.1f}" for name in PATHS
+        ))
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare JSON records vs streamed NDJSON / Arrow IPC result encoding")
+    parser.add_argument("rows", nargs="*", type=int, help=f"result sizes (default: {list(ROW_COUNTS)})")
+
+    args = parser.parse_args()
+
+    run_benchmark(args.rows or ROW_COUNTS)
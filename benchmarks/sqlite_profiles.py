@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from database.db_engine import SQLITE_PATH, SQLITE_PROFILES, connect_sqlite
+from api.routes.analytics_routes import METRIC_REGISTRY
+
+# ---------------------------------------------------
+# BENCHMARK CONFIG
+# ---------------------------------------------------
+
+WARM_RUNS = 5
+WRITE_ROWS = 20_000
+WRITE_BATCH = 500
+
+
+# ---------------------------------------------------
+# SCRATCH COPY → profiles persist journal_mode in the file, never run them on the app's DB
+# ---------------------------------------------------
+
+def scratch_copy(source):
+
+    """Online backup of `source` into a temp file (consistent even while the app writes)"""
+
+    handle, path = tempfile.mkstemp(prefix="sqlite_profiles_", suffix=".db")
+    os.close(handle)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(path)
+
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+    return path
+
+
+def remove_copy(path):
+
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+# ---------------------------------------------------
+# READS → every registry metric, cold + warm
+# ---------------------------------------------------
+
+def bench_reads(profile, path, runs=WARM_RUNS):
+
+    results = {}
+
+    for metric, config in METRIC_REGISTRY.items():
+
+        # fresh connection → empty page cache for the first ("cold") run
+        conn = connect_sqlite(profile, path)
+
+        timings = []
+
+        for _ in range(runs + 1):
+            started = time.perf_counter()
+            conn.execute(config["sql"]).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        conn.close()
+
+        results[metric] = {"cold_ms": timings[0], "warm_ms": statistics.median(timings[1:])}
+
+    return results
+
+
+# ---------------------------------------------------
+# WRITES → small committed batches (ingest shape)
+# ---------------------------------------------------
+
+def bench_writes(profile, path, rows=WRITE_ROWS, batch=WRITE_BATCH):
+
+    conn = connect_sqlite(profile, path)
+
+    conn.execute("CREATE TABLE IF NOT EXISTS bench_writes (id INTEGER PRIMARY KEY, channel TEXT, amount REAL)")
+
+    started = time.perf_counter()
+
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO bench_writes (channel, amount) VALUES (?, ?)",
+            [("App", float(i)) for i in range(start, min(rows, start + batch))]
+        )
+        conn.commit()
+
+    elapsed = time.perf_counter() - started
+
+    conn.execute("DROP TABLE bench_writes")
+    conn.commit()
+    conn.close()
+
+    return {"rows_per_sec": rows / elapsed, "commit_ms": elapsed * 1000 / -(-rows // batch)}
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+
+def run_benchmark(profiles=None, db=None):
+
+    profiles = profiles or list(SQLITE_PROFILES)
+    source = db or SQLITE_PATH
+
+    if not source or not os.path.exists(source):
+        raise RuntimeError(f"No SQLite database to copy at {source!r} → pass --db or a sqlite DATABASE_URL")
+
+    reads = {}
+    writes = {}
+
+    # a fresh copy per profile → same starting file, and the app's DB is only ever read
+    for p in profiles:
+
+        path = scratch_copy(source)
+
+        try:
+            reads[p] = bench_reads(p, path)
+            writes[p] = bench_writes(p, path)
+        finally:
+            remove_copy(path)
+
+    header = f"{'METRIC':<28}" + "".join(f"{p + ' cold/warm ms':>26}" for p in profiles)
+    print(header)
+    print("-" * len(header))
+
+    for metric in METRIC_REGISTRY:
+        print(f"{metric:<28}" + "".join(
+            f"{reads[p][metric]['cold_ms']:>14.1f} / {reads[p][metric]['warm_ms']:<9.1f}" for p in profiles
+        ))
+
+    print()
+
+    for p in profiles:
+        print(f"{p:<10} writes: {writes[p]['rows_per_sec']:>10,.0f} rows/sec | {writes[p]['commit_ms']:.2f} ms/commit")
+
+    return {"reads": reads, "writes": writes}
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare SQLite performance profiles on the registry metrics")
+    parser.add_argument("profiles", nargs="*", help=f"subset of {list(SQLITE_PROFILES)} (default: all)")
+    parser.add_argument("--db", help="SQLite file to copy and benchmark (default: the app's database)")
+
+    args = parser.parse_args()
+
+    run_benchmark(args.profiles, args.db)
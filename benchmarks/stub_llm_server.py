@@ -0,0 +1,423 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------------------------------------------
+# STUB CONFIG
+# ---------------------------------------------------
+
+# OpenAI-compatible stand-in (POST /v1/chat/completions, POST /v1/responses, GET /v1/models)
+# → point the gateway at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+
+DEFAULT_CONFIG = {
+    "latency": "lognormal:400,0.35",      # full response (non-streamed), ms
+    "first_token": "lognormal:250,0.3",   # streamed: time to first token, ms
+    "tokens_per_second": 80.0,            # streamed: pacing after the first token
+    "error_rate": 0.0,                    # fraction of requests answered with error_status
+    "error_status": 500,
+    "hang_rate": 0.0,                     # fraction of requests that stall for hang_seconds (client timeouts)
+    "hang_seconds": 120.0,
+    "seed": 7,
+}
+
+
+def parse_distribution(spec):
+
+    """
+    "fixed:MS" | "uniform:LO,HI" | "lognormal:MEDIAN,SIGMA" → sampler(rng) → seconds
+    """
+
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+
+    if kind == "lognormal":
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1]) / 1000
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+# ---------------------------------------------------
+# DETERMINISTIC CANNED ANSWERS
+# ---------------------------------------------------
+
+# generate_sql() question keywords → SQL valid against database/models.py (first match wins)
+CANNED_SQL = [
+    (("product", "item", "sku"),
+     "SELECT product_name, SUM(amount) AS revenue FROM transactions GROUP BY product_name ORDER BY revenue DESC LIMIT 10"),
+    (("persona", "churn", "segment"),
+     "SELECT persona, AVG(churn_risk) AS avg_churn_risk, COUNT(*) AS customers FROM customers GROUP BY persona"),
+    (("engagement", "event", "click"),
+     "SELECT event_type, COUNT(*) AS events FROM engagement_events GROUP BY event_type"),
+    (("trend", "daily", "over time", "month"),
+     "SELECT DATE(timestamp) AS date, SUM(amount) AS revenue FROM transactions GROUP BY DATE(timestamp) ORDER BY date"),
+]
+
+DEFAULT_SQL = "SELECT channel, SUM(amount) AS revenue FROM transactions GROUP BY channel"
+
+INSIGHT = """EXECUTIVE SUMMARY:
+Revenue is concentrated in a few channels and products.
+Momentum is stable week over week.
+
+KEY FINDINGS:
+- Online leads revenue share
+- Store carries the highest order value
+- App engagement is growing fastest
+
+BUSINESS IMPLICATION:
+Channel mix, not demand, limits growth.
+
+RECOMMENDED ACTIONS:
+- Shift budget toward App retention
+- Bundle top products in Store
+- Review discount depth Online"""
+
+OPINION = "- Double down on the strongest channel\n- Protect margin on top products\n- Track churn in the VIP segment"
+
+QUESTION = re.compile(r"Question:\s*\n(.*?)\n", re.DOTALL)
+
+
+def canned_answer(prompt, response_format=None):
+
+    if response_format and response_format.get("type") == "json_schema":
+
+        # war room single-call schema → every required opinion + the synthesis
+        schema = response_format["json_schema"]["schema"]
+        roles = schema.get("properties", {}).get("opinions", {}).get("required", [])
+
+        return json.dumps({"opinions": {role: OPINION for role in roles}, "synthesis": INSIGHT})
+
+    if "Convert this business question into SQL" in prompt:
+
+        m = QUESTION.search(prompt)
+        question = (m.group(1) if m else prompt).lower()
+
+        for keywords, sql in CANNED_SQL:
+            if any(keyword in question for keyword in keywords):
+                return sql
+
+        return DEFAULT_SQL
+
+    if "Return ONLY ONE WORD" in prompt:
+        return "bar"
+
+    if "You are acting as the" in prompt:
+        return OPINION
+
+    return INSIGHT
+
+
+def prompt_text(messages):
+
+    if isinstance(messages, str):
+        return messages
+
+    parts = []
+
+    for message in messages:
+
+        content = message.get("content", "")
+
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+        parts.append(content)
+
+    return "\n".join(parts)
+
+
+def count_tokens(text):
+
+    # ≈ 4 characters per token, like the tiktoken rule of thumb
+    return max(1, len(text) // 4)
+
+
+def token_chunks(text):
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+# ---------------------------------------------------
+# HTTP HANDLER
+# ---------------------------------------------------
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    # set per server by start_stub()
+    config = DEFAULT_CONFIG
+    rng = None
+    rng_lock = None
+    samplers = None
+    stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def sample(self, name):
+
+        with self.rng_lock:
+            return self.samplers[name](self.rng)
+
+    def chance(self, rate):
+
+        if rate <= 0:
+            return False
+
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+    # ------------------------- plumbing -------------------------
+
+    def send_json(self, status, payload):
+
+        body = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_events(self):
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_event(self, payload, event=None):
+
+        data = (f"event: {event}\n" if event else "") + f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n"
+        data = data.encode()
+
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_events(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def stream_tokens(self, text):
+
+        """First-token latency, then token_chunks(text) paced at tokens_per_second"""
+
+        time.sleep(self.sample("first_token"))
+
+        interval = 1.0 / self.config["tokens_per_second"] if self.config["tokens_per_second"] > 0 else 0.0
+
+        for i, chunk in enumerate(token_chunks(text)):
+
+            if i and interval:
+                time.sleep(interval)
+
+            yield chunk
+
+    def count(self, name):
+
+        with self.rng_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    # ------------------------- routes -------------------------
+
+    def do_GET(self):
+
+        if self.path.rstrip("/").endswith("/models"):
+            return self.send_json(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "created": 0, "owned_by": "stub"} for model in ("gpt-5-mini", "gpt-5")
+            ]})
+
+        self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+        self.count("requests")
+
+        if self.chance(self.config["hang_rate"]):
+            self.count("hangs")
+            time.sleep(self.config["hang_seconds"])
+
+        if self.chance(self.config["error_rate"]):
+            self.count("errors")
+            time.sleep(self.sample("first_token"))
+            return self.send_json(self.config["error_status"], {
+                "error": {"message": "Injected stub failure", "type": "server_error", "code": None}
+            })
+
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            return self.chat_completions(request)
+
+        if self.path.rstrip("/").endswith("/responses"):
+            return self.responses_api(request)
+
+        self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def chat_completions(self, request):
+
+        prompt = prompt_text(request.get("messages", []))
+        text = canned_answer(prompt, request.get("response_format"))
+        model = request.get("model", "gpt-5-mini")
+        rid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        usage = {
+            "prompt_tokens": count_tokens(prompt),
+            "completion_tokens": count_tokens(text),
+            "total_tokens": count_tokens(prompt) + count_tokens(text),
+        }
+
+        def chunk(choices, **extra):
+            return {"id": rid, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": choices, **extra}
+
+        if request.get("stream"):
+
+            self.start_events()
+
+            for i, delta in enumerate(self.stream_tokens(text)):
+                self.send_event(chunk([{"index": 0, "delta": {"role": "assistant", "content": delta} if i == 0
+                                        else {"content": delta}, "finish_reason": None}]))
+
+            self.send_event(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self.send_event(chunk([], usage=usage))
+
+            self.send_event("[DONE]")
+            return self.end_events()
+
+        time.sleep(self.sample("latency"))
+
+        self.send_json(200, {
+            "id": rid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": usage,
+        })
+
+    def responses_api(self, request):
+
+        prompt = prompt_text(request.get("input", ""))
+        text_format = (request.get("text") or {}).get("format")
+        text = canned_answer(prompt, {"type": "json_schema", "json_schema": text_format}
+                             if text_format and text_format.get("type") == "json_schema" else None)
+        model = request.get("model", "gpt-5-mini")
+        rid = f"resp_{uuid.uuid4().hex[:24]}"
+        item_id = f"msg_{uuid.uuid4().hex[:24]}"
+
+        def response(status, output_text):
+            return {
+                "id": rid, "object": "response", "created_at": int(time.time()), "model": model,
+                "status": status, "output": [] if status != "completed" else [{
+                    "type": "message", "id": item_id, "status": "completed", "role": "assistant",
+                    "content": [{"type": "output_text", "text": output_text, "annotations": []}],
+                }],
+                "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+                "usage": {
+                    "input_tokens": count_tokens(prompt), "output_tokens": count_tokens(output_text),
+                    "total_tokens": count_tokens(prompt) + count_tokens(output_text),
+                    "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0},
+                },
+            }
+
+        if request.get("stream"):
+
+            self.start_events()
+
+            sequence = 0
+
+            def event(kind, **payload):
+                nonlocal sequence
+                self.send_event({"type": kind, "sequence_number": sequence, **payload}, event=kind)
+                sequence += 1
+
+            event("response.created", response=response("in_progress", ""))
+
+            for delta in self.stream_tokens(text):
+                event("response.output_text.delta", item_id=item_id, output_index=0, content_index=0, delta=delta)
+
+            event("response.output_text.done", item_id=item_id, output_index=0, content_index=0, text=text)
+            event("response.completed", response=response("completed", text))
+
+            return self.end_events()
+
+        time.sleep(self.sample("latency"))
+
+        self.send_json(200, response("completed", text))
+
+
+# ---------------------------------------------------
+# SERVER
+# ---------------------------------------------------
+
+def start_stub(port=8765, host="127.0.0.1", **overrides):
+
+    """Stub server on a daemon thread → (server, base_url); server.stats counts requests / errors"""
+
+    config = {**DEFAULT_CONFIG, **{k: v for k, v in overrides.items() if v is not None}}
+
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "config": config,
+        "rng": random.Random(config["seed"]),
+        "rng_lock": threading.Lock(),
+        "samplers": {name: parse_distribution(config[name]) for name in ("latency", "first_token")},
+        "stats": {},
+    })
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = handler.stats
+
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-llm").start()
+
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def add_stub_arguments(parser):
+
+    parser.add_argument("--latency", default=DEFAULT_CONFIG["latency"],
+                        help="non-streamed latency: fixed:MS | uniform:LO,HI | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--first-token", default=DEFAULT_CONFIG["first_token"], help="streamed time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_CONFIG["tokens_per_second"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"])
+    parser.add_argument("--error-status", type=int, default=DEFAULT_CONFIG["error_status"])
+    parser.add_argument("--hang-rate", type=float, default=DEFAULT_CONFIG["hang_rate"])
+    parser.add_argument("--hang-seconds", type=float, default=DEFAULT_CONFIG["hang_seconds"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG["seed"])
+
+
+def stub_config(args):
+
+    return {name: getattr(args, name) for name in DEFAULT_CONFIG}
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server with canned answers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_stub_arguments(parser)
+
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.port, args.host, **stub_config(args))
+
+    print(f"Stub LLM listening → OPENAI_BASE_URL={base_url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
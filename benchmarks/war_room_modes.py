@@ -0,0 +1,130 @@
+import os
+import statistics
+import time
+
+from core.agents import insight_cache
+from core.agents import war_room_agent
+from core.agents.insight_agent import fetch_data
+from core.llm.gateway import llm_stats
+
+# ---------------------------------------------------
+# BENCHMARK CONFIG
+# ---------------------------------------------------
+
+RUNS = 3
+
+QUESTION = "Which channels should we invest in next quarter given revenue by channel?"
+
+# USD per 1M tokens (input, output) → override with WAR_ROOM_PRICE_INPUT / _OUTPUT for other models
+PRICES = {
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+}
+
+
+def price(model):
+
+    default = PRICES.get(model, PRICES["gpt-5-mini"])
+
+    return (float(os.getenv("WAR_ROOM_PRICE_INPUT", default[0])),
+            float(os.getenv("WAR_ROOM_PRICE_OUTPUT", default[1])))
+
+
+# ---------------------------------------------------
+# ONE MODE → LATENCY + TOKENS + COST
+# ---------------------------------------------------
+
+def usage_totals():
+
+    """(calls, prompt tokens, completion tokens, cost USD) summed over every agent so far"""
+
+    calls = prompt = completion = cost = 0.0
+
+    for agent in llm_stats()["agents"]:
+
+        input_price, output_price = price(agent["model"])
+
+        calls += agent["calls"]
+        prompt += agent["prompt_tokens"]
+        completion += agent["completion_tokens"]
+        cost += (agent["prompt_tokens"] * input_price + agent["completion_tokens"] * output_price) / 1e6
+
+    return calls, prompt, completion, cost
+
+
+def time_mode(mode, question, sql_query, df, runs=RUNS):
+
+    timings = []
+    before = usage_totals()
+    fallbacks = 0
+
+    for _ in range(runs):
+
+        thinking_log = []
+
+        started = time.perf_counter()
+        results, failures = war_room_agent.war_room_analysis(question, sql_query, df, mode=mode, thinking_log=thinking_log)
+        timings.append((time.perf_counter() - started) * 1000)
+
+        fallbacks += any("falling back" in line for line in thinking_log)
+
+        if failures:
+            print(f"  {mode}: unavailable → {failures}")
+
+    calls, prompt, completion, cost = (after - start for after, start in zip(usage_totals(), before))
+
+    return {
+        "latency_ms": statistics.median(timings),
+        "calls": calls / runs,
+        "prompt_tokens": prompt / runs,
+        "completion_tokens": completion / runs,
+        "cost_usd": cost / runs,
+        "fallbacks": fallbacks,
+    }
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+
+def run_benchmark(question=QUESTION, runs=RUNS):
+
+    # every run must reach the model, not the response cache
+    insight_cache.INSIGHT_CACHE_ENABLED = False
+
+    sql_query, df = fetch_data(question, [])
+
+    if isinstance(df, dict):
+        raise RuntimeError(df["message"])
+
+    results = {mode: time_mode(mode, question, sql_query, df, runs) for mode in war_room_agent.WAR_ROOM_MODES}
+
+    header = f"{'MODE':<10}{'p50 ms':>10}{'calls':>8}{'prompt tok':>12}{'output tok':>12}{'cost USD':>12}{'fallbacks':>11}"
+    print(header)
+    print("-" * len(header))
+
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['latency_ms']:>10.0f}{r['calls']:>8.1f}{r['prompt_tokens']:>12.0f}"
+              f"{r['completion_tokens']:>12.0f}{r['cost_usd']:>12.5f}{r['fallbacks']:>11}")
+
+    parallel, single = results["parallel"], results["single"]
+
+    if parallel["cost_usd"]:
+        print(f"\nsingle vs parallel: {single['prompt_tokens'] / max(parallel['prompt_tokens'], 1):.2f}x prompt tokens, "
+              f"{single['cost_usd'] / parallel['cost_usd']:.2f}x cost, "
+              f"{single['latency_ms'] / max(parallel['latency_ms'], 1e-6):.2f}x latency")
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="War room: parallel per-role calls vs one structured call")
+    parser.add_argument("question", nargs="?", default=QUESTION)
+    parser.add_argument("--runs", type=int, default=RUNS)
+
+    args = parser.parse_args()
+
+    run_benchmark(args.question, args.runs)
@@ -1,7 +1,6 @@
-from openai import OpenAI
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# shared pooled client → core/llm/gateway.py
+from core.llm.gateway import client  # noqa: E402
@@ -1,13 +1,15 @@
-from core.llm.model_registry import get_client, get_model
+from core.llm.gateway import chat
 import numpy as np
 
-client = get_client()
-
 VALID_CHARTS = {"bar", "line", "scatter", "pie", "heatmap"}
 
 
 def select_chart(user_query, df):
 
+    # registry metrics (fast path) already know their chart
+    if df is not None and "chart" in df.attrs:
+        return df.attrs["chart"]
+
     query_lower = user_query.lower()
 
     numeric_cols = df.select_dtypes(include=np.number).columns
@@ -69,12 +71,7 @@ Dataset Columns:
 {list(df.columns)}
 """
 
-        response = client.chat.completions.create(
-            model=get_model("chart_agent"),
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        chart_type = response.choices[0].message.content.strip().lower()
+        chart_type = chat(prompt, agent="chart_agent").strip().lower()
 
         if chart_type not in VALID_CHARTS:
             chart_type = "bar"
@@ -1,16 +1,17 @@
 import numpy as np
+import pandas as pd
 
 
-def normalize_chart_data(df):
+def normalize_chart_frame(df):
 
     if df is None or len(df) == 0:
-        return []
+        return pd.DataFrame({"label": pd.Series(dtype=object), "value": pd.Series(dtype=float)})
 
     numeric_cols = df.select_dtypes(include=np.number).columns
     all_cols = df.columns.tolist()
 
     if len(all_cols) < 2:
-        return []
+        return normalize_chart_frame(None)
 
     # PRIORITY → categorical + numeric pairing
     if len(numeric_cols) >= 1:
@@ -26,18 +27,14 @@ def normalize_chart_data(df):
         label_key = all_cols[0]
         value_key = all_cols[1]
 
-    records = df.to_dict(orient="records")
-
-    normalized = []
+    # column-wise → no per-row dicts; rows whose value isn't numeric are dropped
+    normalized = pd.DataFrame({
+        "label": df[label_key].astype(object).map(str).to_numpy(dtype=object),
+        "value": pd.to_numeric(df[value_key], errors="coerce").astype(float).to_numpy()
+    })
 
-    for row in records:
+    return normalized.dropna(subset=["value"]).reset_index(drop=True)
 
-        try:
-            normalized.append({
-                "label": str(row[label_key]),
-                "value": float(row[value_key])
-            })
-        except Exception:
-            continue
 
-    return normalized
\ No newline at end of file
+def normalize_chart_data(df):
+    return normalize_chart_frame(df).to_dict(orient="records")
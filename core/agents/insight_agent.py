@@ -1,9 +1,12 @@
-from core.llm.model_registry import get_client, get_model
-from analytics.query_engine import run_query
-from core.agents.chart_agent import select_chart
-from core.agents.chart_formatter import normalize_chart_data
+import time
 
-client = get_client()
+from core.llm.gateway import chat, stream_chat
+from analytics.sql_guard import run_guarded_query
+from core.agents.sql_cache import cached_generate
+from core.agents.insight_cache import insight_cache
+from core.agents.metric_matcher import fast_path, match_question, registry_result
+from core.agents.chart_agent import select_chart
+from core.agents.chart_formatter import normalize_chart_data, normalize_chart_frame
 
 
 # =========================================================
@@ -64,23 +67,22 @@ Question:
 Return ONLY SQL.
 """
 
-    response = client.chat.completions.create(
-        model=get_model("sql_agent"),
-        messages=[{"role": "user", "content": sql_prompt}]
-    )
-
-    return response.choices[0].message.content.strip()
+    return chat(sql_prompt, agent="sql_agent").strip()
 
 
 # =========================================================
 # INTERPRETATION
 # =========================================================
 
-def interpret_results(user_query, sql_query, df, market_context=None):
+# bump on any wording change → cached insights built from the old prompt stop matching
+INTERPRETATION_PROMPT_VERSION = "interpretation-v1"
+
+
+def interpretation_prompt(user_query, sql_query, df):
 
     dataset_summary = summarize_dataframe(df)
 
-    interpretation_prompt = f"""
+    return f"""
 You are an Executive Business Intelligence AI.
 
 STRICT FORMAT:
@@ -109,36 +111,116 @@ Dataset Summary:
 {dataset_summary}
 """
 
-    response = client.chat.completions.create(
-        model=get_model("insight_agent"),
-        messages=[{"role": "user", "content": interpretation_prompt}]
+
+def interpretation_key(user_query, sql_query, df):
+    return insight_cache.key("insight_agent", INTERPRETATION_PROMPT_VERSION, user_query, sql_query, df)
+
+
+def interpret_results(user_query, sql_query, df, market_context=None):
+
+    # same question + SQL + result rows on the same data version → same answer, no LLM call
+    return insight_cache.cached(
+        interpretation_key(user_query, sql_query, df),
+        lambda: chat(interpretation_prompt(user_query, sql_query, df), agent="insight_agent")
     )
 
-    return response.choices[0].message.content
+
+# =========================================================
+# SQL → GUARDED RESULT
+# =========================================================
+
+def fetch_data(user_query, thinking_log, approximate=False):
+
+    """Question → (validated SQL or None, DataFrame or structured error dict)"""
+
+    started = time.perf_counter()
+
+    # registry-shaped questions ("revenue by channel") → cached metric execution, no LLM
+    match = match_question(user_query)
+    result = registry_result(match, approximate) if match else None
+
+    if result is not None:
+
+        fast_path.record(True, time.perf_counter() - started)
+        thinking_log.append(f"Matched registry metric '{match['metric']}' → SQL generation skipped.")
+
+        return match["sql"], result
+
+    sql_query, result = generated_data(user_query, thinking_log, approximate)
+
+    fast_path.record(False, time.perf_counter() - started)
+
+    return sql_query, result
+
+
+def generated_data(user_query, thinking_log, approximate=False):
+
+    # exact / near-duplicate questions skip the LLM round trip (core/agents/sql_cache.py)
+    validated = cached_generate(user_query, generate_sql)
+
+    if "error" in validated:
+        return None, {"code": "invalid_statement", "message": validated["error"]}
+
+    sql_query = validated["sql"]
+    thinking_log.append(sql_query)
+
+    if validated["cache"] != "miss":
+        thinking_log.append(f"SQL served from cache ({validated['cache']} match).")
+
+    # read-only sandbox → row cap, time limit, scan-cost pre-flight
+    result = run_guarded_query(sql_query, approximate=approximate)
+
+    if isinstance(result, dict):
+        return sql_query, result
+
+    if result.attrs["guard"]["truncated"]:
+        thinking_log.append(f"Result capped at {result.attrs['guard']['max_rows']} rows.")
+
+    if "approximate" in result.attrs:
+        thinking_log.append("Approximate answer from samples (95% error bounds).")
+
+    return sql_query, result
+
+
+def data_event(result):
+
+    guard = result.attrs["guard"]
+
+    return {
+        "rows": guard["rows"],
+        "truncated": guard["truncated"],
+        "elapsed_ms": guard["elapsed_ms"],
+        "columns": list(result.columns),
+        "approximate": result.attrs.get("approximate"),
+    }
 
 
 # =========================================================
 # MASTER FLOW
 # =========================================================
 
-def ask_with_data(user_query, market_context=None):
+def ask_with_data(user_query, market_context=None, as_frame=False, approximate=False):
+
+    """
+    as_frame → "data" stays a DataFrame (streaming encoders), else chart records.
+    approximate → aggregates answered from the samples, with "<column>_error" bounds.
+    """
 
     thinking_log = []
 
     thinking_log.append("Generating SQL...")
 
-    sql_query = generate_sql(user_query)
+    sql_query, result = fetch_data(user_query, thinking_log, approximate)
 
-    thinking_log.append(sql_query)
+    if isinstance(result, dict):
 
-    result = run_query(sql_query)
-
-    if isinstance(result, str):
+        thinking_log.append(f"SQL rejected ({result['code']}).")
 
         return {
-            "insight": result,
+            "insight": f"Query could not be executed: {result['message']}",
+            "error": result,
             "chart": None,
-            "data": [],
+            "data": normalize_chart_frame(None) if as_frame else [],
             "thinking": thinking_log
         }
 
@@ -153,7 +235,57 @@ def ask_with_data(user_query, market_context=None):
         "chart": chart,
 
         # ✅ CRITICAL FIX
-        "data": normalize_chart_data(result),
+        "data": normalize_chart_frame(result) if as_frame else normalize_chart_data(result),
 
         "thinking": thinking_log
-    }
\ No newline at end of file
+    }
+
+
+# =========================================================
+# STREAMED FLOW (SERVER-SENT EVENTS)
+# =========================================================
+
+def ask_with_data_events(user_query, market_context=None, approximate=False):
+
+    """
+    Same pipeline as ask_with_data, yielded stage by stage as (event, payload):
+    sql → data → chart → insight_token* → insight → done (or error → done).
+    """
+
+    thinking_log = ["Generating SQL..."]
+
+    sql_query, result = fetch_data(user_query, thinking_log, approximate)
+
+    if sql_query:
+        yield "sql", {"sql": sql_query}
+
+    if isinstance(result, dict):
+
+        thinking_log.append(f"SQL rejected ({result['code']}).")
+
+        yield "error", result
+        yield "done", {"thinking": thinking_log}
+        return
+
+    yield "data", data_event(result)
+
+    chart = select_chart(user_query, result)
+
+    yield "chart", {"chart": chart, "data": normalize_chart_data(result)}
+
+    parts = []
+
+    stream = insight_cache.cached_stream(
+        interpretation_key(user_query, sql_query, result),
+        lambda: stream_chat(interpretation_prompt(user_query, sql_query, result), agent="insight_agent")
+    )
+
+    for delta in stream:
+        parts.append(delta)
+        yield "insight_token", {"delta": delta}
+
+    yield "insight", {"text": "".join(parts)}
+
+    thinking_log.append("Insight generated.")
+
+    yield "done", {"thinking": thinking_log}
\ No newline at end of file
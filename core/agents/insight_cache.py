@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.llm.model_registry import get_model
+from database.data_version import data_version
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+INSIGHT_CACHE_ENABLED = os.getenv("INSIGHT_CACHE_ENABLED", "1") == "1"
+
+INSIGHT_CACHE_DIR = os.getenv("INSIGHT_CACHE_DIR", ".insight_cache")
+
+INSIGHT_CACHE_MEMORY_BYTES = int(os.getenv("INSIGHT_CACHE_MEMORY_MB", "16")) * 1024 * 1024
+INSIGHT_CACHE_DISK_BYTES = int(os.getenv("INSIGHT_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+
+# ---------------------------------------------------
+# KEYS
+# ---------------------------------------------------
+
+def result_fingerprint(df):
+
+    """Order-sensitive hash of columns, dtypes and every cell of the result set"""
+
+    digest = hashlib.sha256(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+
+    if len(df):
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    return digest.hexdigest()
+
+
+def version_tag(version):
+    return hashlib.sha256(repr(version).encode()).hexdigest()[:12]
+
+
+# ---------------------------------------------------
+# TWO-TIER RESPONSE CACHE (MEMORY LRU + DISK)
+# ---------------------------------------------------
+
+class InsightCache:
+
+    """
+    LLM response text keyed by (model, template + version, question, canonical SQL,
+    result fingerprint). Entries live under the data version they were built on;
+    the first lookup after the version moves drops every older entry.
+    """
+
+    def __init__(self, directory=INSIGHT_CACHE_DIR, max_memory_bytes=INSIGHT_CACHE_MEMORY_BYTES,
+                 max_disk_bytes=INSIGHT_CACHE_DISK_BYTES):
+
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()       # key → text
+        self.memory_bytes = 0
+        self.disk = None                  # file name → size, oldest access first (scanned on first use)
+        self.disk_bytes = 0
+        self.version = None
+
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                         "evictions": 0, "expirations": 0, "disk_errors": 0}
+
+    # ------------------------- version expiry -------------------------
+
+    def _scan_disk(self):
+
+        if self.disk is not None:
+            return
+
+        self.disk = OrderedDict()
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        except OSError as e:
+            print("Insight cache disk error:", str(e))
+            self.counters["disk_errors"] += 1
+            return
+
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            self.disk[entry.name] = entry.stat().st_size
+            self.disk_bytes += self.disk[entry.name]
+
+    def _unlink(self, name):
+
+        self.disk_bytes -= self.disk.pop(name)
+
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _expire(self, tag):
+
+        """Data version moved → nothing cached under an older version is valid any more"""
+
+        self.counters["expirations"] += len(self.memory)
+        self.memory.clear()
+        self.memory_bytes = 0
+
+        for name in [name for name in self.disk if not name.startswith(tag)]:
+            self._unlink(name)
+            self.counters["expirations"] += 1
+
+    def key(self, agent, template, user_query, sql, df):
+
+        """→ cache key for one prompt, or None when the data version can't be read"""
+
+        if not INSIGHT_CACHE_ENABLED or df is None:
+            return None
+
+        try:
+            tag = version_tag(data_version())
+        except Exception:
+            return None
+
+        with self.lock:
+
+            self._scan_disk()
+
+            if tag != self.version:
+                self._expire(tag)
+                self.version = tag
+
+        parts = [get_model(agent), template, user_query.strip(), sql or "", result_fingerprint(df)]
+
+        return f"{tag}-{hashlib.sha256(json.dumps(parts).encode()).hexdigest()}"
+
+    # ------------------------- lookup / store -------------------------
+
+    def get(self, key):
+
+        if key is None:
+            return None
+
+        name = f"{key}.json"
+
+        with self.lock:
+
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self.memory[key]
+
+            if name not in self.disk:
+                self.counters["misses"] += 1
+                return None
+
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                text = json.load(f)["text"]
+            os.utime(os.path.join(self.directory, name))
+        except (OSError, ValueError, KeyError):
+            with self.lock:
+                self.counters["misses"] += 1
+                if name in self.disk:
+                    self._unlink(name)
+            return None
+
+        with self.lock:
+            self.counters["disk_hits"] += 1
+            if name in self.disk:
+                self.disk.move_to_end(name)
+            self._remember(key, text)
+
+        return text
+
+    def _remember(self, key, text):
+
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+
+        self.memory[key] = text
+        self.memory_bytes += len(text)
+
+        while self.memory_bytes > self.max_memory_bytes:
+            self.memory_bytes -= len(self.memory.popitem(last=False)[1])
+            self.counters["evictions"] += 1
+
+    def put(self, key, text):
+
+        if key is None or not text:
+            return
+
+        name = f"{key}.json"
+        body = json.dumps({"text": text})
+
+        with self.lock:
+
+            # written under a version that has since moved on
+            if not key.startswith(self.version):
+                return
+
+            self._remember(key, text)
+            self.counters["stores"] += 1
+
+        try:
+            # write-then-rename → a crash never leaves a half-written entry behind
+            path = os.path.join(self.directory, name)
+            with open(path + ".tmp", "w") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print("Insight cache disk error:", str(e))
+            with self.lock:
+                self.counters["disk_errors"] += 1
+            return
+
+        with self.lock:
+
+            if name in self.disk:
+                self.disk_bytes -= self.disk.pop(name)
+
+            self.disk[name] = len(body)
+            self.disk_bytes += len(body)
+
+            while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                self._unlink(next(iter(self.disk)))
+                self.counters["evictions"] += 1
+
+    # ------------------------- call wrappers -------------------------
+
+    def cached(self, key, call):
+
+        """call() → text, answered from the cache when possible"""
+
+        text = self.get(key)
+
+        if text is None:
+            text = call()
+            self.put(key, text)
+
+        return text
+
+    def cached_stream(self, key, stream):
+
+        """stream() → text deltas; a hit replays the whole text as one delta"""
+
+        text = self.get(key)
+
+        if text is not None:
+            yield text
+            return
+
+        parts = []
+
+        for delta in stream():
+            parts.append(delta)
+            yield delta
+
+        # only a stream that ran to completion is worth keeping
+        self.put(key, "".join(parts))
+
+    def stats(self):
+
+        with self.lock:
+
+            counters = dict(self.counters)
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            lookups = hits + counters["misses"]
+
+            return {
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_entries": len(self.disk or ()),
+                "disk_bytes": self.disk_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                **counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+insight_cache = InsightCache()
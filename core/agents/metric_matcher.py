@@ -0,0 +1,292 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from analytics.filters import MetricFilters, compile_sql, supports_sql
+from api.routes.analytics_routes import METRIC_REGISTRY, execute_metric
+from core.agents.sql_cache import normalize_question
+from core.llm.gateway import percentile_ms
+from database.data_version import data_version
+from database.db_engine import engine
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+
+SALES = r"(?:revenue|sales|spend|spending|gmv)"
+TREND = r"(?:trend|trends|over time|by day|by date|daily|timeline|history)"
+PRODUCTS = r"(?:products?|items?)"
+CHANNELS = r"(?:sales )?channels?"
+PERSONAS = r"(?:personas?|segments?)"
+EVENTS = r"(?:engagement|events?|activity|interactions?)"
+
+# registry metric → phrasings of the WHOLE question (after normalize_question, filters stripped).
+# Anything left over ("... who churned", "... vs last year") falls back to the LLM.
+METRIC_PHRASES = {
+    "revenue_trend": [
+        rf"{SALES} {TREND}", rf"{TREND} {SALES}", rf"{SALES} trend {TREND}",
+    ],
+    "revenue_by_channel": [
+        rf"{SALES} by {CHANNELS}", rf"{CHANNELS} {SALES}", rf"{SALES} split by {CHANNELS}",
+    ],
+    "top_products": [
+        rf"top (?:# )?{PRODUCTS}(?: by {SALES})?", rf"best selling (?:# )?{PRODUCTS}", r"best sellers?",
+        rf"{SALES} by {PRODUCTS}", rf"{PRODUCTS} by {SALES}", rf"top (?:# )?selling {PRODUCTS}",
+    ],
+    "product_channel_matrix": [
+        rf"{SALES} by {PRODUCTS} {CHANNELS}", rf"{SALES} by {CHANNELS} {PRODUCTS}",
+        rf"{PRODUCTS} by {CHANNELS}", rf"{PRODUCTS} {CHANNELS} (?:matrix|heatmap)",
+    ],
+    "persona_distribution": [
+        rf"(?:number )?customers by {PERSONAS}", rf"{PERSONAS} (?:distribution|mix|counts?|breakdown)",
+        rf"customer {PERSONAS}", rf"customers (?:count )?by {PERSONAS}",
+    ],
+    "churn_heatmap": [
+        rf"(?:average )?churn(?: risk)? by {PERSONAS}(?: (?:preferred )?channels?)?",
+        r"churn(?: risk)? heatmap", rf"{PERSONAS} churn(?: risk)?",
+    ],
+    "event_frequency": [
+        rf"{EVENTS} (?:frequency|counts?|by types?|by event types?)", r"event types?(?: frequency| counts?)?",
+        rf"{EVENTS} types?",
+    ],
+    "engagement_trend": [
+        rf"{EVENTS} {TREND}", rf"{TREND} {EVENTS}",
+    ],
+    "channel_mix": [
+        rf"{EVENTS} by channels?", rf"(?:{EVENTS} )?channel (?:mix|split|share)",
+    ],
+}
+
+# wording that only changes the presentation, never the numbers
+FILLER = re.compile(r"\b(?:total|overall|breakdown|chart|graph|plot|view|data|numbers|summary|analysis|current)\b")
+SYNONYMS = [(re.compile(r"\b(?:per|across|for each|split by)\b"), "by")]
+
+MATCHER = re.compile("|".join(
+    f"(?P<{metric}>{'|'.join(phrases)})" for metric, phrases in METRIC_PHRASES.items()
+))
+
+# only metrics that return plain records (aggregates come back binned / encoded)
+FAST_PATH_METRICS = {metric for metric, config in METRIC_REGISTRY.items() if "aggregate" not in config}
+
+ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+DATE_FILTERS = [
+    (re.compile(rf"\bbetween {ISO_DATE} and {ISO_DATE}\b"), lambda m: (m[1], m[2])),
+    (re.compile(rf"\bfrom {ISO_DATE} (?:to|until|through) {ISO_DATE}\b"), lambda m: (m[1], m[2])),
+    (re.compile(rf"\b(?:since|after|from) {ISO_DATE}\b"), lambda m: (m[1], None)),
+    (re.compile(rf"\b(?:until|before|through|up to) {ISO_DATE}\b"), lambda m: (None, m[1])),
+    (re.compile(r"\b(?:in|during) (\d{4})\b"), lambda m: (f"{m[1]}-01-01", f"{m[1]}-12-31")),
+    (re.compile(r"\b(?:in the )?(?:last|past) (\d+) (day|week|month)s?\b"), lambda m: (
+        (date.today() - timedelta(days=int(m[1]) * {"day": 1, "week": 7, "month": 30}[m[2]])).isoformat(), None
+    )),
+]
+
+
+# ---------------------------------------------------
+# FILTER VOCABULARY (DISTINCT VALUES PER DATA VERSION)
+# ---------------------------------------------------
+
+_vocabulary_lock = threading.Lock()
+_vocabulary = {"version": None}
+
+
+def value_filter(values):
+
+    """"for VIP and Loyal customers" / "in Store" → the listed values (after a preposition only)"""
+
+    names = "|".join(re.escape(value.lower()) for value in sorted(values, key=len, reverse=True))
+
+    return re.compile(
+        rf"\b(?:for|among|in|on|via|through|from|within) (?:the )?((?:{names})(?:(?:,| and| or|, and) (?:{names}))*)"
+        rf"(?: (?:customers?|personas?|segments?|shoppers|users|channels?))?\b"
+    )
+
+
+def vocabulary():
+
+    version = data_version()
+
+    with _vocabulary_lock:
+
+        if _vocabulary["version"] != version:
+
+            with engine.connect() as conn:
+                personas = [r[0] for r in conn.execute(text("SELECT DISTINCT persona FROM customers")) if r[0]]
+                channels = [r[0] for r in conn.execute(text("SELECT DISTINCT channel FROM transactions")) if r[0]]
+
+            _vocabulary.update({
+                "version": version,
+                "personas": {value.lower(): value for value in personas},
+                "channels": {value.lower(): value for value in channels},
+                "persona_filter": value_filter(personas) if personas else None,
+                "channel_filter": value_filter(channels) if channels else None,
+            })
+
+        return _vocabulary
+
+
+# ---------------------------------------------------
+# QUESTION → (METRIC, FILTERS)
+# ---------------------------------------------------
+
+def extract_filters(question):
+
+    """→ (question with filter phrases removed, MetricFilters fields)"""
+
+    remaining = " ".join(question.lower().split())
+    fields = {}
+
+    for pattern, bounds in DATE_FILTERS:
+
+        m = pattern.search(remaining)
+
+        if m:
+            start, end = bounds(m)
+            fields.setdefault("start_date", start)
+            fields.setdefault("end_date", end)
+            remaining = remaining[:m.start()] + remaining[m.end():]
+
+    words = vocabulary()
+
+    for field, pattern, values in [("personas", words["persona_filter"], words["personas"]),
+                                   ("channels", words["channel_filter"], words["channels"])]:
+
+        m = pattern.search(remaining) if pattern is not None else None
+
+        if m:
+            listed = re.split(r",? (?:and|or) |, ", m[1])
+            fields[field] = [values[value] for value in listed]
+            remaining = remaining[:m.start()] + remaining[m.end():]
+
+    return remaining, {name: value for name, value in fields.items() if value is not None}
+
+
+def match_question(question):
+
+    """→ {"metric", "filters", "limit", "sql"} when the question is exactly a registry metric, else None"""
+
+    if not FAST_PATH_ENABLED:
+        return None
+
+    try:
+        remaining, fields = extract_filters(question)
+        filters = MetricFilters(**fields)
+    except Exception:
+        return None
+
+    normalized, numbers = normalize_question(remaining)
+
+    for pattern, replacement in SYNONYMS:
+        normalized = pattern.sub(replacement, normalized)
+
+    normalized = " ".join(FILLER.sub(" ", normalized).split())
+
+    m = MATCHER.fullmatch(normalized)
+
+    if m is None or m.lastgroup not in FAST_PATH_METRICS:
+        return None
+
+    config = METRIC_REGISTRY[m.lastgroup]
+    shape = filters.shape()
+
+    # a filter the metric's tables can't apply would be silently dropped → let the LLM handle it
+    if not supports_sql(config["sql"], shape):
+        return None
+
+    return {
+        "metric": m.lastgroup,
+        "filters": filters,
+        "limit": int(float(numbers[0])) if m.lastgroup == "top_products" and numbers else None,
+        "sql": " ".join(compile_sql(config["sql"], shape).split()),
+    }
+
+
+def registry_result(match, approximate=False):
+
+    """Matched question → DataFrame from the cached metric execution, or None to fall back"""
+
+    started = time.perf_counter()
+
+    payload = execute_metric(match["metric"], match["filters"], approximate).payload
+
+    if "error" in payload:
+        return None
+
+    df = pd.DataFrame(payload["data"])
+
+    if match["limit"]:
+        df = df.head(match["limit"])
+
+    df.attrs["guard"] = {
+        "rows": len(df),
+        "truncated": False,
+        "max_rows": None,
+        "estimated_scan_rows": None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    df.attrs["metric"] = match["metric"]
+    df.attrs["chart"] = payload["chart"]
+
+    if "approximate" in payload:
+        df.attrs["approximate"] = payload["approximate"]
+
+    return df
+
+
+# ---------------------------------------------------
+# MATCH RATE + LATENCY SAVINGS
+# ---------------------------------------------------
+
+class FastPathStats:
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.matched = 0
+        self.unmatched = 0
+        self.fast = deque(maxlen=1000)        # seconds: question → DataFrame via the registry
+        self.llm = deque(maxlen=1000)         # seconds: question → DataFrame via generate_sql
+
+    def record(self, matched, elapsed):
+
+        with self.lock:
+
+            if matched:
+                self.matched += 1
+                self.fast.append(elapsed)
+            else:
+                self.unmatched += 1
+                self.llm.append(elapsed)
+
+    def stats(self):
+
+        with self.lock:
+            fast = sorted(self.fast)
+            llm = sorted(self.llm)
+            matched, unmatched = self.matched, self.unmatched
+
+        total = matched + unmatched
+        fast_p50, llm_p50 = percentile_ms(fast, 0.50), percentile_ms(llm, 0.50)
+
+        return {
+            "questions": total,
+            "matched": matched,
+            "match_rate": round(matched / total, 4) if total else 0.0,
+            "fast_path_p50_ms": fast_p50,
+            "fast_path_p95_ms": percentile_ms(fast, 0.95),
+            "llm_path_p50_ms": llm_p50,
+            "llm_path_p95_ms": percentile_ms(llm, 0.95),
+            # saving per matched question ≈ median LLM path − median fast path
+            "estimated_saved_ms": round(matched * max(0.0, llm_p50 - fast_p50), 1) if llm else None,
+        }
+
+
+fast_path = FastPathStats()
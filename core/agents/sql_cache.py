@@ -0,0 +1,375 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+from core.agents.sql_sanitizer import DIALECT, SCHEMA_VERSION, validate_cached, validate_sql
+from database.db_engine import engine
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "1") == "1"
+
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1000"))
+
+# generated SQL older than this is regenerated (prompt / model improvements reach old questions)
+SQL_CACHE_TTL_SECONDS = float(os.getenv("SQL_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# cosine similarity (TF-IDF, word 1-2 grams) a near-duplicate question needs to be a tier-2 candidate
+SQL_CACHE_SIMILARITY = float(os.getenv("SQL_CACHE_SIMILARITY", "0.92"))
+
+# filler that never changes the SQL; words like "by", "top", "last", "not" are kept on purpose
+STOP_WORDS = {
+    "a", "an", "the", "me", "my", "our", "us", "we", "i", "you", "please", "show", "give", "tell",
+    "list", "what", "whats", "which", "is", "are", "was", "were", "do", "does", "can", "could",
+    "would", "of", "for", "to", "and", "how", "much", "many", "there", "that", "this", "all",
+}
+
+# a similar question that differs on any of these asks something else ("bottom" vs "top", "not VIP" vs "VIP")
+GUARDED_WORDS = {
+    # negation
+    "not", "no", "without", "excluding", "exclude", "except", "never", "non",
+    # direction / ranking
+    "top", "bottom", "highest", "lowest", "most", "least", "best", "worst", "max", "min", "maximum", "minimum",
+    "largest", "smallest", "first", "increase", "decrease", "growth", "decline", "up", "down",
+    # time
+    "last", "past", "previous", "next", "current", "this", "today", "yesterday", "ytd", "mtd",
+    "day", "week", "month", "quarter", "year", "daily", "weekly", "monthly", "quarterly", "yearly", "annual",
+}
+
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+WORD = re.compile(r"[a-z#]+(?:_[a-z]+)*")
+
+
+# ---------------------------------------------------
+# NORMALIZATION
+# ---------------------------------------------------
+
+def normalize_question(question):
+
+    """→ (normalized text, number literals): case, punctuation, whitespace, stop-words; numbers → #"""
+
+    lowered = question.lower()
+    numbers = NUMBER.findall(lowered)
+
+    words = [w for w in WORD.findall(NUMBER.sub(" # ", lowered)) if w not in STOP_WORDS]
+
+    return " ".join(words), numbers
+
+
+def stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def stemmed(normalized):
+    return " ".join(stem(w) for w in normalized.split())
+
+
+def same_question(normalized, cached):
+
+    """
+    A TF-IDF neighbour is only reused when it asks for exactly the same content terms
+    (word order, plurals and stop-words aside) → a qualifier is never dropped or added
+    """
+
+    asked = {stem(w) for w in normalized.split()}
+    stored = {stem(w) for w in cached.split()}
+
+    if {stem(w) for w in GUARDED_WORDS} & (asked ^ stored):
+        return False
+
+    return asked == stored
+
+
+def rebind_numbers(sql, old, new):
+
+    """
+    Cached SQL for "top 5 ..." → SQL for "top 10 ...": each differing number must
+    appear in exactly one SQL literal, else None (treated as a miss).
+    """
+
+    if old == new:
+        return sql
+
+    if len(old) != len(new):
+        return None
+
+    tree = sqlglot.parse_one(sql, read=DIALECT)
+    literals = list(tree.find_all(exp.Literal))
+    rebound = set()
+
+    for before, after in zip(old, new):
+
+        if before == after:
+            continue
+
+        pattern = re.compile(rf"(?<![\d.]){re.escape(before)}(?![\d.])")
+        matches = [l for l in literals if id(l) not in rebound and pattern.search(l.this)]
+
+        if len(matches) != 1 or len(pattern.findall(matches[0].this)) != 1:
+            return None
+
+        matches[0].set("this", pattern.sub(after, matches[0].this))
+        rebound.add(id(matches[0]))
+
+    return tree.sql(dialect=DIALECT)
+
+
+# ---------------------------------------------------
+# TWO-TIER CACHE (EXACT + TF-IDF), LRU + TTL, PERSISTED
+# ---------------------------------------------------
+
+class SemanticSQLCache:
+
+    def __init__(self, max_entries=SQL_CACHE_MAX_ENTRIES, ttl=SQL_CACHE_TTL_SECONDS,
+                 threshold=SQL_CACHE_SIMILARITY, bind=engine):
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.bind = bind
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()      # normalized → {"question", "numbers", "sql", "created_at"}
+        self.loaded = False
+
+        # TF-IDF index, refit lazily after the key set changes
+        self.vectorizer = None
+        self.matrix = None
+        self.keys = []
+        self.dirty = True
+
+        self.counters = {
+            "exact_hits": 0, "similar_hits": 0, "similar_rejections": 0, "misses": 0, "stores": 0,
+            "rebinds": 0, "revalidation_failures": 0, "evictions": 0, "expirations": 0,
+        }
+
+    # ------------------------- persistence -------------------------
+
+    def _persist(self, statement, params):
+
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(text(statement), params)
+        except Exception as e:
+            # the cache is an optimisation → never fail the request over it
+            print("SQL cache persistence error:", str(e))
+
+    def _load(self):
+
+        if self.loaded:
+            return
+
+        self.loaded = True
+
+        try:
+            with self.bind.connect() as conn:
+                rows = conn.execute(text(
+                    "SELECT normalized, question, numbers, sql, schema_version, created_at "
+                    "FROM nl_sql_cache ORDER BY created_at DESC LIMIT :limit"
+                ), {"limit": self.max_entries}).fetchall()
+        except Exception as e:
+            print("SQL cache load error:", str(e))
+            return
+
+        now = time.time()
+
+        for normalized, question, numbers, sql, schema_version, created_at in reversed(rows):
+
+            if now - created_at > self.ttl:
+                continue
+
+            # schema moved on since the SQL was generated → keep only what still validates
+            if schema_version != SCHEMA_VERSION:
+
+                validated = validate_sql(sql)
+
+                if "error" in validated:
+                    self.counters["revalidation_failures"] += 1
+                    continue
+
+                sql = validated["sql"]
+
+            self.entries[normalized] = {
+                "question": question, "numbers": json.loads(numbers), "sql": sql, "created_at": created_at
+            }
+
+        self.dirty = True
+
+    # ------------------------- lookup -------------------------
+
+    def _similar(self, normalized):
+
+        """Best neighbour above the threshold that passes same_question(), else (None, 0.0)"""
+
+        if not self.entries:
+            return None, 0.0
+
+        if self.dirty:
+            self.keys = list(self.entries)
+            self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, token_pattern=r"[a-z_#]+",
+                                              preprocessor=stemmed)
+            self.matrix = self.vectorizer.fit_transform(self.keys)
+            self.dirty = False
+
+        scores = linear_kernel(self.vectorizer.transform([normalized]), self.matrix)[0]
+
+        for best in scores.argsort()[::-1]:
+
+            if scores[best] < self.threshold:
+                break
+
+            if same_question(normalized, self.keys[best]):
+                return self.keys[best], float(scores[best])
+
+            # similar wording, different question (extra / missing qualifier)
+            self.counters["similar_rejections"] += 1
+
+        return None, 0.0
+
+    def lookup(self, question):
+
+        """→ (sql, tier, key) with tier "exact" | "similar"; (None, "miss", None) otherwise"""
+
+        normalized, numbers = normalize_question(question)
+
+        with self.lock:
+
+            self._load()
+
+            key, tier, score = normalized, "exact", 1.0
+
+            if key not in self.entries:
+                key, score = self._similar(normalized)
+                tier = "similar"
+
+            if key is None or score < self.threshold:
+                self.counters["misses"] += 1
+                return None, "miss", None
+
+            entry = self.entries[key]
+
+            if time.time() - entry["created_at"] > self.ttl:
+                self._drop(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None, "miss", None
+
+            sql = rebind_numbers(entry["sql"], entry["numbers"], numbers)
+
+            if sql is None:
+                self.counters["misses"] += 1
+                return None, "miss", None
+
+            if sql != entry["sql"]:
+                self.counters["rebinds"] += 1
+
+            self.entries.move_to_end(key)
+            self.counters["exact_hits" if tier == "exact" else "similar_hits"] += 1
+
+        return sql, tier, key
+
+    # ------------------------- updates -------------------------
+
+    def _drop(self, key):
+
+        self.entries.pop(key, None)
+        self.dirty = True
+
+        self._persist("DELETE FROM nl_sql_cache WHERE normalized = :key", {"key": key})
+
+    def store(self, question, sql):
+
+        normalized, numbers = normalize_question(question)
+        created_at = time.time()
+
+        with self.lock:
+
+            self._load()
+
+            self.entries[normalized] = {"question": question, "numbers": numbers, "sql": sql, "created_at": created_at}
+            self.entries.move_to_end(normalized)
+            self.dirty = True
+            self.counters["stores"] += 1
+
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.counters["evictions"] += 1
+
+        self._persist("""
+            INSERT INTO nl_sql_cache (normalized, question, numbers, sql, schema_version, created_at)
+            VALUES (:normalized, :question, :numbers, :sql, :schema_version, :created_at)
+            ON CONFLICT (normalized) DO UPDATE SET
+                question = excluded.question, numbers = excluded.numbers, sql = excluded.sql,
+                schema_version = excluded.schema_version, created_at = excluded.created_at
+        """, {
+            "normalized": normalized, "question": question, "numbers": json.dumps(numbers), "sql": sql,
+            "schema_version": SCHEMA_VERSION, "created_at": created_at,
+        })
+
+    def invalidate(self, key):
+
+        with self.lock:
+            self.counters["revalidation_failures"] += 1
+            self._drop(key)
+
+    def stats(self):
+
+        with self.lock:
+
+            counters = dict(self.counters)
+            lookups = counters["exact_hits"] + counters["similar_hits"] + counters["misses"]
+
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity_threshold": self.threshold,
+                **counters,
+                "hit_rate": round((counters["exact_hits"] + counters["similar_hits"]) / lookups, 4) if lookups else 0.0,
+            }
+
+
+sql_cache = SemanticSQLCache()
+
+
+# ---------------------------------------------------
+# ENTRY POINT (IN FRONT OF generate_sql)
+# ---------------------------------------------------
+
+def cached_generate(user_query, generate):
+
+    """
+    Question → validate_sql() result plus "cache": "exact" | "similar" | "miss".
+    Hits are revalidated against the current schema; failures fall through to generate().
+    """
+
+    if SQL_CACHE_ENABLED:
+
+        sql, tier, key = sql_cache.lookup(user_query)
+
+        if sql is not None:
+
+            validated = validate_cached(sql)
+
+            if "error" not in validated:
+                return {**validated, "cache": tier}
+
+            sql_cache.invalidate(key)
+
+    validated = validate_cached(generate(user_query))
+
+    if SQL_CACHE_ENABLED and "error" not in validated:
+        sql_cache.store(user_query, validated["sql"])
+
+    return {**validated, "cache": "miss"}
@@ -1,14 +1,146 @@
-def sanitize_sql(sql):
+import hashlib
+import json
+import re
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError, OptimizeError
+from sqlglot.optimizer.qualify import qualify
+
+import database.models  # noqa: F401  (registers every mapped table on Base.metadata)
+from analytics.result_cache import ResultCache
+from database.db_engine import Base, engine
+
+# ---------------------------------------------------
+# WHITELIST (FROM database/models.py)
+# ---------------------------------------------------
+
+# bookkeeping tables generated SQL has no business reading
+HIDDEN_TABLES = {
+    "rollup_watermarks", "schema_migrations",
+    "sample_strata", "transactions_sample", "engagement_events_sample",
+    "nl_sql_cache",
+}
+
+SCHEMA = {
+    name: {column.name: column.type.compile(dialect=engine.dialect) for column in table.columns}
+    for name, table in Base.metadata.tables.items()
+    if name not in HIDDEN_TABLES
+}
+
+# changes whenever a table / column is added, removed or retyped → cached SQL gets revalidated
+SCHEMA_VERSION = hashlib.sha256(json.dumps(SCHEMA, sort_keys=True).encode()).hexdigest()[:16]
+
+DIALECT = {"postgresql": "postgres"}.get(engine.dialect.name, engine.dialect.name)
+
+# anything that writes, changes schema or escapes the SQL sandbox
+FORBIDDEN_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+                   exp.Command, exp.Pragma, exp.Attach, exp.Detach, exp.Into)
+
+CODE_FENCE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+
+
+# ---------------------------------------------------
+# VALIDATION
+# ---------------------------------------------------
+
+def parse_statement(sql):
+
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=DIALECT) if s is not None]
+    except ParseError as e:
+        raise ValueError(f"SQL could not be parsed: {e}")
+
+    if len(statements) != 1:
+        raise ValueError(f"Expected a single SELECT statement, got {len(statements)}")
+
+    statement = statements[0]
+
+    if not isinstance(statement, exp.Query):
+        raise ValueError(f"Only SELECT statements are allowed, got {statement.key.upper()}")
+
+    forbidden = statement.find(*FORBIDDEN_NODES)
+
+    if forbidden is not None:
+        raise ValueError(f"Forbidden SQL construct detected: {forbidden.key.upper()}")
+
+    return statement
+
+
+def check_tables(statement):
+
+    ctes = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+
+    tables = set()
 
-    sql_upper = sql.upper()
+    for table in statement.find_all(exp.Table):
+
+        name = table.name.lower()
+
+        if name in ctes:
+            continue
+
+        if name not in SCHEMA:
+            raise ValueError(f"Unknown or forbidden table: {table.name}")
+
+        tables.add(name)
+
+    return sorted(tables)
+
+
+def check_columns(statement):
+
+    # resolves aliases, CTEs and subqueries → unknown / ambiguous columns raise
+    try:
+        qualify(statement.copy(), schema=SCHEMA, dialect=DIALECT, validate_qualify_columns=True)
+    except OptimizeError as e:
+        raise ValueError(f"Invalid column reference: {e}")
+
+
+def validate_sql(sql):
+
+    """
+    Raw generated SQL → {"sql": canonical, "fingerprint", "tables"} or {"error": reason}.
+
+    The canonical form (normalized identifiers, keywords, spacing) is what gets
+    executed and what downstream caches should key on.
+    """
+
+    try:
+        statement = parse_statement(CODE_FENCE.sub("", sql.strip()))
+        tables = check_tables(statement)
+        check_columns(statement)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    canonical = statement.sql(dialect=DIALECT, normalize=True)
+
+    return {
+        "sql": canonical,
+        "fingerprint": hashlib.sha256(canonical.encode()).hexdigest(),
+        "tables": tables,
+    }
+
+
+# ---------------------------------------------------
+# PARSE CACHE (KEYED BY RAW SQL HASH)
+# ---------------------------------------------------
+
+validation_cache = ResultCache(max_entries=1024)
+
+
+def validate_cached(sql):
+    key = hashlib.sha256(sql.encode()).hexdigest()
+    return validation_cache.get_or_compute(key, lambda: validate_sql(sql))
+
+
+def sanitize_sql(sql):
 
-    forbidden = ["DISTINCT", "WITH"]
+    """Validated canonical SQL, or ValueError (same contract as before)"""
 
-    for word in forbidden:
-        if word in sql_upper:
-            raise ValueError(f"Forbidden SQL construct detected: {word}")
+    result = validate_cached(sql)
 
-    if ";" in sql:
-        sql = sql.split(";")[0]
+    if "error" in result:
+        raise ValueError(result["error"])
 
-    return sql
\ No newline at end of file
+    return result["sql"]
@@ -1,20 +1,29 @@
-from core.llm.model_registry import get_client, get_model
-from analytics.query_engine import run_query
-from core.agents.insight_agent import generate_sql, interpret_results, summarize_dataframe
+import json
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from core.llm.gateway import call_deadline, chat, stream_chat
+from core.agents.insight_agent import (
+    data_event, fetch_data, interpret_results, interpretation_key, interpretation_prompt, summarize_dataframe
+)
+from core.agents.insight_cache import insight_cache
 from core.agents.chart_agent import select_chart
-from core.agents.chart_formatter import normalize_chart_data
-from core.agents.sql_sanitizer import sanitize_sql
-
-client = get_client()
+from core.agents.chart_formatter import normalize_chart_data, normalize_chart_frame
 
 
 # =========================================================
 # SPECIALIST AGENT
 # =========================================================
 
-def specialist_agent(role, question, df):
+SPECIALIST_PROMPT_VERSION = "specialist-v1"
+
+
+def specialist_prompt(role, question, df):
 
-    prompt = f"""
+    return f"""
 You are acting as the {role}.
 
 STRICT RULES:
@@ -28,34 +37,351 @@ Dataset Snapshot:
 {summarize_dataframe(df)}
 """
 
-    response = client.chat.completions.create(
-        model=get_model("insight_agent"),
-        messages=[{"role": "user", "content": prompt}]
+
+def specialist_key(role, question, sql_query, df):
+    return insight_cache.key("insight_agent", f"{SPECIALIST_PROMPT_VERSION}:{role}", question, sql_query, df)
+
+
+def specialist_agent(role, question, df, sql_query=None):
+
+    return insight_cache.cached(
+        specialist_key(role, question, sql_query, df),
+        lambda: chat(specialist_prompt(role, question, df), agent="insight_agent")
     )
 
-    return response.choices[0].message.content
+
+# =========================================================
+# PARALLEL FAN-OUT (SPECIALISTS + SYNTHESIS + CHART)
+# =========================================================
+
+ROLES = [
+    "Growth Strategist",
+    "Risk Officer",
+    "Finance Controller",
+    "Market Intelligence Analyst"
+]
+
+WAR_ROOM_MAX_WORKERS = int(os.getenv("WAR_ROOM_MAX_WORKERS", "16"))
+
+# seconds from fan-out start; a role past its deadline is reported, the rest still return
+WAR_ROOM_TIMEOUT_SECONDS = float(os.getenv("WAR_ROOM_TIMEOUT_SECONDS", "45"))
+
+TASK_TIMEOUTS = {
+    "synthesis": 60.0,
+    "chart": 15.0,
+    "combined": 90.0,
+}
+
+war_room_executor = ThreadPoolExecutor(max_workers=WAR_ROOM_MAX_WORKERS, thread_name_prefix="war-room")
+
+
+def stream_fan_out(tasks, timeouts=None, default_timeout=None, until=None):
+
+    """
+    {name: callable(emit)} run concurrently → yields (name, "token", delta) whenever a
+    task calls emit(delta), then one (name, "result", value) or (name, "failed", reason).
+    until → time.monotonic() bound no task deadline may pass (what is left of a wider budget).
+    """
+
+    timeouts = TASK_TIMEOUTS if timeouts is None else timeouts
+    default_timeout = default_timeout or WAR_ROOM_TIMEOUT_SECONDS
+
+    events = queue.Queue()
+
+    def run(name, task):
+        try:
+            # LLM calls inside the task are abandoned at the same deadline it is reported at
+            with call_deadline(deadlines[name]):
+                events.put((name, "result", task(lambda delta: events.put((name, "token", delta)))))
+        except Exception as e:
+            events.put((name, "failed", str(e)))
+
+    # deadlines count from the common start → total wait ≈ slowest task, not the sum
+    started = time.monotonic()
+    deadlines = {name: started + timeouts.get(name, default_timeout) for name in tasks}
+
+    if until is not None:
+        deadlines = {name: min(deadline, until) for name, deadline in deadlines.items()}
+
+    for name, task in tasks.items():
+        war_room_executor.submit(run, name, task)
+
+    pending = set(tasks)
+
+    while pending:
+
+        try:
+            name, kind, value = events.get(timeout=max(0.0, min(deadlines[n] for n in pending) - time.monotonic()))
+
+        except queue.Empty:
+            for name in [n for n in pending if deadlines[n] <= time.monotonic()]:
+                pending.discard(name)
+                yield name, "failed", f"timed out after {deadlines[name] - started:.3g}s"
+            continue
+
+        # late output of a task that already timed out
+        if name not in pending:
+            continue
+
+        if kind != "token":
+            pending.discard(name)
+
+        yield name, kind, value
+
+
+def fan_out(tasks, timeouts=None, default_timeout=None, until=None):
+
+    """{name: callable} run concurrently → ({name: result}, {name: failure reason})"""
+
+    results = {}
+    failures = {}
+
+    wrapped = {name: (lambda emit, task=task: task()) for name, task in tasks.items()}
+
+    for name, kind, value in stream_fan_out(wrapped, timeouts, default_timeout, until):
+
+        if kind == "result":
+            results[name] = value
+
+        elif kind == "failed":
+            failures[name] = value
+
+    return results, failures
+
+
+def streamed(prompt, agent="insight_agent", key=None):
+
+    """Fan-out task that emits each token delta and returns the full text (cached under key)"""
+
+    def task(emit):
+
+        parts = []
+
+        for delta in insight_cache.cached_stream(key, lambda: stream_chat(prompt, agent=agent)):
+            parts.append(delta)
+            emit(delta)
+
+        return "".join(parts)
+
+    return task
+
+
+# =========================================================
+# SINGLE-CALL MODE (ALL ROLES + SYNTHESIS, ONE JSON RESPONSE)
+# =========================================================
+
+# "parallel" → one call per role + synthesis; "single" → one structured call, parallel on failure
+WAR_ROOM_MODES = ("parallel", "single")
+WAR_ROOM_MODE = os.getenv("WAR_ROOM_MODE", "parallel")
+
+# single mode has one budget (TASK_TIMEOUTS["combined"]) for the structured call AND its fallback
+# → the structured call stops this many seconds early so the per-role calls still fit
+WAR_ROOM_FALLBACK_RESERVE_SECONDS = float(os.getenv("WAR_ROOM_FALLBACK_RESERVE_SECONDS", str(WAR_ROOM_TIMEOUT_SECONDS)))
+
+# less of the budget left than this → report the failure, don't start calls that can only time out
+WAR_ROOM_FALLBACK_MIN_SECONDS = float(os.getenv("WAR_ROOM_FALLBACK_MIN_SECONDS", "5"))
+
+COMBINED_PROMPT_VERSION = "war-room-single-v1"
+
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "opinions": {
+            "type": "object",
+            "properties": {role: {"type": "string"} for role in ROLES},
+            "required": ROLES,
+            "additionalProperties": False,
+        },
+        "synthesis": {"type": "string"},
+    },
+    "required": ["opinions", "synthesis"],
+    "additionalProperties": False,
+}
+
+COMBINED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "war_room", "strict": True, "schema": COMBINED_SCHEMA},
+}
+
+
+def combined_prompt(question, sql_query, df):
+
+    # question + dataset snapshot sent once instead of once per role
+    roles = "\n".join(f"- {role}" for role in ROLES)
+
+    return f"""
+You are running an executive war room. Answer as each of these roles in turn:
+{roles}
+
+For each role ("opinions"):
+- Max 3 bullets
+- Executive tone
+
+Then, as an Executive Business Intelligence AI, write "synthesis" in this STRICT FORMAT:
+
+EXECUTIVE SUMMARY:
+(max 3 lines)
+
+KEY FINDINGS:
+(max 5 bullets)
+
+BUSINESS IMPLICATION:
+(max 2 lines)
+
+RECOMMENDED ACTIONS:
+(max 3 bullets)
+
+Return JSON matching the response schema.
+
+Strategic Question:
+{question}
+
+SQL Used:
+{sql_query}
+
+Dataset Snapshot:
+{summarize_dataframe(df)}
+"""
+
+
+def parse_combined(content):
+
+    """Structured response → {role: opinion, ..., "synthesis": text}, or ValueError"""
+
+    data = json.loads(content)
+
+    opinions = data.get("opinions") if isinstance(data, dict) else None
+
+    if not isinstance(opinions, dict):
+        raise ValueError("war room response has no opinions object")
+
+    results = {role: opinions.get(role) for role in ROLES}
+    results["synthesis"] = data.get("synthesis")
+
+    missing = [name for name, text in results.items() if not isinstance(text, str) or not text.strip()]
+
+    if missing:
+        raise ValueError(f"war room response missing {', '.join(missing)}")
+
+    return results
+
+
+def combined_agent(question, sql_query, df):
+
+    def call():
+
+        content = chat(combined_prompt(question, sql_query, df), agent="war_room_agent",
+                       response_format=COMBINED_RESPONSE_FORMAT)
+
+        # only validated responses reach the cache
+        parse_combined(content)
+
+        return content
+
+    key = insight_cache.key("war_room_agent", COMBINED_PROMPT_VERSION, question, sql_query, df)
+
+    return parse_combined(insight_cache.cached(key, call))
+
+
+def single_mode_budget():
+
+    """→ (until, timeouts): the end of the single-mode budget and the structured call's share of it"""
+
+    budget = TASK_TIMEOUTS["combined"]
+
+    # at least half the budget, however large the reserve
+    combined = max(budget - WAR_ROOM_FALLBACK_RESERVE_SECONDS, budget / 2)
+
+    return time.monotonic() + budget, {**TASK_TIMEOUTS, "combined": combined}
+
+
+def fallback_budget_left(until, reason, thinking_log):
+
+    """Logs the single-call failure → True when the per-role fallback still has time to run"""
+
+    left = until - time.monotonic()
+
+    if left < WAR_ROOM_FALLBACK_MIN_SECONDS:
+        thinking_log.append(f"Single-call war room failed ({reason}) → no budget left for fallback ({max(left, 0):.3g}s).")
+        return False
+
+    thinking_log.append(f"Single-call war room failed ({reason}) → falling back to per-role calls ({left:.3g}s left).")
+
+    return True
+
+
+def parallel_tasks(user_query, sql_query, df, market_context=None):
+
+    tasks = {role: partial(specialist_agent, role, user_query, df, sql_query) for role in ROLES}
+    tasks["synthesis"] = partial(interpret_results, user_query, sql_query, df, market_context)
+
+    return tasks
+
+
+def war_room_analysis(user_query, sql_query, df, market_context=None, mode=None, thinking_log=None):
+
+    """Roles + synthesis + chart for one result → ({name: result}, {name: failure reason})"""
+
+    mode = mode or WAR_ROOM_MODE
+    thinking_log = thinking_log if thinking_log is not None else []
+
+    if mode not in WAR_ROOM_MODES:
+        raise ValueError(f"Unknown war room mode: {mode}")
+
+    if mode == "single":
+        tasks = {"combined": partial(combined_agent, user_query, sql_query, df)}
+    else:
+        tasks = parallel_tasks(user_query, sql_query, df, market_context)
+
+    tasks["chart"] = partial(select_chart, user_query, df)
+
+    started = time.perf_counter()
+
+    # single mode: structured call + any fallback share one budget
+    until, timeouts = single_mode_budget() if mode == "single" else (None, None)
+
+    results, failures = fan_out(tasks, timeouts, until=until)
+
+    thinking_log.append(f"War Room {mode} mode: {len(tasks)} calls in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    if mode == "single":
+
+        combined = results.pop("combined", None)
+        reason = failures.pop("combined", None)
+
+        if combined is not None:
+            results.update(combined)
+
+        elif not fallback_budget_left(until, reason, thinking_log):
+            failures["combined"] = reason
+
+        else:
+            # malformed / late structured output → the per-role prompts still answer
+            fallback, fallback_failures = fan_out(parallel_tasks(user_query, sql_query, df, market_context), until=until)
+
+            results.update(fallback)
+            failures.update(fallback_failures)
+
+    return results, failures
 
 
 # =========================================================
 # WAR ROOM ENGINE
 # =========================================================
 
-def run_war_room(user_query, market_context=None):
+def run_war_room(user_query, market_context=None, as_frame=False, approximate=False, mode=None):
 
     thinking_log = []
 
     thinking_log.append("War Room activated.")
 
-    sql_query = sanitize_sql(generate_sql(user_query))
+    sql_query, df = fetch_data(user_query, thinking_log, approximate)
 
     thinking_log.append("SQL generated.")
-    thinking_log.append(sql_query)
 
-    df = run_query(sql_query)
+    if isinstance(df, dict):
 
-    if isinstance(df, str):
-
-     thinking_log.append("SQL execution failed.")
+     thinking_log.append(f"SQL execution failed ({df['code']}).")
 
      return {
         "insight": "Query execution failed. Adjusting analytical strategy recommended.",
@@ -65,39 +391,140 @@ def run_war_room(user_query, market_context=None):
         "chart": None
     }
 
-    roles = [
-        "Growth Strategist",
-        "Risk Officer",
-        "Finance Controller",
-        "Market Intelligence Analyst"
-    ]
-
-    opinions = {}
+    results, failures = war_room_analysis(user_query, sql_query, df, market_context, mode, thinking_log)
 
-    for role in roles:
-        opinions[role] = specialist_agent(role, user_query, df)
+    response = war_room_response(results, failures, thinking_log)
 
-    debate = opinions
+    # ✅ CHART FIX
+    response["data"] = normalize_chart_frame(df) if as_frame else normalize_chart_data(df)
 
-    synthesis = interpret_results(user_query, sql_query, df, market_context)
+    return response
 
-    confidence = "Confidence: 85% | Risk Level: Medium | Disagreement Level: Low"
 
-    tension = "Strategic Tension: Medium | Primary Conflict: Growth vs Risk"
+def war_room_response(results, failures, thinking_log):
 
-    chart = select_chart(user_query, df)
+    for name, reason in failures.items():
+        thinking_log.append(f"{name} unavailable ({reason}).")
 
     thinking_log.append("War Room analysis complete.")
 
     return {
-        "insight": synthesis,
-        "debate": debate,
-        "confidence": confidence,
-        "tension": tension,
+        # partial results → whoever answered in time
+        "insight": results.get("synthesis", "Synthesis unavailable. See the specialist debate."),
+        "debate": {role: results[role] for role in ROLES if role in results},
+        "unavailable": failures,
+        "confidence": "Confidence: 85% | Risk Level: Medium | Disagreement Level: Low",
+        "tension": "Strategic Tension: Medium | Primary Conflict: Growth vs Risk",
+        "chart": results.get("chart", "bar"),
+        "thinking": thinking_log
+    }
 
-        # ✅ CHART FIX
-        "chart": chart,
-        "data": normalize_chart_data(df),
 
-        "thinking": thinking_log
-    }
\ No newline at end of file
+# =========================================================
+# STREAMED WAR ROOM (SERVER-SENT EVENTS)
+# =========================================================
+
+def streamed_tasks(user_query, sql_query, df):
+
+    tasks = {
+        role: streamed(specialist_prompt(role, user_query, df), key=specialist_key(role, user_query, sql_query, df))
+        for role in ROLES
+    }
+    tasks["synthesis"] = streamed(
+        interpretation_prompt(user_query, sql_query, df), key=interpretation_key(user_query, sql_query, df)
+    )
+
+    return tasks
+
+
+def relay(fan_out_events, df, results, failures):
+
+    """stream_fan_out events → SSE (event, payload) pairs, filling results / failures"""
+
+    for name, kind, value in fan_out_events:
+
+        if kind == "failed":
+            failures[name] = value
+            yield "unavailable", {"name": name, "reason": value}
+
+        elif name == "chart":
+            results[name] = value
+            yield "chart", {"chart": value, "data": normalize_chart_data(df)}
+
+        elif name == "combined":
+            # one structured answer → the same opinion / synthesis events as parallel mode
+            results.update(value)
+            for role in ROLES:
+                yield "opinion", {"role": role, "text": value[role]}
+            yield "synthesis", {"text": value["synthesis"]}
+
+        elif name == "synthesis":
+            if kind == "token":
+                yield "synthesis_token", {"delta": value}
+            else:
+                results[name] = value
+                yield "synthesis", {"text": value}
+
+        elif kind == "token":
+            yield "opinion_token", {"role": name, "delta": value}
+
+        else:
+            results[name] = value
+            yield "opinion", {"role": name, "text": value}
+
+
+def war_room_events(user_query, market_context=None, approximate=False, mode=None):
+
+    """
+    run_war_room stage by stage as (event, payload): sql → data → then, as they land,
+    chart / opinion_token / opinion / synthesis_token / synthesis / unavailable → done.
+    Single mode sends whole opinions (no tokens) unless it falls back to per-role calls.
+    """
+
+    mode = mode or WAR_ROOM_MODE
+
+    if mode not in WAR_ROOM_MODES:
+        raise ValueError(f"Unknown war room mode: {mode}")
+
+    thinking_log = ["War Room activated."]
+
+    sql_query, df = fetch_data(user_query, thinking_log, approximate)
+
+    if sql_query:
+        yield "sql", {"sql": sql_query}
+
+    if isinstance(df, dict):
+
+        thinking_log.append(f"SQL execution failed ({df['code']}).")
+
+        yield "error", df
+        yield "done", {"thinking": thinking_log}
+        return
+
+    yield "data", data_event(df)
+
+    if mode == "single":
+        tasks = {"combined": lambda emit: combined_agent(user_query, sql_query, df)}
+        until, timeouts = single_mode_budget()
+    else:
+        tasks = streamed_tasks(user_query, sql_query, df)
+        until, timeouts = None, None
+
+    tasks["chart"] = lambda emit: select_chart(user_query, df)
+
+    results = {}
+    failures = {}
+
+    yield from relay(stream_fan_out(tasks, timeouts, until=until), df, results, failures)
+
+    if mode == "single" and "combined" in failures and fallback_budget_left(until, failures["combined"], thinking_log):
+
+        failures.pop("combined")
+
+        # per-role streams get only what is left of the single-mode budget
+        yield from relay(stream_fan_out(streamed_tasks(user_query, sql_query, df), until=until), df, results, failures)
+
+    response = war_room_response(results, failures, thinking_log)
+    response["data"] = normalize_chart_data(df)
+
+    yield "done", response
\ No newline at end of file
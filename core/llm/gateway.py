@@ -0,0 +1,351 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import httpx
+from dotenv import load_dotenv
+from openai import APITimeoutError, AsyncOpenAI, OpenAI
+
+from core.llm.model_registry import get_model
+
+load_dotenv()
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+# None → api.openai.com; any OpenAI-compatible server otherwise
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# one keep-alive pool for every agent → TLS handshakes are paid once per socket, not per client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+# in-flight LLM calls across the whole process (sync + async)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+LLM_DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+# read timeout per model (seconds); slow reasoning models get longer
+MODEL_TIMEOUTS = {
+    "gpt-5-mini": LLM_DEFAULT_TIMEOUT,
+    "gpt-5": 120.0,
+}
+
+LIMITS = httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+)
+
+
+def model_timeout(model):
+    return httpx.Timeout(MODEL_TIMEOUTS.get(model, LLM_DEFAULT_TIMEOUT), connect=LLM_CONNECT_TIMEOUT)
+
+
+# ---------------------------------------------------
+# SHARED CLIENTS
+# ---------------------------------------------------
+
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=OPENAI_BASE_URL,
+    max_retries=LLM_MAX_RETRIES,
+    http_client=httpx.Client(limits=LIMITS, timeout=model_timeout(None)),
+)
+
+_async_client = None
+
+
+def get_async_client():
+
+    """Created on first use → binds its pool to the running event loop (FastAPI's)"""
+
+    global _async_client
+
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=OPENAI_BASE_URL,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=LIMITS, timeout=model_timeout(None)),
+        )
+
+    return _async_client
+
+
+# ---------------------------------------------------
+# CALL DEADLINES (PER THREAD)
+# ---------------------------------------------------
+
+_deadline = threading.local()
+
+
+@contextmanager
+def call_deadline(at):
+
+    """
+    Every sync call on this thread must finish by time.monotonic() deadline `at`
+    → slot wait, request timeout and streamed reads are all cut off there
+    """
+
+    previous = getattr(_deadline, "at", None)
+    _deadline.at = at if previous is None else min(previous, at)
+
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+
+def remaining_time():
+
+    """Seconds left before this thread's deadline (None → no deadline); TimeoutError once it passed"""
+
+    at = getattr(_deadline, "at", None)
+
+    if at is None:
+        return None
+
+    remaining = at - time.monotonic()
+
+    if remaining <= 0:
+        raise TimeoutError("call deadline passed")
+
+    return remaining
+
+
+def bounded_call(model):
+
+    """(client, timeout) for one request under the current deadline"""
+
+    remaining = remaining_time()
+    timeout = MODEL_TIMEOUTS.get(model, LLM_DEFAULT_TIMEOUT)
+
+    if remaining is None or remaining >= timeout:
+        return client, model_timeout(model)
+
+    # retries would restart the clock → one attempt with whatever time is left
+    return client.with_options(max_retries=0), httpx.Timeout(remaining, connect=min(LLM_CONNECT_TIMEOUT, remaining))
+
+
+# ---------------------------------------------------
+# GLOBAL CONCURRENCY LIMIT
+# ---------------------------------------------------
+
+_slots = threading.BoundedSemaphore(LLM_CONCURRENCY)
+
+ASYNC_POLL_SECONDS = 0.01
+
+
+@contextmanager
+def slot():
+
+    """Concurrency slot; under a deadline the wait gives up when the deadline does"""
+
+    remaining = remaining_time()
+
+    if not _slots.acquire(timeout=remaining):
+        raise TimeoutError("call deadline passed waiting for an LLM slot")
+
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+async def acquire_slot():
+
+    # same semaphore as the sync path; polling keeps the event loop free while waiting
+    while not _slots.acquire(blocking=False):
+        await asyncio.sleep(ASYNC_POLL_SECONDS)
+
+
+# ---------------------------------------------------
+# LATENCY STATISTICS
+# ---------------------------------------------------
+
+_stats_lock = threading.Lock()
+_latencies = defaultdict(lambda: deque(maxlen=1000))     # (agent, model) → recent call seconds
+_first_tokens = defaultdict(lambda: deque(maxlen=1000))  # (agent, model) → streamed time to first token
+_waits = deque(maxlen=1000)                              # recent concurrency-slot waits
+_counters = defaultdict(lambda: {"calls": 0, "errors": 0, "timeouts": 0, "prompt_tokens": 0, "completion_tokens": 0})
+
+
+def record(agent, model, waited, elapsed, response=None, error=None, first_token=None):
+
+    with _stats_lock:
+
+        if first_token is not None:
+            _first_tokens[(agent, model)].append(first_token)
+
+        counters = _counters[(agent, model)]
+        counters["calls"] += 1
+
+        _waits.append(waited)
+
+        if error is not None:
+            counters["errors"] += 1
+            counters["timeouts"] += isinstance(error, APITimeoutError)
+            return
+
+        _latencies[(agent, model)].append(elapsed)
+
+        usage = getattr(response, "usage", None)
+
+        if usage is not None:
+            counters["prompt_tokens"] += usage.prompt_tokens or 0
+            counters["completion_tokens"] += usage.completion_tokens or 0
+
+
+def percentile_ms(values, q):
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1) if values else 0.0
+
+
+def llm_stats():
+
+    with _stats_lock:
+        latencies = {key: sorted(values) for key, values in _latencies.items()}
+        first_tokens = {key: sorted(values) for key, values in _first_tokens.items()}
+        counters = {key: dict(values) for key, values in _counters.items()}
+        waits = sorted(_waits)
+
+    return {
+        "concurrency_limit": LLM_CONCURRENCY,
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "slot_wait_p50_ms": percentile_ms(waits, 0.50),
+        "slot_wait_p95_ms": percentile_ms(waits, 0.95),
+        "agents": [
+            {
+                "agent": agent,
+                "model": model,
+                **counters[(agent, model)],
+                "p50_ms": percentile_ms(latencies.get((agent, model), []), 0.50),
+                "p95_ms": percentile_ms(latencies.get((agent, model), []), 0.95),
+                "p99_ms": percentile_ms(latencies.get((agent, model), []), 0.99),
+                "first_token_p50_ms": percentile_ms(first_tokens.get((agent, model), []), 0.50),
+            }
+            for agent, model in counters
+        ],
+    }
+
+
+# ---------------------------------------------------
+# CALL PATHS
+# ---------------------------------------------------
+
+def as_messages(prompt):
+    return [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+
+
+def chat_completion(prompt, agent="insight_agent", **kwargs):
+
+    """Sync chat completion for agent's model → full response object"""
+
+    model = kwargs.pop("model", None) or get_model(agent)
+
+    queued = time.perf_counter()
+
+    with slot():
+
+        started = time.perf_counter()
+
+        try:
+            bound_client, timeout = bounded_call(model)
+            response = bound_client.chat.completions.create(
+                model=model, messages=as_messages(prompt), timeout=timeout, **kwargs
+            )
+        except Exception as e:
+            record(agent, model, started - queued, time.perf_counter() - started, error=e)
+            raise
+
+    record(agent, model, started - queued, time.perf_counter() - started, response)
+
+    return response
+
+
+async def achat_completion(prompt, agent="insight_agent", **kwargs):
+
+    """Async counterpart of chat_completion (shares the concurrency limit and statistics)"""
+
+    model = kwargs.pop("model", None) or get_model(agent)
+
+    queued = time.perf_counter()
+
+    await acquire_slot()
+
+    started = time.perf_counter()
+
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=model, messages=as_messages(prompt), timeout=model_timeout(model), **kwargs
+        )
+    except Exception as e:
+        record(agent, model, started - queued, time.perf_counter() - started, error=e)
+        raise
+    finally:
+        _slots.release()
+
+    record(agent, model, started - queued, time.perf_counter() - started, response)
+
+    return response
+
+
+def chat(prompt, agent="insight_agent", **kwargs):
+    return chat_completion(prompt, agent, **kwargs).choices[0].message.content
+
+
+async def achat(prompt, agent="insight_agent", **kwargs):
+    return (await achat_completion(prompt, agent, **kwargs)).choices[0].message.content
+
+
+def stream_chat(prompt, agent="insight_agent", **kwargs):
+
+    """Sync streamed chat completion → yields text deltas as they arrive"""
+
+    model = kwargs.pop("model", None) or get_model(agent)
+
+    queued = time.perf_counter()
+
+    with slot():
+
+        started = time.perf_counter()
+        first_token = None
+        last = None
+
+        try:
+            bound_client, timeout = bounded_call(model)
+            stream = bound_client.chat.completions.create(
+                model=model, messages=as_messages(prompt), timeout=timeout,
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+
+            for chunk in stream:
+
+                # read timeouts are per chunk → a trickling stream is cut off at the deadline here
+                try:
+                    remaining_time()
+                except TimeoutError:
+                    stream.close()
+                    raise
+
+                # usage arrives on the final (choice-less) chunk
+                last = chunk
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    yield delta
+
+        except Exception as e:
+            record(agent, model, started - queued, time.perf_counter() - started, error=e)
+            raise
+
+    record(agent, model, started - queued, time.perf_counter() - started, last, first_token=first_token)
@@ -1,14 +1,16 @@
-from openai import OpenAI
-import os
-
 MODEL_CONFIG = {
     "insight_agent": "gpt-5-mini",
     "sql_agent": "gpt-5-mini",
     "prediction_agent": "gpt-5-mini",
+    "war_room_agent": "gpt-5-mini",
 }
 
 def get_client():
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    # one pooled client for the whole process (core/llm/gateway.py)
+    from core.llm.gateway import client
+
+    return client
 
 def get_model(agent_name):
     return MODEL_CONFIG.get(agent_name, "gpt-5-mini")
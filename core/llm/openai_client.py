@@ -1,6 +1,4 @@
-from openai import OpenAI
-
-client = OpenAI()
+from core.llm.gateway import chat
 
 
 def query_llm(prompt):
@@ -10,12 +8,8 @@ def query_llm(prompt):
 
     try:
 
-        response = client.responses.create(
-            model="gpt-5-mini",   # cheap + perfect for accelerator
-            input=prompt
-        )
-
-        return response.output_text
+        # cheap + perfect for accelerator
+        return chat(prompt, agent="query_llm", model="gpt-5-mini")
 
     except Exception as e:
 
@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
-import time
 
 from core.agents.insight_agent import ask_with_data
-from core.agents.war_room_agent import run_war_room
+from core.agents.war_room_agent import ROLES, war_room_events
+from analytics.filters import MetricFilters, filtered_source
+from database.db_engine import connect_sqlite
 
 st.set_page_config(layout="wide")
 
@@ -17,17 +17,12 @@ st.set_page_config(layout="wide")
 
 @st.cache_resource
 def get_connection():
-    return sqlite3.connect("omni.db", check_same_thread=False)
+    return connect_sqlite()
 
 conn = get_connection()
 
-customers = pd.read_sql("SELECT * FROM customers", conn)
-transactions = pd.read_sql("SELECT * FROM transactions", conn)
-events = pd.read_sql("SELECT * FROM engagement_events", conn)
-
-customers["signup_date"] = pd.to_datetime(customers["signup_date"])
-transactions["timestamp"] = pd.to_datetime(transactions["timestamp"])
-events["timestamp"] = pd.to_datetime(events["timestamp"])
+def distinct_values(table, column):
+    return pd.read_sql(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}", conn)[column].tolist()
 
 # ---------------------------------------------------
 # GLOBAL FILTERS
@@ -35,22 +30,26 @@ events["timestamp"] = pd.to_datetime(events["timestamp"])
 
 st.sidebar.title("Intelligence Filters")
 
+persona_options = distinct_values("customers", "persona")
+channel_options = distinct_values("transactions", "channel")
+city_options = distinct_values("customers", "city")
+
 personas = st.sidebar.multiselect(
     "Persona",
-    customers["persona"].unique(),
-    default=customers["persona"].unique()
+    persona_options,
+    default=persona_options
 )
 
 channels = st.sidebar.multiselect(
     "Transaction Channel",
-    transactions["channel"].unique(),
-    default=transactions["channel"].unique()
+    channel_options,
+    default=channel_options
 )
 
 cities = st.sidebar.multiselect(
     "City",
-    customers["city"].unique(),
-    default=customers["city"].unique()
+    city_options,
+    default=city_options
 )
 
 churn_range = st.sidebar.slider(
@@ -59,23 +58,31 @@ churn_range = st.sidebar.slider(
 )
 
 # ---------------------------------------------------
-# APPLY FILTERS
+# APPLY FILTERS (IN THE DATABASE)
 # ---------------------------------------------------
 
-customers_f = customers[
-    (customers["persona"].isin(personas)) &
-    (customers["city"].isin(cities)) &
-    (customers["churn_risk"].between(*churn_range))
-].copy()
+filters = MetricFilters(
+    personas=personas,
+    channels=channels,
+    cities=cities,
+    churn_min=churn_range[0],
+    churn_max=churn_range[1]
+)
 
-transactions_f = transactions[
-    (transactions["customer_id"].isin(customers_f["customer_id"])) &
-    (transactions["channel"].isin(channels))
-]
+def load_filtered(table, parse_dates):
 
-events_f = events[
-    events["customer_id"].isin(customers_f["customer_id"])
-]
+    shape = filters.shape()
+
+    return pd.read_sql(
+        f"SELECT * FROM {filtered_source(table, shape)}",
+        conn,
+        params=filters.params(),
+        parse_dates=parse_dates
+    )
+
+customers_f = load_filtered("customers", ["signup_date"])
+transactions_f = load_filtered("transactions", ["timestamp"])
+events_f = load_filtered("engagement_events", ["timestamp"])
 
 # ---------------------------------------------------
 # HEADER KPIs
@@ -361,26 +368,59 @@ with tab7:
         thinking_ui = st.empty()
         progress = st.progress(0)
 
-        debate_messages = [
-            "Analyst Agent evaluating internal performance signals...",
-            "Risk Agent scanning for systemic vulnerabilities...",
-            "Growth Agent modelling expansion scenarios...",
-            "Strategy Agent forming competing hypotheses...",
-            "Agents detecting conflicting interpretations...",
-            "Debate Engine resolving disagreements...",
-            "Executive Synthesis Agent preparing boardroom report..."
-        ]
+        # real pipeline stages as they complete: sql, data, chart, one per specialist, synthesis
+        stages = 3 + len(ROLES) + 1
+        completed = 0
+
+        opinions = {}
+        opinion_ui = {}
+        synthesis_ui = st.empty()
+        synthesis = ""
+
+        response = {}
+
+        thinking_ui.info("Generating SQL...")
+
+        for event, payload in war_room_events(query, market_context):
+
+            if event == "sql":
+                thinking_ui.info("SQL generated. Querying internal performance signals...")
+
+            elif event == "data":
+                thinking_ui.info(f"{payload['rows']} rows retrieved. Specialists deliberating...")
+
+            elif event == "chart":
+                thinking_ui.info(f"Visual selected: {payload['chart']}")
+
+            elif event in ("opinion_token", "opinion"):
+
+                role = payload["role"]
+
+                if role not in opinion_ui:
+                    opinion_ui[role] = st.empty()
+
+                opinions[role] = opinions.get(role, "") + payload["delta"] if event == "opinion_token" else payload["text"]
+                opinion_ui[role].markdown(f"**{role}**\n\n{opinions[role]}")
+
+            elif event == "synthesis_token":
+                synthesis += payload["delta"]
+                synthesis_ui.markdown(synthesis)
 
-        for i, msg in enumerate(debate_messages):
+            elif event == "unavailable":
+                thinking_ui.warning(f"{payload['name']} unavailable ({payload['reason']})")
 
-            thinking_ui.info(msg)
-            progress.progress((i + 1) / len(debate_messages))
+            elif event == "error":
+                response["insight"] = f"Query execution failed: {payload['message']}"
 
-            time.sleep(0.6)
+            elif event == "done":
+                response = {**payload, **response}
 
-        response = run_war_room(query, market_context)
+            if event in ("sql", "data", "chart", "opinion", "synthesis", "unavailable"):
+                completed += 1
+                progress.progress(min(completed / stages, 1.0))
 
         progress.empty()
+        synthesis_ui.empty()
 
         thinking_ui.success("Multi-Agent Analysis Complete")
 
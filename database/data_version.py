@@ -0,0 +1,48 @@
+import threading
+from sqlalchemy import text
+
+from database.db_engine import engine
+
+# ---------------------------------------------------
+# DATA VERSION
+# ---------------------------------------------------
+
+# ids only grow → MAX(pk) moves on every insert, from any process (O(log n) per table)
+VERSIONED_TABLES = {
+    "customers": "customer_id",
+    "transactions": "transaction_id",
+    "engagement_events": "event_id",
+}
+
+_appends = 0
+_rewrites = 0
+_version_lock = threading.Lock()
+
+
+def bump_data_version(rewrite=False):
+
+    """
+    In-process writers call this after committing. Pure inserts (the default) only
+    move caches on; rewrite=True → rows were updated / deleted, which MAX(pk) can't
+    see, so derived copies (the columnar store) must reload instead of appending.
+    """
+
+    global _appends, _rewrites
+
+    with _version_lock:
+        if rewrite:
+            _rewrites += 1
+        else:
+            _appends += 1
+
+
+def data_version(bind=engine):
+
+    with bind.connect() as conn:
+        max_ids = tuple(
+            conn.execute(text(f"SELECT MAX({pk}) FROM {table}")).scalar() or 0
+            for table, pk in VERSIONED_TABLES.items()
+        )
+
+    # (..., appends, rewrites) → rewrites stays last
+    return max_ids + (_appends, _rewrites)
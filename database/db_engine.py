@@ -1,5 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
 
@@ -13,15 +19,167 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./omni.db"
 
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# file every raw sqlite3 user must open (same one the engine uses)
+SQLITE_PATH = make_url(DATABASE_URL).database if IS_SQLITE else None
+
+# -----------------------------
+# SQLITE PERFORMANCE PROFILES
+# -----------------------------
+
+SQLITE_PROFILES = {
+
+    # SQLite defaults → rollback journal, every commit fsynced
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,            # negative → KiB (2 MB)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+
+    # WAL → readers never block the writer; fsync only at checkpoints
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,           # 64 MB
+        "mmap_size": 268435456,         # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+
+    # bulk loads / benchmarks → may lose the last commits on power loss
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,          # 256 MB
+        "mmap_size": 1073741824,        # 1 GB
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "balanced")
+
+
+def apply_sqlite_profile(dbapi_connection, profile=None):
+
+    settings = SQLITE_PROFILES[profile or SQLITE_PROFILE]
+
+    cursor = dbapi_connection.cursor()
+
+    for pragma, value in settings.items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+
+    cursor.close()
+
+
+def connect_sqlite(profile=None, path=None, **kwargs):
+
+    """Raw sqlite3 connection to the engine's database file (or `path`) with the same profile"""
+
+    if path is None and not IS_SQLITE:
+        raise RuntimeError(f"connect_sqlite() needs a sqlite DATABASE_URL, got {DATABASE_URL}")
+
+    conn = sqlite3.connect(path or SQLITE_PATH, check_same_thread=False, **kwargs)
+    apply_sqlite_profile(conn, profile)
+
+    return conn
+
+# -----------------------------
+# CONNECTION POOL
+# -----------------------------
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": True,
+}
+
+# in-memory SQLite uses a per-thread singleton pool → no queue to tune
+if IS_SQLITE and SQLITE_PATH in (None, "", ":memory:"):
+    POOL_SETTINGS = {}
+
 # -----------------------------
 # ENGINE
 # -----------------------------
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **POOL_SETTINGS
 )
 
+if IS_SQLITE:
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_profile(dbapi_connection)
+
+# -----------------------------
+# POOL STATISTICS
+# -----------------------------
+
+_pool_lock = threading.Lock()
+_pool_waits = deque(maxlen=1000)      # recent checkout waits (seconds)
+_pool_counters = {"checkouts": 0, "checkout_errors": 0}
+
+
+@contextmanager
+def pooled_connection():
+
+    """engine.connect() that records how long the pool made us wait"""
+
+    started = time.perf_counter()
+
+    try:
+        conn = engine.connect()
+    except Exception:
+        with _pool_lock:
+            _pool_counters["checkout_errors"] += 1
+        raise
+
+    with _pool_lock:
+        _pool_waits.append(time.perf_counter() - started)
+        _pool_counters["checkouts"] += 1
+
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def get_pool_stats():
+
+    pool = engine.pool
+
+    with _pool_lock:
+        waits = sorted(_pool_waits)
+        counters = dict(_pool_counters)
+
+    def wait_ms(q):
+        return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 3) if waits else 0.0
+
+    stats = {
+        "pool": type(pool).__name__,
+        "status": pool.status(),
+        **counters,
+        "wait_p50_ms": wait_ms(0.50),
+        "wait_p95_ms": wait_ms(0.95),
+        "wait_max_ms": round(waits[-1] * 1000, 3) if waits else 0.0,
+    }
+
+    # QueuePool only
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+
+    return stats
+
 # -----------------------------
 # SESSION
 # -----------------------------
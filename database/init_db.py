@@ -1,8 +1,7 @@
-from database.db_engine import engine, Base
-from database import models   # VERY IMPORTANT → registers tables
+from database.migrations import apply_migrations   # VERY IMPORTANT → registers tables + indexes
 
 print("Creating database tables...")
 
-Base.metadata.create_all(bind=engine)
+apply_migrations()
 
 print("Database tables created successfully")
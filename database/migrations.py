@@ -0,0 +1,98 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Table, inspect, select, text
+
+from database.db_engine import engine, Base
+from database import models   # registers tables + indexes
+
+
+# ---------------------------------------------------
+# MIGRATION LEDGER
+# ---------------------------------------------------
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+# ---------------------------------------------------
+# MIGRATION STEPS
+# ---------------------------------------------------
+
+def existing_index_names(conn):
+
+    """
+    Index names straight from the catalog → includes func.date() expression indexes,
+    which reflection (and so index.create(checkfirst=True)) can't see on SQLite
+    """
+
+    if conn.dialect.name == "sqlite":
+        return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+    if conn.dialect.name == "postgresql":
+        return set(conn.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")).scalars())
+
+    inspector = inspect(conn)
+
+    return {
+        index["name"]
+        for table in inspector.get_table_names()
+        for index in inspector.get_indexes(table)
+    }
+
+
+def create_model_indexes(conn):
+
+    """create_all() only indexes brand-new tables → add missing ones to existing tables"""
+
+    existing = existing_index_names(conn)
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+    # refresh planner statistics so the new indexes actually get picked
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("ANALYZE")
+    elif conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("ANALYZE customers")
+        conn.exec_driver_sql("ANALYZE transactions")
+        conn.exec_driver_sql("ANALYZE engagement_events")
+
+
+MIGRATIONS = [
+    ("0001_metric_indexes", create_model_indexes),
+]
+
+
+# ---------------------------------------------------
+# RUNNER
+# ---------------------------------------------------
+
+def apply_migrations(bind=engine):
+
+    Base.metadata.create_all(bind=bind)
+
+    with bind.begin() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, step in MIGRATIONS:
+
+        if version in applied:
+            continue
+
+        print(f"Applying migration {version}...")
+
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version))
+
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+if __name__ == "__main__":
+    apply_migrations()
+    print("Migrations applied")
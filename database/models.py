@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -26,6 +26,15 @@ class Customer(Base):
     transactions = relationship("Transaction", back_populates="customer")
     events = relationship("EngagementEvent", back_populates="customer")
 
+    __table_args__ = (
+        # persona / channel breakdowns + churn_heatmap (covering)
+        Index("ix_customers_persona_channel_churn", "persona", "preferred_channel", "churn_risk"),
+        Index("ix_customers_preferred_channel", "preferred_channel"),
+        # churn_risk_distribution + age_vs_churn (covering)
+        Index("ix_customers_churn_age", "churn_risk", "age"),
+        Index("ix_customers_city", "city"),
+    )
+
 
 # ---------------------------------------------------
 # TRANSACTIONS TABLE
@@ -46,6 +55,18 @@ class Transaction(Base):
 
     customer = relationship("Customer", back_populates="transactions")
 
+    __table_args__ = (
+        # revenue_trend → GROUP BY DATE(timestamp) walks the index in order
+        Index("ix_transactions_day_amount", func.date(timestamp), amount),
+        Index("ix_transactions_timestamp_amount", "timestamp", "amount"),
+        # revenue_by_channel / revenue_boxplot_by_channel (covering)
+        Index("ix_transactions_channel_amount", "channel", "amount"),
+        # top_products / product_channel_matrix (covering)
+        Index("ix_transactions_product_channel_amount", "product_name", "channel", "amount"),
+        # joins to customers
+        Index("ix_transactions_customer_timestamp", "customer_id", "timestamp"),
+    )
+
 
 # ---------------------------------------------------
 # ENGAGEMENT EVENTS TABLE
@@ -64,3 +85,124 @@ class EngagementEvent(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     customer = relationship("Customer", back_populates="events")
+
+    __table_args__ = (
+        # engagement_trend
+        Index("ix_engagement_events_day", func.date(timestamp)),
+        Index("ix_engagement_events_timestamp", "timestamp"),
+        # event_frequency / channel_mix (covering)
+        Index("ix_engagement_events_type_channel", "event_type", "channel"),
+        Index("ix_engagement_events_channel_type", "channel", "event_type"),
+        # joins to customers
+        Index("ix_engagement_events_customer_timestamp", "customer_id", "timestamp"),
+    )
+
+
+# ---------------------------------------------------
+# DAILY ROLLUPS (maintained by analytics/rollups.py)
+# ---------------------------------------------------
+
+class TransactionDailyRollup(Base):
+    __tablename__ = "transaction_daily_rollup"
+
+    day = Column(String, primary_key=True)
+    channel = Column(String, primary_key=True)
+    product_name = Column(String, primary_key=True)
+
+    revenue = Column(Float, default=0.0)
+    transactions = Column(Integer, default=0)
+
+
+class EngagementDailyRollup(Base):
+    __tablename__ = "engagement_daily_rollup"
+
+    day = Column(String, primary_key=True)
+    channel = Column(String, primary_key=True)
+    event_type = Column(String, primary_key=True)
+
+    events = Column(Integer, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    # high-water mark → last source id already folded into the rollup
+    rollup = Column(String, primary_key=True)
+    last_id = Column(Integer, default=0)
+
+
+# ---------------------------------------------------
+# APPROXIMATE MODE SAMPLES (maintained by analytics/approximate.py)
+# ---------------------------------------------------
+
+# sample_key = id hashed into [0, 2^32) → a row stays sampled while sample_key < rate * 2^32,
+# so lowering a stratum's rate only ever deletes rows; sample_weight = 1 / rate
+
+class TransactionSample(Base):
+    __tablename__ = "transactions_sample"
+
+    transaction_id = Column(Integer, primary_key=True)
+
+    customer_id = Column(Integer)
+    product_name = Column(String)
+    amount = Column(Float)
+    channel = Column(String)
+    timestamp = Column(DateTime)
+
+    persona = Column(String)
+    sample_key = Column(Integer)
+    sample_weight = Column(Float)
+
+    __table_args__ = (
+        Index("ix_transactions_sample_stratum", "channel", "persona", "sample_key"),
+    )
+
+
+class EngagementEventSample(Base):
+    __tablename__ = "engagement_events_sample"
+
+    event_id = Column(Integer, primary_key=True)
+
+    customer_id = Column(Integer)
+    event_type = Column(String)
+    channel = Column(String)
+    timestamp = Column(DateTime)
+
+    persona = Column(String)
+    sample_key = Column(Integer)
+    sample_weight = Column(Float)
+
+    __table_args__ = (
+        Index("ix_engagement_events_sample_stratum", "channel", "persona", "sample_key"),
+    )
+
+
+class SampleStratum(Base):
+    __tablename__ = "sample_strata"
+
+    # stratum → (channel, persona) of the source rows
+    sample = Column(String, primary_key=True)
+    channel = Column(String, primary_key=True)
+    persona = Column(String, primary_key=True)
+
+    population = Column(Integer, default=0)
+    rate = Column(Float, default=1.0)
+
+
+# ---------------------------------------------------
+# NL → SQL CACHE (maintained by core/agents/sql_cache.py)
+# ---------------------------------------------------
+
+class NLSqlCacheEntry(Base):
+    __tablename__ = "nl_sql_cache"
+
+    # normalized question (number literals → #) → validated SQL generated for it
+    normalized = Column(String, primary_key=True)
+
+    question = Column(String)
+    numbers = Column(String)            # JSON list of the question's number literals
+    sql = Column(String)
+
+    schema_version = Column(String)     # sql_sanitizer.SCHEMA_VERSION the SQL was validated against
+    created_at = Column(Float)          # epoch seconds → TTL
+
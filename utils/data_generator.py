@@ -1,10 +1,18 @@
+import json
+import os
 import random
+import time
 import numpy as np
+import pandas as pd
 from faker import Faker
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
+from database.data_version import bump_data_version
 from database.db_engine import SessionLocal
 from database.models import Customer, Transaction, EngagementEvent
+from utils.dataset_io import BULK_INSERT_CHUNK, bulk_insert, check_file_format, write_partitioned
 
 fake = Faker()
 np.random.seed(42)
@@ -59,10 +67,74 @@ EVENT_TYPES = [
 
 CHANNELS_TXN = ["Online", "Store", "App"]
 CHANNELS_EVENT = ["App", "Web", "Email"]
+PREFERRED_CHANNELS = ["Email", "Push", "SMS"]
 
 START_DATE = datetime.now() - timedelta(days=180)
 END_DATE = datetime.now()
 
+# ---------------------------------------------------
+# PERSONA PROFILES
+# ---------------------------------------------------
+
+# churn_risk ~ uniform(low, high)
+CHURN_PROFILE = {
+    "VIP": (0.05, 0.20),
+    "Loyal": (0.10, 0.35),
+    "Impulse Buyer": (0.25, 0.55),
+    "Discount Hunter": (0.35, 0.70),
+    "Churn Risk": (0.65, 0.95),
+    "High Potential": (0.20, 0.45),
+    "Window Shopper": (0.40, 0.75),
+    "Brand Advocate": (0.05, 0.25)
+}
+DEFAULT_CHURN = (0.2, 0.6)
+
+# transactions per customer ~ randint(low, high)
+TRANSACTION_COUNT_PROFILE = {
+    "VIP": (10, 25),
+    "Loyal": (6, 18),
+    "Impulse Buyer": (4, 14),
+    "Discount Hunter": (3, 12),
+    "Churn Risk": (1, 7),
+    "High Potential": (5, 16),
+    "Window Shopper": (1, 5),
+    "Brand Advocate": (8, 22)
+}
+DEFAULT_TRANSACTION_COUNT = (1, 10)
+
+# amount ~ lognormal(mean, sigma)
+TRANSACTION_AMOUNT_PROFILE = {
+    "VIP": (6.2, 0.5),
+    "Loyal": (5.8, 0.6),
+    "Impulse Buyer": (5.4, 0.7),
+    "Discount Hunter": (5.0, 0.8),
+    "Churn Risk": (4.6, 0.9),
+    "High Potential": (5.6, 0.7),
+    "Window Shopper": (4.8, 0.8),
+    "Brand Advocate": (6.0, 0.6)
+}
+DEFAULT_TRANSACTION_AMOUNT = (5.3, 0.7)
+
+# events per customer ~ randint(low, high)
+ENGAGEMENT_VOLUME_PROFILE = {
+    "VIP": (40, 120),
+    "Loyal": (50, 140),
+    "Impulse Buyer": (25, 90),
+    "Discount Hunter": (20, 80),
+    "Churn Risk": (8, 30),
+    "High Potential": (35, 100),
+    "Window Shopper": (15, 50),
+    "Brand Advocate": (60, 160)
+}
+DEFAULT_ENGAGEMENT_VOLUME = (10, 60)
+
+# activity hour ~ normal(mean, std) clipped to [0, 23]
+CHANNEL_HOUR_PROFILE = {
+    "App": (20, 3),
+    "Store": (14, 2)
+}
+DEFAULT_CHANNEL_HOUR = (11, 3)
+
 # ---------------------------------------------------
 # TIME ENGINE
 # ---------------------------------------------------
@@ -74,13 +146,9 @@ def random_timestamp(start=START_DATE, end=END_DATE):
 
 def channel_hour_bias(channel):
 
-    if channel == "App":
-        return int(np.clip(np.random.normal(20, 3), 0, 23))
-
-    if channel == "Store":
-        return int(np.clip(np.random.normal(14, 2), 0, 23))
+    mean, std = CHANNEL_HOUR_PROFILE.get(channel, DEFAULT_CHANNEL_HOUR)
 
-    return int(np.clip(np.random.normal(11, 3), 0, 23))
+    return int(np.clip(np.random.normal(mean, std), 0, 23))
 
 
 # ---------------------------------------------------
@@ -89,18 +157,9 @@ def channel_hour_bias(channel):
 
 def generate_churn_risk(persona):
 
-    churn_profile = {
-        "VIP": random.uniform(0.05, 0.20),
-        "Loyal": random.uniform(0.10, 0.35),
-        "Impulse Buyer": random.uniform(0.25, 0.55),
-        "Discount Hunter": random.uniform(0.35, 0.70),
-        "Churn Risk": random.uniform(0.65, 0.95),
-        "High Potential": random.uniform(0.20, 0.45),
-        "Window Shopper": random.uniform(0.40, 0.75),
-        "Brand Advocate": random.uniform(0.05, 0.25)
-    }
+    low, high = CHURN_PROFILE.get(persona, DEFAULT_CHURN)
 
-    return round(churn_profile.get(persona, random.uniform(0.2, 0.6)), 2)
+    return round(random.uniform(low, high), 2)
 
 
 # ---------------------------------------------------
@@ -109,50 +168,23 @@ def generate_churn_risk(persona):
 
 def transaction_count(persona):
 
-    profile = {
-        "VIP": random.randint(10, 25),
-        "Loyal": random.randint(6, 18),
-        "Impulse Buyer": random.randint(4, 14),
-        "Discount Hunter": random.randint(3, 12),
-        "Churn Risk": random.randint(1, 7),
-        "High Potential": random.randint(5, 16),
-        "Window Shopper": random.randint(1, 5),
-        "Brand Advocate": random.randint(8, 22)
-    }
+    low, high = TRANSACTION_COUNT_PROFILE.get(persona, DEFAULT_TRANSACTION_COUNT)
 
-    return profile.get(persona, random.randint(1, 10))
+    return random.randint(low, high)
 
 
 def transaction_amount(persona):
 
-    profile = {
-        "VIP": np.random.lognormal(mean=6.2, sigma=0.5),
-        "Loyal": np.random.lognormal(mean=5.8, sigma=0.6),
-        "Impulse Buyer": np.random.lognormal(mean=5.4, sigma=0.7),
-        "Discount Hunter": np.random.lognormal(mean=5.0, sigma=0.8),
-        "Churn Risk": np.random.lognormal(mean=4.6, sigma=0.9),
-        "High Potential": np.random.lognormal(mean=5.6, sigma=0.7),
-        "Window Shopper": np.random.lognormal(mean=4.8, sigma=0.8),
-        "Brand Advocate": np.random.lognormal(mean=6.0, sigma=0.6)
-    }
+    mean, sigma = TRANSACTION_AMOUNT_PROFILE.get(persona, DEFAULT_TRANSACTION_AMOUNT)
 
-    return round(profile.get(persona, np.random.lognormal(5.3, 0.7)), 2)
+    return round(np.random.lognormal(mean=mean, sigma=sigma), 2)
 
 
 def engagement_volume(persona):
 
-    profile = {
-        "VIP": random.randint(40, 120),
-        "Loyal": random.randint(50, 140),
-        "Impulse Buyer": random.randint(25, 90),
-        "Discount Hunter": random.randint(20, 80),
-        "Churn Risk": random.randint(8, 30),
-        "High Potential": random.randint(35, 100),
-        "Window Shopper": random.randint(15, 50),
-        "Brand Advocate": random.randint(60, 160)
-    }
+    low, high = ENGAGEMENT_VOLUME_PROFILE.get(persona, DEFAULT_ENGAGEMENT_VOLUME)
 
-    return profile.get(persona, random.randint(10, 60))
+    return random.randint(low, high)
 
 
 # ---------------------------------------------------
@@ -169,13 +201,25 @@ def generate_activity_time(signup_date):
 # MAIN GENERATOR
 # ---------------------------------------------------
 
-def generate_data():
+def generate_data(mode="orm", customer_count=CUSTOMER_COUNT, output_dir=None, file_format="parquet"):
+
+    if mode == "bulk":
+        return generate_data_bulk(customer_count, output_dir=output_dir, file_format=file_format)
+
+    if mode == "sharded":
+        return generate_data_sharded(customer_count, output_dir=output_dir, file_format=file_format)
+
+    if output_dir:
+        raise ValueError("File export needs mode='bulk' or mode='sharded'")
+
+    if mode != "orm":
+        raise ValueError(f"Unknown generation mode: {mode}")
 
     db = SessionLocal()
 
     print("Generating Business-Realistic Customer Ecosystem...\n")
 
-    for i in range(CUSTOMER_COUNT):
+    for i in range(customer_count):
 
         persona = random.choice(PERSONAS)
 
@@ -188,7 +232,7 @@ def generate_data():
             age=random.randint(18, 65),
             city=fake.city(),
             persona=persona,
-            preferred_channel=random.choice(["Email", "Push", "SMS"]),
+            preferred_channel=random.choice(PREFERRED_CHANNELS),
             churn_risk=churn_risk,
             signup_date=signup_date
         )
@@ -237,12 +281,396 @@ def generate_data():
     db.commit()
     db.close()
 
+    bump_data_version()
+
     print("\nBusiness-Realistic Ecosystem Generated Successfully")
 
 
+# ---------------------------------------------------
+# COLUMNAR (BULK) GENERATOR
+# ---------------------------------------------------
+
+BULK_BLOCK_CUSTOMERS = 10_000     # customers generated per columnar block
+NAME_POOL_SIZE = 5_000            # Faker is slow → sample from a fixed pool
+
+
+def _profile_array(profile, default, labels):
+    return np.array([profile.get(label, default) for label in labels], dtype=float)
+
+
+_CHURN = _profile_array(CHURN_PROFILE, DEFAULT_CHURN, PERSONAS)
+_TXN_COUNT = _profile_array(TRANSACTION_COUNT_PROFILE, DEFAULT_TRANSACTION_COUNT, PERSONAS).astype(np.int64)
+_TXN_AMOUNT = _profile_array(TRANSACTION_AMOUNT_PROFILE, DEFAULT_TRANSACTION_AMOUNT, PERSONAS)
+_ENGAGEMENT = _profile_array(ENGAGEMENT_VOLUME_PROFILE, DEFAULT_ENGAGEMENT_VOLUME, PERSONAS).astype(np.int64)
+
+_name_pool = None
+
+
+def name_pools(size=NAME_POOL_SIZE):
+
+    global _name_pool
+
+    if _name_pool is None or len(_name_pool[0]) != size:
+
+        pool_faker = Faker()
+        pool_faker.seed_instance(42)
+
+        _name_pool = (
+            np.array([pool_faker.name() for _ in range(size)], dtype=object),
+            np.array([pool_faker.city() for _ in range(size)], dtype=object)
+        )
+
+    return _name_pool
+
+
+def channel_hour_bias_array(rng, channel_idx, channels):
+
+    hour_profile = _profile_array(CHANNEL_HOUR_PROFILE, DEFAULT_CHANNEL_HOUR, channels)
+
+    mean = hour_profile[channel_idx, 0]
+    std = hour_profile[channel_idx, 1]
+
+    return np.clip(rng.normal(mean, std), 0, 23).astype(np.int64)
+
+
+def activity_timestamps(rng, signup_offsets, total_seconds, channel_idx, channels, start):
+
+    # uniform second between signup and END_DATE (inclusive), like random_timestamp()
+    remaining = total_seconds - signup_offsets
+    offsets = signup_offsets + np.floor(rng.random(len(signup_offsets)) * (remaining + 1)).astype(np.int64)
+
+    ts = np.datetime64(start, "us") + offsets.astype("timedelta64[s]")
+
+    # same effect as datetime.replace(hour=channel_hour_bias(channel))
+    day = ts.astype("datetime64[D]")
+    within_hour = (ts - day) % np.timedelta64(1, "h")
+    hours = channel_hour_bias_array(rng, channel_idx, channels)
+
+    return day + hours.astype("timedelta64[h]") + within_hour
+
+
+def build_customer_block(first_id, count, rng, start=START_DATE, end=END_DATE):
+
+    """Draws one block of customers + their activity as columnar DataFrames"""
+
+    total_seconds = int((end - start).total_seconds())
+    names, cities = name_pools()
+
+    # -----------------------------
+    # Customers
+    # -----------------------------
+    persona_idx = rng.integers(0, len(PERSONAS), count)
+    signup_offsets = rng.integers(0, total_seconds + 1, count)
+
+    churn = rng.uniform(_CHURN[persona_idx, 0], _CHURN[persona_idx, 1]).round(2)
+
+    customer_ids = np.arange(first_id, first_id + count, dtype=np.int64)
+
+    customers = pd.DataFrame({
+        "customer_id": customer_ids,
+        "name": names[rng.integers(0, len(names), count)],
+        "age": rng.integers(18, 66, count),
+        "city": cities[rng.integers(0, len(cities), count)],
+        "persona": np.array(PERSONAS, dtype=object)[persona_idx],
+        "preferred_channel": np.array(PREFERRED_CHANNELS, dtype=object)[rng.integers(0, len(PREFERRED_CHANNELS), count)],
+        "churn_risk": churn,
+        "signup_date": np.datetime64(start, "us") + signup_offsets.astype("timedelta64[s]")
+    })
+
+    # -----------------------------
+    # Transactions → AFTER SIGNUP
+    # -----------------------------
+    txn_counts = rng.integers(_TXN_COUNT[persona_idx, 0], _TXN_COUNT[persona_idx, 1] + 1)
+    txn_owner = np.repeat(np.arange(count), txn_counts)
+    txn_channel = rng.integers(0, len(CHANNELS_TXN), len(txn_owner))
+    txn_persona = persona_idx[txn_owner]
+
+    transactions = pd.DataFrame({
+        "customer_id": customer_ids[txn_owner],
+        "product_name": np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), len(txn_owner))],
+        "amount": rng.lognormal(_TXN_AMOUNT[txn_persona, 0], _TXN_AMOUNT[txn_persona, 1]).round(2),
+        "channel": np.array(CHANNELS_TXN, dtype=object)[txn_channel],
+        "timestamp": activity_timestamps(rng, signup_offsets[txn_owner], total_seconds,
+                                         txn_channel, CHANNELS_TXN, start)
+    })
+
+    # -----------------------------
+    # Events → AFTER SIGNUP
+    # -----------------------------
+    event_counts = rng.integers(_ENGAGEMENT[persona_idx, 0], _ENGAGEMENT[persona_idx, 1] + 1)
+    event_owner = np.repeat(np.arange(count), event_counts)
+    event_channel = rng.integers(0, len(CHANNELS_EVENT), len(event_owner))
+
+    events = pd.DataFrame({
+        "customer_id": customer_ids[event_owner],
+        "event_type": np.array(EVENT_TYPES, dtype=object)[rng.integers(0, len(EVENT_TYPES), len(event_owner))],
+        "channel": np.array(CHANNELS_EVENT, dtype=object)[event_channel],
+        "timestamp": activity_timestamps(rng, signup_offsets[event_owner], total_seconds,
+                                         event_channel, CHANNELS_EVENT, start)
+    })
+
+    return {
+        "customers": customers,
+        "transactions": transactions,
+        "engagement_events": events
+    }
+
+
+def generate_data_bulk(customer_count=CUSTOMER_COUNT, block_size=BULK_BLOCK_CUSTOMERS,
+                       chunk_size=BULK_INSERT_CHUNK, seed=42, first_id=1,
+                       output_dir=None, file_format="parquet"):
+
+    """output_dir=None → database; otherwise day-partitioned Parquet/CSV files"""
+
+    if output_dir:
+        check_file_format(file_format)
+
+    rng = np.random.default_rng(seed)
+
+    print(f"Generating {customer_count} customers (columnar bulk mode)...\n")
+
+    started = time.perf_counter()
+    rows = 0
+
+    for block_start in range(0, customer_count, block_size):
+
+        count = min(block_size, customer_count - block_start)
+
+        frames = build_customer_block(first_id + block_start, count, rng)
+
+        if output_dir:
+            rows += write_partitioned(frames, output_dir, f"b{block_start // block_size:05d}", file_format)
+        else:
+            rows += bulk_insert(frames, chunk_size)
+
+        elapsed = time.perf_counter() - started
+        print(f"  {block_start + count}/{customer_count} customers | {rows} rows | {rows / elapsed:,.0f} rows/sec")
+
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        "customers": customer_count,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None
+    }
+
+    bump_data_version()
+
+    print("\nBusiness-Realistic Ecosystem Generated Successfully", stats)
+
+    return stats
+
+
+# ---------------------------------------------------
+# SHARDED (MULTI-PROCESS) GENERATOR
+# ---------------------------------------------------
+
+def plan_shards(customer_count, shards, first_id=1):
+
+    """Splits customer_ids into contiguous [first_id, first_id + count) ranges"""
+
+    base, extra = divmod(customer_count, shards)
+
+    plan = []
+    next_id = first_id
+
+    for shard_index in range(shards):
+
+        count = base + (1 if shard_index < extra else 0)
+
+        if count:
+            plan.append({"shard": shard_index, "first_id": next_id, "count": count})
+
+        next_id += count
+
+    return plan
+
+
+def shard_block_frames(spec, block_index, seed, block_size, start, end):
+
+    # every (shard, block) has its own stream → independent of worker scheduling
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(spec["shard"], block_index)))
+
+    block_start = block_index * block_size
+    count = min(block_size, spec["count"] - block_start)
+
+    return build_customer_block(spec["first_id"] + block_start, count, rng, start, end)
+
+
+def shard_blocks(spec, block_size):
+    return range(-(-spec["count"] // block_size))
+
+
+def write_shard(spec, seed, block_size, start, end, output_dir, file_format):
+
+    """Generates one shard block by block into day-partitioned part files"""
+
+    rows = 0
+
+    for block_index in shard_blocks(spec, block_size):
+
+        frames = shard_block_frames(spec, block_index, seed, block_size, start, end)
+
+        part = f"s{spec['shard']:05d}-b{block_index:05d}"
+        rows += write_partitioned(frames, output_dir, part, file_format)
+
+    return spec["shard"], rows
+
+
+def _bounded_map(pool, fn, tasks, window):
+
+    """Ordered pool.map that keeps at most `window` results in flight"""
+
+    pending = deque()
+
+    for task in tasks:
+
+        pending.append(pool.submit(fn, *task))
+
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def generate_data_sharded(customer_count=CUSTOMER_COUNT, shards=None, workers=None, seed=42,
+                          output_dir=None, file_format="parquet", block_size=BULK_BLOCK_CUSTOMERS,
+                          chunk_size=BULK_INSERT_CHUNK, first_id=1, end_date=None):
+
+    """
+    Splits customer_ids into shards generated in a process pool.
+
+    output_dir=None → blocks are merged into the database in shard order.
+    output_dir=path → each worker writes its own day-partitioned part files
+                      (part-sNNNNN-bNNNNN.<format>) plus a manifest.
+
+    (seed, shard, block) fully determine a block's rows, so regenerate_shard()
+    reproduces any shard byte for byte.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+
+    end = end_date or END_DATE
+    start = end - timedelta(days=180)
+
+    plan = plan_shards(customer_count, shards, first_id)
+
+    print(f"Generating {customer_count} customers in {len(plan)} shards on {workers} workers...\n")
+
+    started = time.perf_counter()
+    rows = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        if output_dir:
+
+            check_file_format(file_format)
+            os.makedirs(output_dir, exist_ok=True)
+
+            write_manifest(output_dir, {
+                "seed": seed,
+                "file_format": file_format,
+                "block_size": block_size,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+                "shards": plan
+            })
+
+            tasks = [(spec, seed, block_size, start, end, output_dir, file_format) for spec in plan]
+
+            for shard_index, shard_rows in _bounded_map(pool, write_shard, tasks, workers * 2):
+                rows += shard_rows
+                print(f"  shard {shard_index} written | {shard_rows} rows")
+
+        else:
+
+            tasks = [
+                (spec, block_index, seed, block_size, start, end)
+                for spec in plan
+                for block_index in shard_blocks(spec, block_size)
+            ]
+
+            # SQLite has a single writer → workers generate, the parent inserts
+            for frames in _bounded_map(pool, shard_block_frames, tasks, workers * 2):
+
+                rows += bulk_insert(frames, chunk_size)
+
+                elapsed = time.perf_counter() - started
+                print(f"  {rows} rows | {rows / elapsed:,.0f} rows/sec")
+
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        "customers": customer_count,
+        "shards": len(plan),
+        "workers": workers,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None
+    }
+
+    bump_data_version()
+
+    print("\nSharded Ecosystem Generated Successfully", stats)
+
+    return stats
+
+
+def write_manifest(output_dir, manifest):
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def regenerate_shard(output_dir, shard_index):
+
+    """Rebuilds one shard's files from manifest.json (byte-identical to the original)"""
+
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    spec = next(s for s in manifest["shards"] if s["shard"] == shard_index)
+
+    return write_shard(
+        spec,
+        manifest["seed"],
+        manifest["block_size"],
+        datetime.fromisoformat(manifest["start_date"]),
+        datetime.fromisoformat(manifest["end_date"]),
+        output_dir,
+        manifest["file_format"]
+    )
+
+
 # ---------------------------------------------------
 # ENTRY POINT
 # ---------------------------------------------------
 
 if __name__ == "__main__":
-    generate_data()
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed omni.db with synthetic customers")
+    parser.add_argument("--mode", choices=["orm", "bulk", "sharded"], default="orm")
+    parser.add_argument("--customers", type=int, default=CUSTOMER_COUNT)
+    parser.add_argument("--shards", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default=None, help="write day-partitioned files instead of the database")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--regenerate-shard", type=int, default=None, help="rebuild one shard of --output-dir")
+
+    args = parser.parse_args()
+
+    if args.regenerate_shard is not None:
+        regenerate_shard(args.output_dir, args.regenerate_shard)
+
+    elif args.mode == "sharded":
+        generate_data_sharded(args.customers, args.shards, args.workers, args.seed,
+                              args.output_dir, args.format)
+
+    else:
+        generate_data(args.mode, args.customers, args.output_dir, args.format)
@@ -0,0 +1,220 @@
+import glob
+import os
+import time
+import pandas as pd
+
+from database.data_version import bump_data_version
+from database.db_engine import engine
+from database.models import Customer, Transaction, EngagementEvent
+
+# ---------------------------------------------------
+# TABLE LAYOUT
+# ---------------------------------------------------
+
+# insertion order matters → customers first keeps foreign keys valid
+BULK_TABLES = {
+    "customers": Customer.__table__,
+    "transactions": Transaction.__table__,
+    "engagement_events": EngagementEvent.__table__
+}
+
+# column each table is partitioned by (one directory per day)
+PARTITION_COLUMNS = {
+    "customers": "signup_date",
+    "transactions": "timestamp",
+    "engagement_events": "timestamp"
+}
+
+FILE_FORMATS = ("parquet", "csv")
+
+BULK_INSERT_CHUNK = 50_000        # rows per executemany round trip
+LOAD_BATCH_ROWS = 500_000         # rows per loader transaction
+
+
+# ---------------------------------------------------
+# DATABASE WRITER (CORE, NO ORM)
+# ---------------------------------------------------
+
+def frame_records(df):
+
+    """DataFrame → list of dicts with native Python values (much faster than to_dict)"""
+
+    columns = list(df.columns)
+
+    values = [
+        df[col].to_numpy().astype("datetime64[us]").astype(object).tolist()
+        if df[col].dtype.kind == "M" else df[col].tolist()
+        for col in columns
+    ]
+
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def insert_frame(conn, table_name, df, chunk_size=BULK_INSERT_CHUNK):
+
+    table = BULK_TABLES[table_name]
+
+    for start in range(0, len(df), chunk_size):
+        conn.execute(table.insert(), frame_records(df.iloc[start:start + chunk_size]))
+
+    return len(df)
+
+
+def bulk_insert(frames, chunk_size=BULK_INSERT_CHUNK, bind=engine):
+
+    """Core executemany inserts, one transaction per block"""
+
+    rows = 0
+
+    with bind.begin() as conn:
+        for table_name in BULK_TABLES:
+            rows += insert_frame(conn, table_name, frames[table_name], chunk_size)
+
+    return rows
+
+
+# ---------------------------------------------------
+# PARTITIONED FILE WRITER
+# ---------------------------------------------------
+
+def check_file_format(file_format):
+
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format: {file_format} (expected one of {FILE_FORMATS})")
+
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow → pip install pyarrow (or use file_format='csv')")
+
+
+def write_partitioned(frames, output_dir, part, file_format="parquet"):
+
+    """
+    Appends one generated block as new part files:
+
+        <output_dir>/<table>/day=YYYY-MM-DD/part-<part>.<format>
+
+    Only the current block is ever held in memory.
+    """
+
+    rows = 0
+
+    for table_name, df in frames.items():
+
+        days = df[PARTITION_COLUMNS[table_name]].dt.strftime("%Y-%m-%d")
+
+        for day, day_df in df.groupby(days, sort=True):
+
+            path = os.path.join(output_dir, table_name, f"day={day}")
+            os.makedirs(path, exist_ok=True)
+
+            filename = os.path.join(path, f"part-{part}.{file_format}")
+
+            if file_format == "parquet":
+                day_df.to_parquet(filename, index=False)
+            else:
+                day_df.to_csv(filename, index=False)
+
+            rows += len(day_df)
+
+    return rows
+
+
+# ---------------------------------------------------
+# PARTITIONED FILE LOADER
+# ---------------------------------------------------
+
+def dataset_files(input_dir, table_name):
+
+    files = []
+
+    for file_format in FILE_FORMATS:
+        files += glob.glob(os.path.join(input_dir, table_name, "day=*", f"*.{file_format}"))
+
+    return sorted(files)
+
+
+def read_part(filename, table_name):
+
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+
+    return pd.read_csv(filename, parse_dates=[PARTITION_COLUMNS[table_name]])
+
+
+def load_dataset(input_dir, batch_rows=LOAD_BATCH_ROWS, chunk_size=BULK_INSERT_CHUNK, bind=engine):
+
+    """Imports an exported dataset, committing every ~batch_rows rows"""
+
+    print(f"Loading dataset from {input_dir}...\n")
+
+    started = time.perf_counter()
+    stats = {}
+
+    for table_name in BULK_TABLES:
+
+        files = dataset_files(input_dir, table_name)
+        loaded = 0
+
+        conn = bind.connect()
+        txn = conn.begin()
+        pending = 0
+
+        try:
+
+            for filename in files:
+
+                rows = insert_frame(conn, table_name, read_part(filename, table_name), chunk_size)
+
+                loaded += rows
+                pending += rows
+
+                if pending >= batch_rows:
+                    txn.commit()
+                    txn = conn.begin()
+                    pending = 0
+
+            txn.commit()
+
+        except Exception:
+            txn.rollback()
+            raise
+
+        finally:
+            conn.close()
+
+        stats[table_name] = loaded
+
+        elapsed = time.perf_counter() - started
+        print(f"  {table_name}: {loaded} rows from {len(files)} files | {elapsed:.1f}s")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(stats.values())
+
+    stats["seconds"] = round(elapsed, 2)
+    stats["rows_per_sec"] = round(rows / elapsed) if elapsed else None
+
+    bump_data_version()
+
+    print("\nDataset Loaded Successfully", stats)
+
+    return stats
+
+
+# ---------------------------------------------------
+# ENTRY POINT
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-load an exported dataset into the database")
+    parser.add_argument("input_dir")
+    parser.add_argument("--batch-rows", type=int, default=LOAD_BATCH_ROWS)
+
+    args = parser.parse_args()
+
+    load_dataset(args.input_dir, args.batch_rows)
@@ -1,6 +1,5 @@
-from database.db_engine import engine
-from database.models import Base
+from database.migrations import apply_migrations
 
-Base.metadata.create_all(bind=engine)
+apply_migrations()
 
-print("Database Initialized")
+print("Database Initialized")
\ No newline at end of file
@@ -0,0 +1,252 @@
+import time
+import numpy as np
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.db_engine import engine
+from database.models import Transaction, EngagementEvent
+from utils.data_generator import (
+    PERSONAS, PRODUCTS, EVENT_TYPES, CHANNELS_TXN, CHANNELS_EVENT,
+    TRANSACTION_COUNT_PROFILE, DEFAULT_TRANSACTION_COUNT,
+    TRANSACTION_AMOUNT_PROFILE, DEFAULT_TRANSACTION_AMOUNT,
+    ENGAGEMENT_VOLUME_PROFILE, DEFAULT_ENGAGEMENT_VOLUME,
+    CHANNEL_HOUR_PROFILE, DEFAULT_CHANNEL_HOUR
+)
+
+# ---------------------------------------------------
+# SIMULATOR CONFIG
+# ---------------------------------------------------
+
+TARGET_EPS = 200           # rows (transactions + events) per second
+TICK_SECONDS = 0.1         # one insert batch per tick
+MAX_CATCHUP_TICKS = 2      # a late tick inserts at most this many ticks' rows (bigger batches hold the lock longer)
+REPORT_SECONDS = 5
+
+
+# ---------------------------------------------------
+# PERSONA WEIGHTS
+# ---------------------------------------------------
+
+def profile_means(profile, default):
+    return np.array([np.mean(profile.get(p, default)) for p in PERSONAS])
+
+
+def load_customers(bind=engine):
+
+    with bind.connect() as conn:
+        rows = conn.execute(text("SELECT customer_id, persona FROM customers")).fetchall()
+
+    if not rows:
+        raise RuntimeError("No customers found → seed the database first (/seed)")
+
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    persona_idx = np.array([PERSONAS.index(r[1]) if r[1] in PERSONAS else 0 for r in rows])
+
+    return ids, persona_idx
+
+
+def hour_channel_weights(channels, hour):
+
+    """How likely each channel is active at `hour` under channel_hour_bias()"""
+
+    weights = []
+
+    for channel in channels:
+        mean, std = CHANNEL_HOUR_PROFILE.get(channel, DEFAULT_CHANNEL_HOUR)
+        weights.append(np.exp(-0.5 * ((hour - mean) / std) ** 2) / std)
+
+    weights = np.array(weights) + 1e-6
+
+    return weights / weights.sum()
+
+
+# ---------------------------------------------------
+# LIVE TRAFFIC GENERATOR
+# ---------------------------------------------------
+
+class TrafficSimulator:
+
+    def __init__(self, target_eps=TARGET_EPS, tick_seconds=TICK_SECONDS, seed=None, bind=engine):
+
+        self.target_eps = target_eps
+        self.tick_seconds = tick_seconds
+        self.bind = bind
+        self.rng = np.random.default_rng(seed)
+
+        self.customer_ids, self.persona_idx = load_customers(bind)
+
+        # a persona's share of live traffic follows its backfill volume
+        txn_weight = profile_means(TRANSACTION_COUNT_PROFILE, DEFAULT_TRANSACTION_COUNT)[self.persona_idx]
+        event_weight = profile_means(ENGAGEMENT_VOLUME_PROFILE, DEFAULT_ENGAGEMENT_VOLUME)[self.persona_idx]
+
+        self.txn_customer_p = txn_weight / txn_weight.sum()
+        self.event_customer_p = event_weight / event_weight.sum()
+        self.txn_share = txn_weight.sum() / (txn_weight.sum() + event_weight.sum())
+
+        self.amount_profile = np.array([
+            TRANSACTION_AMOUNT_PROFILE.get(p, DEFAULT_TRANSACTION_AMOUNT) for p in PERSONAS
+        ])
+
+        self.latencies = []
+        self.failed_latencies = []      # attempts that hit a locked database
+        self.inserted = 0
+        self.lock_errors = 0
+
+    def draw_batch(self, n, now):
+
+        n_txn = self.rng.binomial(n, self.txn_share)
+        n_event = n - n_txn
+
+        # -----------------------------
+        # Transactions
+        # -----------------------------
+        owner = self.rng.choice(len(self.customer_ids), n_txn, p=self.txn_customer_p)
+        mean_sigma = self.amount_profile[self.persona_idx[owner]]
+
+        transactions = [
+            {
+                "customer_id": int(self.customer_ids[o]),
+                "product_name": PRODUCTS[p],
+                "amount": round(float(a), 2),
+                "channel": CHANNELS_TXN[c],
+                "timestamp": now
+            }
+            for o, p, a, c in zip(
+                owner,
+                self.rng.integers(0, len(PRODUCTS), n_txn),
+                self.rng.lognormal(mean_sigma[:, 0], mean_sigma[:, 1]),
+                self.rng.choice(len(CHANNELS_TXN), n_txn, p=hour_channel_weights(CHANNELS_TXN, now.hour))
+            )
+        ]
+
+        # -----------------------------
+        # Engagement events
+        # -----------------------------
+        owner = self.rng.choice(len(self.customer_ids), n_event, p=self.event_customer_p)
+
+        events = [
+            {
+                "customer_id": int(self.customer_ids[o]),
+                "event_type": EVENT_TYPES[e],
+                "channel": CHANNELS_EVENT[c],
+                "timestamp": now
+            }
+            for o, e, c in zip(
+                owner,
+                self.rng.integers(0, len(EVENT_TYPES), n_event),
+                self.rng.choice(len(CHANNELS_EVENT), n_event, p=hour_channel_weights(CHANNELS_EVENT, now.hour))
+            )
+        ]
+
+        return transactions, events
+
+    def insert_batch(self, transactions, events):
+
+        started = time.perf_counter()
+
+        try:
+            with self.bind.begin() as conn:
+
+                if transactions:
+                    conn.execute(Transaction.__table__.insert(), transactions)
+
+                if events:
+                    conn.execute(EngagementEvent.__table__.insert(), events)
+
+        except OperationalError as e:
+
+            # SQLite write-lock contention with readers / other writers
+            if "locked" in str(e).lower():
+                self.lock_errors += 1
+                self.failed_latencies.append(time.perf_counter() - started)
+                return 0
+
+            raise
+
+        self.latencies.append(time.perf_counter() - started)
+
+        return len(transactions) + len(events)
+
+    def stats(self, elapsed):
+
+        def percentile_ms(latencies, q):
+            return round(float(np.percentile(np.array(latencies) * 1000, q)), 2) if latencies else 0.0
+
+        # every attempt, locked ones included → the contention shows up in the tail
+        attempts = self.latencies + self.failed_latencies
+
+        return {
+            "target_eps": self.target_eps,
+            "achieved_eps": round(self.inserted / elapsed, 1) if elapsed else 0.0,
+            "rows": self.inserted,
+            "batches": len(self.latencies),
+            "lock_errors": self.lock_errors,
+            "insert_p50_ms": percentile_ms(self.latencies, 50),
+            "insert_p95_ms": percentile_ms(self.latencies, 95),
+            "insert_p99_ms": percentile_ms(self.latencies, 99),
+            "attempt_p95_ms": percentile_ms(attempts, 95),
+            "attempt_p99_ms": percentile_ms(attempts, 99),
+            "locked_p95_ms": percentile_ms(self.failed_latencies, 95),
+            "seconds": round(elapsed, 1)
+        }
+
+    def run(self, duration=None, report_seconds=REPORT_SECONDS):
+
+        print(f"Streaming live traffic at {self.target_eps} rows/sec (Ctrl+C to stop)...\n")
+
+        started = time.perf_counter()
+        next_report = started + report_seconds
+
+        try:
+
+            while duration is None or time.perf_counter() - started < duration:
+
+                tick_started = time.perf_counter()
+
+                # rate control against the wall clock → slow or failed ticks are caught up,
+                # a few ticks at a time so lock contention can't snowball into ever-bigger batches
+                n = int(self.target_eps * (tick_started - started + self.tick_seconds)) - self.inserted
+                n = min(n, max(1, int(self.target_eps * self.tick_seconds * MAX_CATCHUP_TICKS)))
+
+                if n > 0:
+                    transactions, events = self.draw_batch(n, datetime.now())
+                    self.inserted += self.insert_batch(transactions, events)
+
+                if tick_started >= next_report:
+                    print(" ", self.stats(tick_started - started))
+                    next_report += report_seconds
+
+                time.sleep(max(0.0, self.tick_seconds - (time.perf_counter() - tick_started)))
+
+        except KeyboardInterrupt:
+            pass
+
+        stats = self.stats(time.perf_counter() - started)
+
+        print("\nLive Traffic Simulation Finished", stats)
+
+        return stats
+
+
+def simulate_traffic(target_eps=TARGET_EPS, duration=None, tick_seconds=TICK_SECONDS, seed=None):
+    return TrafficSimulator(target_eps, tick_seconds, seed).run(duration)
+
+
+# ---------------------------------------------------
+# ENTRY POINT
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Continuously append transactions and events")
+    parser.add_argument("--eps", type=float, default=TARGET_EPS, help="target rows per second")
+    parser.add_argument("--duration", type=float, default=None, help="seconds (default: until Ctrl+C)")
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS)
+    parser.add_argument("--seed", type=int, default=None)
+
+    args = parser.parse_args()
+
+    simulate_traffic(args.eps, args.duration, args.tick, args.seed)